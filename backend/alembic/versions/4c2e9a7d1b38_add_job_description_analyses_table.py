@@ -0,0 +1,39 @@
+"""add_job_description_analyses_table
+
+Revision ID: 4c2e9a7d1b38
+Revises: f1702499ffea
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c2e9a7d1b38'
+down_revision: Union[str, None] = 'f1702499ffea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job_description_analyses',
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('seniority', sa.String(), nullable=True),
+        sa.Column('required_skills', sa.JSON(), nullable=False),
+        sa.Column('keywords', sa.JSON(), nullable=False),
+        sa.Column('responsibilities', sa.JSON(), nullable=False),
+        sa.Column('normalized_length', sa.Integer(), nullable=False),
+        sa.Column('use_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('fingerprint')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_description_analyses')
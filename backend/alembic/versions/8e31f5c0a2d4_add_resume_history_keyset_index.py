@@ -0,0 +1,31 @@
+"""add_resume_history_keyset_index
+
+Revision ID: 8e31f5c0a2d4
+Revises: 4c2e9a7d1b38
+Create Date: 2026-10-18 14:36:05.512930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e31f5c0a2d4'
+down_revision: Union[str, None] = '4c2e9a7d1b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_resumes_profile_id_created_at_id',
+        'resumes',
+        ['profile_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_resumes_profile_id_created_at_id', table_name='resumes')
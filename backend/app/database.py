@@ -4,8 +4,20 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 import logging
+import asyncio
+import weakref
 import redis
+import redis.asyncio as aioredis
+import zstandard
 from redis import Redis
+from .utils.db_metrics import (
+    db_metrics,
+    InstrumentedQueuePool,
+    instrument_engine,
+    attach_session_metrics,
+    start_session,
+    finish_session
+)
 
 def generate_uuid() -> str:
     """Generate a UUID string"""
@@ -21,10 +33,13 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL","postgresql://resume:postgres
 try: 
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
         pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10
+        pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30))
     )
+    instrument_engine(engine)
     
     # Add engine connection logging
     @event.listens_for(engine, 'connect')
@@ -35,53 +50,165 @@ except Exception as e:
     logger.error(f"Failed to create database engine: {str(e)}")
     raise
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+attach_session_metrics(SessionLocal)
 
 Base = declarative_base()
 
 def get_db():
+    # Stale connections are handled by pool_pre_ping at checkout, no extra round trip here
     db = SessionLocal()
+    start_session(db)
     try:
-        db.execute(text("SELECT 1"))
-        logger.info("Database connection successful")
         yield db
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
         raise
     finally:
         db.close()
+        finish_session(db)
+
+def get_db_metrics() -> dict:
+    """Return session lifecycle metrics and live pool state for the engine."""
+    return db_metrics.snapshot(engine.pool)
+
+# Shared Redis connection pool; BlockingConnectionPool makes callers wait for a free
+# connection instead of failing when the pool is exhausted
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+
+def _redis_connection_kwargs() -> dict:
+    return {
+        "host": os.getenv("REDIS_HOST", "redis"),
+        "port": int(os.getenv("REDIS_PORT", 6379)),
+        "db": int(os.getenv("REDIS_DB", 0)),
+        "password": os.getenv("REDIS_PASSWORD") or None,
+        "decode_responses": True,
+        "socket_keepalive": True,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "timeout": REDIS_POOL_TIMEOUT,
+    }
+
+redis_pool = redis.BlockingConnectionPool(**_redis_connection_kwargs())
+redis_client = Redis(connection_pool=redis_pool)
+
+# asyncio pools are bound to the event loop that created their connections
+_async_redis_clients = weakref.WeakKeyDictionary()
 
 def get_redis() -> Redis:
-    """Get Redis connection"""
+    """Get the shared, connection-pooled Redis client.
+
+    Connections are health-checked by the pool when they have been idle for
+    longer than REDIS_HEALTH_CHECK_INTERVAL, so no PING is sent per call.
+    """
+    return redis_client
+
+def get_async_redis() -> aioredis.Redis:
+    """Get the pooled asyncio Redis client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_redis_clients.get(loop)
+    if client is None:
+        pool = aioredis.BlockingConnectionPool(**_redis_connection_kwargs())
+        client = aioredis.Redis(connection_pool=pool)
+        _async_redis_clients[loop] = client
+    return client
+
+def redis_pool_stats() -> dict:
+    """Return utilisation of the shared sync Redis pool.
+
+    Returns:
+        dict: max, created, idle and in-use connection counts
+    """
     try:
-        redis_client = redis.Redis(
-            host=os.getenv("REDIS_HOST", "redis"),
-            port=int(os.getenv("REDIS_PORT", 6379)),
-            db=int(os.getenv("REDIS_DB", 0)),
-            password=os.getenv("REDIS_PASSWORD") or None,
-            decode_responses=True
-        )
-        redis_client.ping()
-        logger.info("Redis connection successful")
-        return redis_client
-    except Exception as e:
-        logger.error(f"Redis connection error: {str(e)}")
-        raise
+        created = len(redis_pool._connections)
+        idle = sum(1 for connection in list(redis_pool.pool.queue) if connection is not None)
+    except AttributeError:
+        created = idle = None
+    return {
+        "max_connections": redis_pool.max_connections,
+        "created_connections": created,
+        "idle_connections": idle,
+        "in_use_connections": created - idle if created is not None else None,
+        "async_pools": len(_async_redis_clients),
+    }
+
+GENERATION_JOB_TTL = 1800
+TERMINAL_STATUSES = ("completed", "failed")
+
+def generation_job_key(job_id: str) -> str:
+    """Redis hash holding all state of a generation job (status, metadata and result)"""
+    return f"job:{job_id}"
+
+def generation_partial_key(job_id: str) -> str:
+    """Redis string accumulating the resume streamed so far (hashes have no APPEND)"""
+    return f"job:{job_id}:partial"
+
+def generation_partial_run_key(job_id: str) -> str:
+    """Redis string naming the stream currently allowed to append to the partial text"""
+    return f"job:{job_id}:partial_run"
+
+# Compare-and-set status update: once a job is completed or failed its status is final,
+# so a late write from a retried or timed-out attempt cannot overwrite it.
+# Publishes the update to the job's event channel only if it was applied.
+SET_STATUS_SCRIPT = """
+local key = KEYS[1]
+local current = redis.call('HGET', key, 'status')
+if current == 'completed' or current == 'failed' then
+    return 0
+end
+redis.call('HSET', key, 'status', ARGV[1], 'progress', ARGV[2], 'current_step', ARGV[3], 'updated_at', ARGV[5])
+if ARGV[4] ~= '' then
+    redis.call('HSET', key, 'estimated_time', ARGV[4])
+end
+if ARGV[1] == 'parsing' then
+    redis.call('HSETNX', key, 'start_time', ARGV[5])
+end
+if redis.call('TTL', key) < tonumber(ARGV[6]) then
+    redis.call('EXPIRE', key, tonumber(ARGV[6]))
+end
+redis.call('PUBLISH', ARGV[7], ARGV[8])
+return 1
+"""
+
+_set_status_script = None
+
+# Append streamed text only for the stream that currently owns the job's partial text, so a
+# stream abandoned after a timeout (its thread cannot be killed) never writes into the next one
+APPEND_PARTIAL_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+redis.call('APPEND', KEYS[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+redis.call('PUBLISH', ARGV[4], ARGV[5])
+return 1
+"""
+
+_append_partial_script = None
+
+def _set_job_fields(job_id: str, fields: dict, expiration: int = GENERATION_JOB_TTL):
+    """Write fields of a job record with one HSET, never shortening its TTL"""
+    key = generation_job_key(job_id)
+    pipe = get_redis().pipeline()
+    pipe.hset(key, mapping=fields)
+    pipe.expire(key, expiration, nx=True)
+    pipe.expire(key, expiration, gt=True)
+    pipe.execute()
 
 def save_job_title_to_cache(resume_id: str, job_title: str, expiration: int = 1800) -> bool:
-    """Save job title to Redis cache with expiration
+    """Save job title to the job record with expiration
     
     Args:
         resume_id: UUID of the resume
         job_title: Job title to cache
-        expiration: Cache expiration in seconds (default: 1 day)
+        expiration: Cache expiration in seconds (default: 30 minutes)
     
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        redis_client = get_redis()
-        key = f"resume:{resume_id}:job_title"
-        redis_client.set(key, job_title, ex=expiration)
+        _set_job_fields(resume_id, {"job_title": job_title}, expiration)
         logger.info(f"Saved job title to cache for resume {resume_id}")
         return True
     except Exception as e:
@@ -89,7 +216,7 @@ def save_job_title_to_cache(resume_id: str, job_title: str, expiration: int = 18
         return False
 
 def get_job_title_from_cache(resume_id: str) -> str | None:
-    """Get job title from Redis cache
+    """Get job title from the job record
     
     Args:
         resume_id: UUID of the resume
@@ -98,9 +225,7 @@ def get_job_title_from_cache(resume_id: str) -> str | None:
         str | None: The cached job title if found, None otherwise
     """
     try:
-        redis_client = get_redis()
-        key = f"resume:{resume_id}:job_title"
-        job_title = redis_client.get(key)
+        job_title = get_redis().hget(generation_job_key(resume_id), "job_title")
         if job_title:
             logger.info(f"Retrieved job title from cache for resume {resume_id}")
             return job_title
@@ -110,37 +235,201 @@ def get_job_title_from_cache(resume_id: str) -> str | None:
         logger.error(f"Failed to get job title from cache: {str(e)}")
         return None
 
+def save_generation_owner(job_id: str, user_id: str) -> bool:
+    """Record which user a generation job belongs to
+    
+    Args:
+        job_id: UUID of the generation job
+        user_id: ID of the user who started it
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        _set_job_fields(job_id, {"user_id": str(user_id)})
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save generation owner: {str(e)}")
+        return False
+
+def get_generation_owner(job_id: str) -> str | None:
+    """ID of the user a generation job belongs to, or None if unknown or expired"""
+    try:
+        return get_redis().hget(generation_job_key(job_id), "user_id")
+    except Exception as e:
+        logger.error(f"Failed to get generation owner: {str(e)}")
+        return None
+
+def save_company_name_to_cache(job_id: str, company_name: str, expiration: int = 1800) -> bool:
+    """Save company name to the job record
+    
+    Args:
+        job_id: UUID of the generation job
+        company_name: Company name to cache
+        expiration: Cache expiration in seconds (default: 30 minutes)
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        _set_job_fields(job_id, {"company_name": company_name}, expiration)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save company name to cache: {str(e)}")
+        return False
+
+def get_company_name_from_cache(job_id: str) -> str | None:
+    """Get company name from the job record
+    
+    Args:
+        job_id: UUID of the generation job
+    
+    Returns:
+        str | None: The cached company name if found, None otherwise
+    """
+    try:
+        return get_redis().hget(generation_job_key(job_id), "company_name") or None
+    except Exception as e:
+        logger.error(f"Failed to get company name from cache: {str(e)}")
+        return None
+
+GENERATION_CHANNEL_PREFIX = "generation"
+
+def generation_channel(job_id: str) -> str:
+    """Redis pub/sub channel carrying a generation job's events"""
+    return f"{GENERATION_CHANNEL_PREFIX}:{job_id}"
+
+def publish_generation_event(job_id: str, event: str, data: dict) -> bool:
+    """Publish an event (e.g. a partial agent output) to a generation job's stream
+    
+    Args:
+        job_id: UUID of the generation job
+        event: Event name, sent to the browser as the SSE event type
+        data: JSON-serialisable event payload
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        import json
+        get_redis().publish(generation_channel(job_id), json.dumps({"event": event, "data": data}))
+        return True
+    except Exception as e:
+        logger.error(f"Failed to publish generation event: {str(e)}")
+        return False
+
+def reset_generation_partial(job_id: str, run_id: str | None = None) -> bool:
+    """Discard the streamed resume text and tell clients to clear theirs
+    
+    Args:
+        job_id: UUID of the generation job
+        run_id: Stream allowed to append from now on; None rejects every stream
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        import json
+        pipe = get_redis().pipeline()
+        pipe.delete(generation_partial_key(job_id))
+        if run_id:
+            pipe.set(generation_partial_run_key(job_id), run_id, ex=GENERATION_JOB_TTL)
+        else:
+            pipe.delete(generation_partial_run_key(job_id))
+        pipe.publish(generation_channel(job_id), json.dumps({"event": "partial_reset", "data": {}}))
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to reset streamed resume text: {str(e)}")
+        return False
+
+def append_generation_partial(job_id: str, run_id: str, offset: int, delta: str, done: bool = False) -> bool:
+    """Append streamed resume text and publish only the new part
+    
+    Args:
+        job_id: UUID of the generation job
+        run_id: Stream the text belongs to, as passed to reset_generation_partial
+        offset: Length of the text streamed before this delta
+        delta: Newly streamed text
+        done: True for the last delta of the stream
+    
+    Returns:
+        bool: True if appended, False if the stream was superseded or on error
+    """
+    global _append_partial_script
+    try:
+        import json
+        redis_client = get_redis()
+        if _append_partial_script is None:
+            _append_partial_script = redis_client.register_script(APPEND_PARTIAL_SCRIPT)
+        event = json.dumps({
+            "event": "partial",
+            "data": {"offset": offset, "delta": delta, "done": done}
+        })
+        return bool(_append_partial_script(
+            keys=[generation_partial_key(job_id), generation_partial_run_key(job_id)],
+            args=[run_id, delta, GENERATION_JOB_TTL, generation_channel(job_id), event]
+        ))
+    except Exception as e:
+        logger.error(f"Failed to publish streamed resume text: {str(e)}")
+        return False
+
+def get_generation_partial(job_id: str, start: int = 0) -> str:
+    """Streamed resume text from character offset ``start``, for clients catching up
+    
+    Args:
+        job_id: UUID of the generation job
+        start: Offset to read from
+    
+    Returns:
+        str: The text, empty if nothing was streamed or on error
+    """
+    try:
+        # Streamed text is stored as UTF-8, so read it whole and slice by characters
+        text = get_redis().get(generation_partial_key(job_id)) or ""
+        return text[start:]
+    except Exception as e:
+        logger.error(f"Failed to read streamed resume text: {str(e)}")
+        return ""
+
 def save_generation_status(job_id: str, status: str, progress: int, current_step: str, estimated_time: int = None) -> bool:
-    """Save generation status to Redis cache
+    """Transition a generation job's status, unless it already completed or failed
     
     Args:
         job_id: UUID of the generation job
-        status: Current status (parsing, analyzing, optimizing, constructing, completed, failed)
+        status: Current status (queued, parsing, analyzing, optimizing, constructing, completed, failed)
         progress: Progress percentage (0-100)
         current_step: Human-readable description of current step
         estimated_time: Estimated time remaining in seconds
     
     Returns:
-        bool: True if successful, False otherwise
+        bool: True if the status was written, False if it was rejected or on error
     """
+    global _set_status_script
     try:
+        import json
+        import time
         redis_client = get_redis()
-        pipe = redis_client.pipeline()
+        if _set_status_script is None:
+            _set_status_script = redis_client.register_script(SET_STATUS_SCRIPT)
         
-        # Set all status fields with 30 minute expiration
-        pipe.set(f"resume:{job_id}:status", status, ex=1800)
-        pipe.set(f"resume:{job_id}:progress", progress, ex=1800)
-        pipe.set(f"resume:{job_id}:current_step", current_step, ex=1800)
-        
-        if estimated_time is not None:
-            pipe.set(f"resume:{job_id}:estimated_time", estimated_time, ex=1800)
-        
-        # Set start time if this is the first status update
-        if status == "parsing":
-            import time
-            pipe.set(f"resume:{job_id}:start_time", int(time.time()), ex=1800)
-        
-        pipe.execute()
+        event = json.dumps({
+            "event": "status",
+            "data": {
+                "status": status,
+                "progress": progress,
+                "current_step": current_step,
+                "estimated_time_remaining": estimated_time
+            }
+        })
+        applied = _set_status_script(keys=[generation_job_key(job_id)], args=[
+            status, progress, current_step,
+            "" if estimated_time is None else estimated_time,
+            int(time.time()), GENERATION_JOB_TTL, generation_channel(job_id), event
+        ])
+        if not applied:
+            logger.warning(f"Ignored status {status} for job {job_id}, it already finished")
+            return False
         logger.info(f"Saved generation status for job {job_id}: {status} ({progress}%)")
         return True
     except Exception as e:
@@ -148,7 +437,7 @@ def save_generation_status(job_id: str, status: str, progress: int, current_step
         return False
 
 def get_generation_status(job_id: str) -> dict | None:
-    """Get generation status from Redis cache
+    """Get generation status from the job record
     
     Args:
         job_id: UUID of the generation job
@@ -157,30 +446,20 @@ def get_generation_status(job_id: str) -> dict | None:
         dict | None: Status information if found, None otherwise
     """
     try:
-        redis_client = get_redis()
-        pipe = redis_client.pipeline()
-        
-        pipe.get(f"resume:{job_id}:status")
-        pipe.get(f"resume:{job_id}:progress")
-        pipe.get(f"resume:{job_id}:current_step")
-        pipe.get(f"resume:{job_id}:estimated_time")
-        pipe.get(f"resume:{job_id}:start_time")
-        
-        results = pipe.execute()
-        
-        if not results[0]:  # No status found
+        job = get_redis().hgetall(generation_job_key(job_id))
+        if not job.get("status"):  # No status found
             return None
         
         import time
         current_time = int(time.time())
-        start_time = int(results[4]) if results[4] else current_time
+        start_time = int(job["start_time"]) if job.get("start_time") else current_time
         elapsed_time = current_time - start_time
         
         return {
-            "status": results[0],
-            "progress": int(results[1]) if results[1] else 0,
-            "current_step": results[2] or "Processing...",
-            "estimated_time_remaining": int(results[3]) if results[3] else None,
+            "status": job["status"],
+            "progress": int(job["progress"]) if job.get("progress") else 0,
+            "current_step": job.get("current_step") or "Processing...",
+            "estimated_time_remaining": int(job["estimated_time"]) if job.get("estimated_time") else None,
             "elapsed_time": elapsed_time,
             "start_time": start_time
         }
@@ -188,8 +467,34 @@ def get_generation_status(job_id: str) -> dict | None:
         logger.error(f"Failed to get generation status: {str(e)}")
         return None
 
+# Results are zstd-compressed; the shared client decodes responses, so the
+# compressed bytes are stored base64-encoded behind this marker
+RESULT_CODEC_PREFIX = "zstd:"
+RESULT_COMPRESSION_LEVEL = int(os.getenv("RESULT_COMPRESSION_LEVEL", 6))
+
+def encode_generation_result(result: dict) -> str:
+    """Serialize a generation result to compressed, Redis-safe text"""
+    import json
+    import base64
+    compressed = zstandard.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"), RESULT_COMPRESSION_LEVEL)
+    return RESULT_CODEC_PREFIX + base64.b64encode(compressed).decode("ascii")
+
+def decode_generation_result(value: str) -> dict:
+    """Inverse of encode_generation_result; also accepts results stored as plain JSON"""
+    import json
+    import base64
+    if value.startswith(RESULT_CODEC_PREFIX):
+        value = zstandard.decompress(base64.b64decode(value[len(RESULT_CODEC_PREFIX):])).decode("utf-8")
+    return json.loads(value)
+
+def generation_result_artifacts(job_id: str) -> dict:
+    """Endpoints serving the heavy parts of a generation result, which the result itself omits"""
+    return {
+        "analysis": f"/api/generation-result/{job_id}/analysis"
+    }
+
 def save_generation_result(job_id: str, result: dict, expiration: int = 3600) -> bool:
-    """Save generation result to Redis cache
+    """Save generation result to the job record
     
     Args:
         job_id: UUID of the generation job
@@ -200,9 +505,7 @@ def save_generation_result(job_id: str, result: dict, expiration: int = 3600) ->
         bool: True if successful, False otherwise
     """
     try:
-        redis_client = get_redis()
-        import json
-        redis_client.set(f"resume:{job_id}:result", json.dumps(result), ex=expiration)
+        _set_job_fields(job_id, {"result": encode_generation_result(result)}, expiration)
         logger.info(f"Saved generation result for job {job_id}")
         return True
     except Exception as e:
@@ -210,7 +513,7 @@ def save_generation_result(job_id: str, result: dict, expiration: int = 3600) ->
         return False
 
 def get_generation_result(job_id: str) -> dict | None:
-    """Get generation result from Redis cache
+    """Get generation result from the job record
     
     Args:
         job_id: UUID of the generation job
@@ -219,11 +522,9 @@ def get_generation_result(job_id: str) -> dict | None:
         dict | None: Generation result if found, None otherwise
     """
     try:
-        redis_client = get_redis()
-        result_json = redis_client.get(f"resume:{job_id}:result")
-        if result_json:
-            import json
-            return json.loads(result_json)
+        result_value = get_redis().hget(generation_job_key(job_id), "result")
+        if result_value:
+            return decode_generation_result(result_value)
         return None
     except Exception as e:
         logger.error(f"Failed to get generation result: {str(e)}")
@@ -239,17 +540,7 @@ def cleanup_generation_cache(job_id: str) -> bool:
         bool: True if successful, False otherwise
     """
     try:
-        redis_client = get_redis()
-        keys = [
-            f"resume:{job_id}:status",
-            f"resume:{job_id}:progress", 
-            f"resume:{job_id}:current_step",
-            f"resume:{job_id}:estimated_time",
-            f"resume:{job_id}:start_time",
-            f"resume:{job_id}:result",
-            f"resume:{job_id}:job_title"
-        ]
-        redis_client.delete(*keys)
+        get_redis().delete(generation_job_key(job_id), generation_partial_key(job_id), generation_partial_run_key(job_id))
         logger.info(f"Cleaned up cache for job {job_id}")
         return True
     except Exception as e:
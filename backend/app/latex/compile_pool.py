@@ -0,0 +1,333 @@
+import os
+import re
+import queue
+import hashlib
+import subprocess
+import tempfile
+import threading
+import logging
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional, Union
+
+from .format_cache import format_cache
+
+logger = logging.getLogger(__name__)
+
+# Packages every resume template relies on; checked once per process instead of per request
+REQUIRED_PACKAGES = [
+    'fontawesome5.sty', 'lmodern.sty', 'hyperref.sty',
+    'geometry.sty', 'titlesec.sty', 'fancyhdr.sty', 'ragged2e.sty'
+]
+
+# Log messages that request another engine pass. rerunfilecheck's "(rerunfilecheck)"
+# continuation lines appear in every hyperref log, so only its "has changed" warning counts
+RERUN_PATTERN = re.compile(
+    r"Rerun to get|Label\(s\) may have changed|Please rerun LaTeX|Rerun LaTeX"
+    r"|File `[^']*' has changed"
+)
+DEFAULT_MAX_PASSES = 3
+# Passes every compile used to run unconditionally, the baseline for "passes saved"
+FIXED_PASSES = 2
+
+WARM_UP_DOCUMENT = r"""\documentclass[10pt,a4paper]{article}
+\usepackage{fontawesome5}
+\usepackage{hyperref}
+\usepackage{geometry}
+\usepackage{titlesec}
+\begin{document}
+warm-up \faEnvelope
+\end{document}
+"""
+
+
+class LatexCompileError(Exception):
+    """LaTeX compilation failed"""
+    pass
+
+
+class CompileQueueFullError(LatexCompileError):
+    """No compile worker became available before the submit timeout"""
+    pass
+
+
+@dataclass
+class CompileJob:
+    tex_path: str
+    engine: str
+    max_passes: int
+    fmt: Optional[str] = None
+    label: str = "default"
+    future: Future = field(default_factory=Future)
+
+
+@dataclass
+class EngineTask:
+    """Engine work other than a compile (format dumps), run on a pool worker so it counts against the same limit."""
+    func: Callable[[], Any]
+    label: str = "task"
+    future: Future = field(default_factory=Future)
+
+
+class LatexCompilePool:
+    """Fixed set of long-lived compile workers fed from a bounded queue.
+
+    Workers are started once per process, the package check and a warm-up
+    compile (which primes the font and kpathsea caches) run once at start-up,
+    and the queue bound gives callers backpressure instead of letting a burst
+    of requests fork an unbounded number of TeX engines.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None, format_dir: Optional[str] = None):
+        self.worker_count = workers or int(os.getenv("LATEX_COMPILE_WORKERS", os.cpu_count() or 2))
+        self.queue_size = queue_size or int(os.getenv("LATEX_COMPILE_QUEUE_SIZE", 32))
+        self.submit_timeout = float(os.getenv("LATEX_COMPILE_SUBMIT_TIMEOUT", 10))
+        self.job_timeout = float(os.getenv("LATEX_COMPILE_TIMEOUT", 120))
+        self._queue: "queue.Queue[Optional[Union[CompileJob, EngineTask]]]" = queue.Queue(maxsize=self.queue_size)
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._started = False
+        self.missing_packages: List[str] = []
+        self.format_dir = format_dir
+        self._pass_stats: Dict[str, Dict[str, int]] = {}
+
+        # Let the engines find precompiled template formats without absolute paths
+        self._env = os.environ.copy()
+        if format_dir:
+            self._env["TEXFORMATS"] = f"{format_dir}{os.pathsep}{self._env.get('TEXFORMATS', '')}"
+
+    def start(self):
+        """Check packages, warm the engine caches and spawn the workers (idempotent)."""
+        with self._lock:
+            if self._started:
+                return
+            self._check_packages()
+            for i in range(self.worker_count):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"latex-compile-{i}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+            self._started = True
+            logger.info(f"Started LaTeX compile pool with {self.worker_count} workers (queue size {self.queue_size})")
+
+        # Warm-up goes through the queue so it never delays start-up itself
+        threading.Thread(target=self._warm_up, name="latex-compile-warmup", daemon=True).start()
+
+    def shutdown(self):
+        """Stop all workers after the jobs already queued have finished."""
+        with self._lock:
+            if not self._started:
+                return
+            for _ in self._workers:
+                self._queue.put(None)
+            for worker in self._workers:
+                worker.join(timeout=self.job_timeout)
+            self._workers = []
+            self._started = False
+            logger.info("LaTeX compile pool stopped")
+
+    def submit(self, tex_path: str, engine: str = 'xelatex', max_passes: int = DEFAULT_MAX_PASSES,
+               fmt: Optional[str] = None, label: str = "default") -> Future:
+        """Queue a compile job and return a future resolving to the PDF path."""
+        if not self._started:
+            self.start()
+        if self.missing_packages:
+            raise LatexCompileError(f"Missing LaTeX packages: {', '.join(self.missing_packages)}")
+
+        job = CompileJob(tex_path=tex_path, engine=engine, max_passes=max_passes, fmt=fmt, label=label)
+        try:
+            self._queue.put(job, timeout=self.submit_timeout)
+        except queue.Full:
+            logger.warning(f"LaTeX compile queue full ({self.queue_size} jobs), rejecting {tex_path}")
+            raise CompileQueueFullError("PDF compiler is busy, please try again shortly")
+        return job.future
+
+    def submit_task(self, func: Callable[[], Any], label: str = "task", block: bool = True) -> Future:
+        """Queue other engine work (such as an ``xelatex -ini`` format dump) on the pool.
+
+        :param func: Callable run on a compile worker; its return value resolves the future.
+        :param label: Name used in log messages.
+        :param block: Wait up to the submit timeout for a queue slot; background work passes
+            False so it is dropped at once instead of holding up the caller when the pool is busy.
+        :return: Future resolving to the callable's return value.
+        """
+        if not self._started:
+            self.start()
+        if self.missing_packages:
+            raise LatexCompileError(f"Missing LaTeX packages: {', '.join(self.missing_packages)}")
+
+        task = EngineTask(func=func, label=label)
+        try:
+            self._queue.put(task, block=block, timeout=self.submit_timeout if block else None)
+        except queue.Full:
+            logger.warning(f"LaTeX compile queue full ({self.queue_size} jobs), rejecting {label}")
+            raise CompileQueueFullError("PDF compiler is busy, please try again shortly")
+        return task.future
+
+    def compile(self, tex_path: str, engine: str = 'xelatex', max_passes: int = DEFAULT_MAX_PASSES,
+                fmt: Optional[str] = None, label: str = "default") -> str:
+        """Submit a compile job and block until the PDF is ready.
+
+        :param tex_path: Absolute path of the .tex file; the PDF is written next to it.
+        :param engine: TeX engine to run (xelatex or pdflatex).
+        :param max_passes: Upper bound on engine runs; extra runs only happen when needed.
+        :param fmt: Name of a precompiled format to load instead of the engine default.
+        :param label: Name the pass statistics are recorded under (usually the template).
+        :return: Path of the generated PDF.
+        """
+        future = self.submit(tex_path, engine=engine, max_passes=max_passes, fmt=fmt, label=label)
+        return future.result(timeout=self.job_timeout * max_passes + self.submit_timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current pool utilisation."""
+        return {
+            "workers": self.worker_count,
+            "busy_workers": self._busy,
+            "queued_jobs": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "started": self._started
+        }
+
+    def pass_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-label engine pass counts and the passes saved versus always running twice."""
+        with self._lock:
+            snapshot = {label: dict(counts) for label, counts in self._pass_stats.items()}
+        for counts in snapshot.values():
+            counts["avg_passes"] = round(counts["passes"] / counts["compiles"], 2) if counts["compiles"] else 0
+            counts["passes_saved"] = counts["compiles"] * FIXED_PASSES - counts["passes"]
+        return snapshot
+
+    def _record_passes(self, label: str, passes: int):
+        with self._lock:
+            counts = self._pass_stats.setdefault(label, {"compiles": 0, "passes": 0, "reruns": 0})
+            counts["compiles"] += 1
+            counts["passes"] += passes
+            counts["reruns"] += passes - 1
+
+    def _check_packages(self):
+        try:
+            package_check = subprocess.run(
+                ['kpsewhich'] + REQUIRED_PACKAGES,
+                capture_output=True,
+                text=True
+            )
+            found = {os.path.basename(p) for p in package_check.stdout.split('\n') if p}
+            self.missing_packages = [pkg for pkg in REQUIRED_PACKAGES if pkg not in found]
+            if self.missing_packages:
+                logger.error(f"Missing LaTeX packages: {', '.join(self.missing_packages)}")
+        except FileNotFoundError:
+            logger.error("kpsewhich not found, LaTeX does not appear to be installed")
+            self.missing_packages = ['kpsewhich']
+
+    def _warm_up(self):
+        if self.missing_packages:
+            return
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                tex_path = os.path.join(temp_dir, 'warmup.tex')
+                with open(tex_path, 'w') as f:
+                    f.write(WARM_UP_DOCUMENT)
+                self.compile(tex_path, engine='xelatex', max_passes=1, label="warm-up")
+            logger.info("LaTeX compile pool warm-up finished")
+        except Exception as e:
+            logger.warning(f"LaTeX compile pool warm-up failed: {str(e)}")
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                break
+            if not job.future.set_running_or_notify_cancel():
+                self._queue.task_done()
+                continue
+            with self._lock:
+                self._busy += 1
+            try:
+                if isinstance(job, EngineTask):
+                    job.future.set_result(job.func())
+                else:
+                    job.future.set_result(self._run_job(job))
+            except Exception as e:
+                job.future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                self._queue.task_done()
+
+    def _run_job(self, job: CompileJob) -> str:
+        tex_dir = os.path.dirname(job.tex_path)
+        tex_filename = os.path.basename(job.tex_path)
+        job_name = os.path.splitext(tex_filename)[0]
+        aux_path = os.path.join(tex_dir, job_name + '.aux')
+        engine_log_path = os.path.join(tex_dir, job_name + '.log')
+        command = [job.engine, '-interaction=nonstopmode']
+        if job.fmt:
+            command.append(f'-fmt={job.fmt}')
+        command.append(tex_filename)
+
+        passes = 0
+        aux_hash = self._file_hash(aux_path)
+        while True:
+            try:
+                process = subprocess.run(
+                    command,
+                    cwd=tex_dir,
+                    env=self._env,
+                    capture_output=True,
+                    text=True,
+                    timeout=self.job_timeout
+                )
+            except subprocess.TimeoutExpired:
+                raise LatexCompileError(f"PDF compilation timed out after {self.job_timeout}s")
+
+            # Write full LaTeX output to log file for debugging
+            log_path = os.path.join(tex_dir, f'latex_output_{passes}.log')
+            with open(log_path, 'w') as log_file:
+                log_file.write(f"STDOUT:\n{process.stdout}\n\nSTDERR:\n{process.stderr}")
+            passes += 1
+
+            if process.returncode != 0:
+                error_output = process.stderr if process.stderr else process.stdout
+                logger.error(f"PDF compilation failed with output:\n{error_output}")
+                raise LatexCompileError(f"PDF compilation failed: {error_output}\nSee full log at: {log_path}")
+
+            previous_aux_hash, aux_hash = aux_hash, self._file_hash(aux_path)
+            if passes >= job.max_passes or not self._needs_rerun(engine_log_path, passes, previous_aux_hash, aux_hash):
+                break
+            logger.debug(f"Rerunning {job.engine} for {tex_filename} (pass {passes + 1})")
+
+        # Single-pass jobs (the warm-up) never ran the fixed two passes, so they would skew "passes saved"
+        if job.max_passes > 1:
+            self._record_passes(job.label, passes)
+
+        pdf_path = os.path.join(tex_dir, job_name + '.pdf')
+        if not os.path.exists(pdf_path):
+            raise LatexCompileError("PDF file was not created")
+        return pdf_path
+
+    def _needs_rerun(self, engine_log_path: str, passes: int, previous_aux_hash: Optional[str], aux_hash: Optional[str]) -> bool:
+        """Decide whether another pass is needed from the engine log and the .aux file."""
+        try:
+            with open(engine_log_path, 'r', errors='replace') as f:
+                if RERUN_PATTERN.search(f.read()):
+                    return True
+        except FileNotFoundError:
+            pass
+        # The first pass always creates the .aux, so only a change between reruns counts
+        return passes > 1 and previous_aux_hash != aux_hash
+
+    @staticmethod
+    def _file_hash(path: str) -> Optional[str]:
+        try:
+            with open(path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+
+compile_pool = LatexCompilePool(format_dir=str(format_cache.format_dir))
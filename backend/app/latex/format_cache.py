@@ -0,0 +1,242 @@
+import os
+import re
+import shutil
+import hashlib
+import subprocess
+import tempfile
+import threading
+import logging
+from pathlib import Path
+from typing import Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# XeTeX cannot dump OpenType fonts into a format, so the dumped part of the
+# preamble has to stop before anything that loads fontspec (fontawesome v4 and
+# fontawesome5 both do under XeTeX).
+DUMP_STOP_PATTERN = re.compile(
+    r'^[ \t]*\\(?:usepackage(?:\[[^\]]*\])?\{[^}]*\b(?:fontspec|fontawesome5?)\b[^}]*\}'
+    r'|set(?:main|sans|mono)font|newfontfamily|begin\{document\})',
+    re.MULTILINE
+)
+JINJA_MARKERS = ('[[', '[%', '[#')
+
+
+class LatexFormatCache:
+    """Builds and looks up precompiled .fmt files for template preambles.
+
+    The static part of a rendered template (everything up to the first font
+    selection or ``\\begin{document}``) is dumped once with mylatexformat, keyed
+    by its sha256, so compiles only parse the dynamic remainder. Every
+    distinct preamble gets its own format, so the directory is bounded to
+    ``LATEX_FORMAT_CACHE_MAX_MB`` by evicting the least recently used.
+    """
+
+    def __init__(self, format_dir: Optional[str] = None, engine: str = 'xelatex'):
+        self.format_dir = Path(format_dir or os.getenv(
+            "LATEX_FORMAT_DIR",
+            str(Path(__file__).parent / "formats")
+        ))
+        self.engine = engine
+        self.build_timeout = float(os.getenv("LATEX_FORMAT_BUILD_TIMEOUT", 180))
+        self.max_bytes = int(os.getenv("LATEX_FORMAT_CACHE_MAX_MB", 512)) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._building: Set[str] = set()
+        self._scheduled: Set[str] = set()
+        self._failed: Set[str] = set()
+
+    def split_preamble(self, latex_content: str) -> Tuple[str, str]:
+        """Split a rendered document into its dumpable preamble and the rest.
+
+        :param latex_content: Full LaTeX source.
+        :return: (preamble, remainder); preamble is empty when nothing can be dumped.
+        """
+        match = DUMP_STOP_PATTERN.search(latex_content)
+        if not match or not latex_content.lstrip().startswith('\\documentclass'):
+            return "", latex_content
+        return latex_content[:match.start()], latex_content[match.start():]
+
+    def format_name(self, preamble: str) -> str:
+        """Return the format name for a preamble (a hash, so edits invalidate it)."""
+        return f"tpl_{hashlib.sha256(preamble.encode('utf-8')).hexdigest()[:20]}"
+
+    def get_format(self, preamble: str) -> Optional[str]:
+        """Return the format name if its .fmt is already built, else None."""
+        if not preamble:
+            return None
+        name = self.format_name(preamble)
+        fmt_path = self.format_dir / f"{name}.fmt"
+        try:
+            # Touch the format so eviction sees it as recently used
+            os.utime(fmt_path, None)
+            return name
+        except FileNotFoundError:
+            return None
+
+    def prepare(self, latex_content: str) -> Tuple[str, Optional[str]]:
+        """Prepare a rendered document for compilation against a cached format.
+
+        On a hit the returned source carries ``\\endofdump`` at the split point and
+        the format name is returned; on a miss the source is returned unchanged,
+        and the format is built in the background for the next request.
+        """
+        preamble, remainder = self.split_preamble(latex_content)
+        if not preamble:
+            return latex_content, None
+
+        fmt_name = self.get_format(preamble)
+        if fmt_name is None:
+            self.build_async(preamble)
+            return latex_content, None
+        return f"{preamble}\\endofdump\n{remainder}", fmt_name
+
+    def build_for_source(self, template_source: str) -> Optional[str]:
+        """Build the format for a raw template source, if its preamble is static.
+
+        Used when a template is activated; preambles containing Jinja markup are
+        left to be built lazily from the first rendered document.
+        """
+        preamble, _ = self.split_preamble(template_source)
+        if not preamble or any(marker in preamble for marker in JINJA_MARKERS):
+            return None
+        return self.build(preamble)
+
+    def schedule_template_build(self, source: Optional[str] = None, file_path: Optional[str] = None):
+        """Build the format for an activated template on the compile pool.
+
+        :param source: Raw template source, if the caller already has it.
+        :param file_path: S3 key of the template, downloaded when source is not given.
+        """
+        def _build():
+            try:
+                template_source = source
+                if template_source is None and file_path:
+                    from .template_registry import template_registry
+                    entry = template_registry.fetch(file_path)
+                    template_source = entry.source if entry else None
+                if template_source is None:
+                    logger.warning(f"No template source available for format build: {file_path}")
+                    return
+                self.build_for_source(template_source)
+            except Exception as e:
+                logger.warning(f"Error building format for template {file_path}: {str(e)}")
+
+        self._submit(_build, f"template format {file_path or 'upload'}")
+
+    def build_async(self, preamble: str):
+        """Queue a format build on the compile pool unless already built, queued, building or failed."""
+        name = self.format_name(preamble)
+        with self._lock:
+            if name in self._scheduled or name in self._building or name in self._failed:
+                return
+            self._scheduled.add(name)
+
+        def _build():
+            try:
+                self.build(preamble)
+            finally:
+                with self._lock:
+                    self._scheduled.discard(name)
+
+        if not self._submit(_build, f"format {name}"):
+            with self._lock:
+                self._scheduled.discard(name)
+
+    def _submit(self, build, label: str) -> bool:
+        """Run a build on the compile pool so format dumps share its engine limit.
+
+        Never waits for a queue slot: a skipped build is retried on the next cache miss.
+        """
+        from .compile_pool import compile_pool, LatexCompileError
+        try:
+            compile_pool.submit_task(build, label=label, block=False)
+            return True
+        except LatexCompileError as e:
+            logger.warning(f"Skipping {label} build: {str(e)}")
+            return False
+
+    def build(self, preamble: str) -> Optional[str]:
+        """Dump a preamble to a .fmt file.
+
+        :param preamble: Static preamble, starting with \\documentclass.
+        :return: The format name, or None if the build failed.
+        """
+        name = self.format_name(preamble)
+        fmt_path = self.format_dir / f"{name}.fmt"
+        with self._lock:
+            if fmt_path.exists():
+                return name
+            if name in self._building or name in self._failed:
+                return None
+            self._building.add(name)
+
+        try:
+            self.format_dir.mkdir(exist_ok=True, parents=True)
+            with tempfile.TemporaryDirectory() as temp_dir:
+                with open(os.path.join(temp_dir, 'preamble.tex'), 'w') as f:
+                    f.write(preamble)
+                    f.write("\\begin{document}\n\\end{document}\n")
+
+                process = subprocess.run(
+                    [self.engine, '-ini', '-interaction=nonstopmode', f'-jobname={name}',
+                     f'&{self.engine}', 'mylatexformat.ltx', 'preamble.tex'],
+                    cwd=temp_dir,
+                    capture_output=True,
+                    text=True,
+                    timeout=self.build_timeout
+                )
+                built = os.path.join(temp_dir, f"{name}.fmt")
+                if process.returncode != 0 or not os.path.exists(built):
+                    raise RuntimeError(process.stdout[-2000:] or process.stderr[-2000:])
+
+                # Move into place atomically so concurrent compiles never see a partial file
+                tmp_target = self.format_dir / f".{name}.fmt.tmp"
+                shutil.copyfile(built, tmp_target)
+                os.replace(tmp_target, fmt_path)
+
+            logger.info(f"Built LaTeX format {name}")
+            self._evict(keep=fmt_path)
+            return name
+        except Exception as e:
+            logger.warning(f"Could not build LaTeX format {name}, compiling without it: {str(e)}")
+            with self._lock:
+                self._failed.add(name)
+            return None
+        finally:
+            with self._lock:
+                self._building.discard(name)
+
+
+    def _evict(self, keep: Path):
+        """Drop least recently used formats until the directory is within its limit.
+
+        A compile that already loaded an evicted format is unaffected; one that
+        has not yet started fails and is retried from the full source.
+        """
+        entries = []
+        for p in self.format_dir.glob("tpl_*.fmt"):
+            try:
+                stat = p.stat()
+                entries.append((stat.st_mtime, stat.st_size, p))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+
+        size = sum(e[1] for e in entries)
+        removed = 0
+        for _, entry_size, p in entries:
+            if size <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            try:
+                p.unlink()
+                size -= entry_size
+                removed += 1
+            except FileNotFoundError:
+                continue
+        if removed:
+            logger.info(f"Evicted {removed} LaTeX formats, format cache now {size} bytes")
+
+
+format_cache = LatexFormatCache()
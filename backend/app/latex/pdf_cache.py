@@ -0,0 +1,251 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RenderedPdfCache:
+    """Content-addressed cache of compiled resume PDFs.
+
+    Entries are keyed by the cleaned template context together with the
+    template's id and ``updated_at``, so editing a template or the resume
+    content yields a new key and stale PDFs are never served. A size-bounded
+    local disk tier is checked first, then an optional S3 tier shared by all
+    replicas (enabled with ``PDF_CACHE_S3=true``).
+
+    Cached PDFs contain personal data, so every entry belongs to a user: it
+    is stored under the user's directory and S3 prefix and recorded in a
+    Redis set per user, which ``purge_owner`` drops when the user or one of
+    their resumes is deleted. An entry only counts as a hit while it is in
+    that set, so files left on other replicas' disks are never served again.
+
+    Entries live for ``PDF_CACHE_TTL_DAYS``: each user's index expires that
+    long after their last cached render, and the S3 tier's prefix carries a
+    lifecycle rule deleting objects at the same age.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or os.getenv(
+            "PDF_CACHE_DIR",
+            str(Path(__file__).parent.parent / "output" / "pdf_cache")
+        ))
+        self.max_bytes = max_bytes or int(os.getenv("PDF_CACHE_MAX_MB", 512)) * 1024 * 1024
+        self.s3_enabled = os.getenv("PDF_CACHE_S3", "false").lower() == "true"
+        self.s3_prefix = os.getenv("PDF_CACHE_S3_PREFIX", "pdf_cache")
+        self.index_prefix = os.getenv("PDF_CACHE_INDEX_PREFIX", "pdfcache:owner")
+        self.ttl_days = int(os.getenv("PDF_CACHE_TTL_DAYS", 7))
+        self._lifecycle_checked = False
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.s3_hits = 0
+        self.misses = 0
+
+    def make_key(self, content: Dict[str, Any], template_id: str, template_updated_at=None) -> str:
+        """Build the cache key for a formatted resume and template version.
+
+        :param content: Cleaned template context (output of validate_and_clean).
+        :param template_id: Template UUID as string.
+        :param template_updated_at: Template's last update time, part of its identity.
+        :return: Hex sha256 key.
+        """
+        payload = json.dumps(
+            {
+                "content": content,
+                "template_id": str(template_id),
+                "template_version": template_updated_at.isoformat() if template_updated_at else None,
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, owner_id: Optional[str]) -> Optional[bytes]:
+        """Return the owner's cached PDF bytes for a key, or None on a miss."""
+        if not owner_id or not self._indexed(key, owner_id):
+            self.misses += 1
+            return None
+
+        path = self._path(key, owner_id)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Touch the entry so eviction sees it as recently used
+            os.utime(path, None)
+            self.hits += 1
+            return data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Error reading cached PDF {key}: {str(e)}")
+
+        if self.s3_enabled:
+            from ..utils.s3_storage import s3_storage
+            data = s3_storage.download_file(self._s3_key(key, owner_id))
+            if data:
+                self.s3_hits += 1
+                try:
+                    self._write_local(key, owner_id, data)
+                except Exception as e:
+                    logger.warning(f"Error writing cached PDF {key} to disk: {str(e)}")
+                return data
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, pdf_path: str, owner_id: Optional[str]):
+        """Store a compiled PDF under a key in every enabled tier.
+
+        Renders without an owner are not cached, since nothing could purge them.
+        """
+        if not owner_id:
+            return
+        try:
+            with open(pdf_path, 'rb') as f:
+                data = f.read()
+            # Indexed first, so an entry that reaches disk or S3 can always be purged
+            from ..database import get_redis
+            pipe = get_redis().pipeline()
+            pipe.sadd(self._index_key(owner_id), key)
+            pipe.expire(self._index_key(owner_id), self.ttl_days * 24 * 3600)
+            pipe.execute()
+            self._write_local(key, owner_id, data)
+            if self.s3_enabled:
+                from ..utils.s3_storage import s3_storage
+                self._ensure_s3_expiration(s3_storage)
+                s3_storage.upload_file(data, self._s3_key(key, owner_id), "application/pdf")
+        except Exception as e:
+            # Caching is best effort, a failure here must not fail the request
+            logger.warning(f"Error caching PDF {key}: {str(e)}")
+
+    def purge_owner(self, owner_id: str) -> List[str]:
+        """Drop every cached PDF of a user.
+
+        Removes the user's index and local directory; the S3 objects are
+        returned rather than deleted so callers can hand them to the cleanup
+        queue together with the rest of the user's objects.
+
+        :param owner_id: User id the entries were cached under.
+        :return: S3 object names of the purged entries.
+        """
+        keys: List[str] = []
+        try:
+            from ..database import get_redis
+            pipe = get_redis().pipeline()
+            pipe.smembers(self._index_key(owner_id))
+            pipe.delete(self._index_key(owner_id))
+            keys = sorted(pipe.execute()[0])
+        except Exception as e:
+            logger.error(f"Could not read the PDF cache index of user {owner_id}: {str(e)}")
+
+        owner_dir = self.cache_dir / str(owner_id)
+        if owner_dir.exists():
+            shutil.rmtree(owner_dir, ignore_errors=True)
+            with self._lock:
+                # Recounted on the next write
+                self._size = None
+        if keys:
+            logger.info(f"Purged {len(keys)} cached PDFs of user {owner_id}")
+        return [self._s3_key(key, owner_id) for key in keys] if self.s3_enabled else []
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the local tier size."""
+        return {
+            "hits": self.hits,
+            "s3_hits": self.s3_hits,
+            "misses": self.misses,
+            "size_bytes": self._current_size(),
+            "max_bytes": self.max_bytes,
+            "s3_enabled": self.s3_enabled
+        }
+
+    def _path(self, key: str, owner_id: str) -> Path:
+        return self.cache_dir / str(owner_id) / key[:2] / f"{key}.pdf"
+
+    def _s3_key(self, key: str, owner_id: str) -> str:
+        return f"{self.s3_prefix}/{owner_id}/{key}.pdf"
+
+    def _index_key(self, owner_id: str) -> str:
+        return f"{self.index_prefix}:{owner_id}"
+
+    def _ensure_s3_expiration(self, s3_storage):
+        """Install the S3 tier's expiry rule once per process."""
+        if self._lifecycle_checked:
+            return
+        self._lifecycle_checked = True
+        if not s3_storage.ensure_prefix_expiration(self.s3_prefix, self.ttl_days, "pdf-cache-expiry"):
+            logger.warning(f"Cached PDFs under {self.s3_prefix}/ will not expire; add a lifecycle rule for the prefix")
+
+    def _indexed(self, key: str, owner_id: str) -> bool:
+        try:
+            from ..database import get_redis
+            return bool(get_redis().sismember(self._index_key(owner_id), key))
+        except Exception as e:
+            # Without the index a purged entry cannot be told apart, so treat it as a miss
+            logger.warning(f"Could not check the PDF cache index, skipping cache: {str(e)}")
+            return False
+
+    def _write_local(self, key: str, owner_id: str, data: bytes):
+        path = self._path(key, owner_id)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size = self._current_size() - replaced + len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._drop_unowned()
+            self._size = sum(p.stat().st_size for p in self.cache_dir.glob("*/*/*.pdf")) if self.cache_dir.exists() else 0
+        return self._size
+
+    def _drop_unowned(self):
+        """Remove entries from before the cache was partitioned by user; nothing could purge them."""
+        for p in self.cache_dir.glob("*/*.pdf") if self.cache_dir.exists() else []:
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                continue
+
+    def _evict(self):
+        """Drop least recently used entries until the tier is under 90% of its limit."""
+        entries = []
+        for p in self.cache_dir.glob("*/*/*.pdf"):
+            try:
+                stat = p.stat()
+                entries.append((stat.st_mtime, stat.st_size, p))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+
+        size = sum(e[1] for e in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, entry_size, p in entries:
+            if size <= target:
+                break
+            try:
+                p.unlink()
+                size -= entry_size
+                removed += 1
+            except FileNotFoundError:
+                continue
+        self._size = size
+        logger.info(f"Evicted {removed} cached PDFs, cache now {size} bytes")
+
+
+pdf_cache = RenderedPdfCache()
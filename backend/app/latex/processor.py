@@ -1,12 +1,10 @@
 import os
-import subprocess
 import tempfile
 import json
 import uuid
 from pathlib import Path
 import time
 from typing import Dict, Any
-from jinja2 import Environment, FileSystemLoader, BaseLoader, TemplateNotFound
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from PyPDF2 import PdfWriter, PdfReader
@@ -15,40 +13,38 @@ import re
 from sqlalchemy.orm import Session
 from .. import models
 from ..utils.s3_storage import s3_storage
+from .compile_pool import compile_pool, LatexCompileError
+from .format_cache import format_cache
+from .pdf_cache import pdf_cache
+from .template_registry import template_registry
+from .template_cache import template_cache, TemplateInfo
 
 logger = logging.getLogger(__name__)
 
-class S3TemplateLoader(BaseLoader):
-    def __init__(self):
-        pass
+def extract_analysis_section(agent_outputs: str, header: str) -> str:
+    """Text of one agent's analysis section, or a note if that analysis is missing."""
+    if header not in agent_outputs:
+        return "Not available for this resume."
+    return agent_outputs.split(header, 1)[1].split("####")[0].strip()
 
-    def get_source(self, environment, template):
-        content = s3_storage.download_text(template)
-        if content is None:
-            raise TemplateNotFound(template)
-        return content, template, lambda: True
+def extract_score(agent_outputs: str, marker: str) -> float:
+    """First score following ``marker`` (e.g. "match score"), or 0 if it is missing."""
+    try:
+        return float(agent_outputs.split(marker)[1].split(":")[1].split()[0])
+    except (IndexError, ValueError):
+        return 0.0
 
 class LatexProcessor:
     def __init__(self, db: Session):
         self.db = db
-        self.env = Environment(
-            loader=S3TemplateLoader(),
-            block_start_string='[%',
-            block_end_string='%]',
-            variable_start_string='[[',
-            variable_end_string=']]',
-            comment_start_string='[#',
-            comment_end_string='#]',
-            trim_blocks=True,
-            autoescape=False,
-        )
+        # Compiled templates are shared by every processor in the process
+        self.env = template_registry.env
         self._load_templates()
 
     def _load_templates(self):
-        """Load templates from the database."""
+        """Load templates from the process-wide metadata cache (hits the database only on refresh)."""
         try:
-            self.templates = self.db.query(models.LatexTemplate).filter(models.LatexTemplate.is_active == True).all()
-            logger.info(f"Loaded {len(self.templates)} templates from the database")
+            self.templates = template_cache.all()
         except Exception as e:
             logger.error(f"Error loading templates from database: {str(e)}")
             self.templates = []
@@ -56,13 +52,14 @@ class LatexProcessor:
 
     def get_available_templates(self) -> list:
         """Return list of available templates."""
+        image_urls = s3_storage.generate_presigned_urls([t.image_path for t in self.templates if t.image_path])
         return [
             {
                 "id": str(t.id),
                 "name": t.name,
                 "description": t.description,
                 "file_path": t.file_path,
-                "image_path": s3_storage.generate_presigned_url(t.image_path) if t.image_path else None,
+                "image_path": image_urls.get(t.image_path) if t.image_path else None,
                 "is_default": t.is_default,
                 "single_page": t.single_page,
                 "is_active": t.is_active,
@@ -87,12 +84,12 @@ class LatexProcessor:
                 logger.warning(f"Could not load content for template {t.name}: {str(e)}")
         return templates_with_content
 
-    def get_template_info(self, template_id: str) -> models.LatexTemplate:
+    def get_template_info(self, template_id: str) -> TemplateInfo:
         """Get template metadata by ID."""
-        for template in self.templates:
-            if str(template.id) == template_id:
-                return template
-        raise ValueError(f"Template not found: {template_id}")
+        template = template_cache.by_id(template_id)
+        if template is None:
+            raise ValueError(f"Template not found: {template_id}")
+        return template
 
     def validate_template(self, template_id: str) -> bool:
         """Validate that template exists and is properly configured."""
@@ -100,15 +97,11 @@ class LatexProcessor:
         return True
 
     def get_default_template_id(self) -> str:
-        """Get the ID of the default template from the database."""
+        """Get the ID of the default template (or the first active one) from the metadata cache."""
         try:
-            default_template = self.db.query(models.LatexTemplate).filter(models.LatexTemplate.is_default == True, models.LatexTemplate.is_active == True).first()
+            default_template = template_cache.default()
             if default_template:
-                return str(default_template.id)
-            # Fallback to the first active template if no default is set
-            first_template = self.db.query(models.LatexTemplate).filter(models.LatexTemplate.is_active == True).first()
-            if first_template:
-                return str(first_template.id)
+                return default_template.id
             raise ValueError("No active templates found in the database")
         except Exception as e:
             logger.error(f"Error getting default template: {str(e)}")
@@ -561,16 +554,16 @@ class LatexProcessor:
         try:
             # Extract scores from agent outputs
             scores = {
-                'content_quality_score': float(agent_outputs.split("quality score")[1].split(":")[1].split()[0]),
-                'skills_match_score': float(agent_outputs.split("match score")[1].split(":")[1].split()[0]),
-                'experience_quality_score': float(agent_outputs.split("quality score")[1].split(":")[1].split()[0])
+                'content_quality_score': extract_score(agent_outputs, "quality score"),
+                'skills_match_score': extract_score(agent_outputs, "match score"),
+                'experience_quality_score': extract_score(agent_outputs, "quality score")
             }
             
-            # Extract analysis sections
+            # Extract analysis sections; an analysis that failed during generation is reported as missing
             analysis = {
-                'content_quality_analysis': agent_outputs.split("Content Quality Analysis:")[1].split("####")[0].strip(),
-                'skills_analysis': agent_outputs.split("Skills Analysis:")[1].split("####")[0].strip(),
-                'experience_analysis': agent_outputs.split("Experience Analysis:")[1].split("####")[0].strip()
+                'content_quality_analysis': extract_analysis_section(agent_outputs, "Content Quality Analysis:"),
+                'skills_analysis': extract_analysis_section(agent_outputs, "Skills Analysis:"),
+                'experience_analysis': extract_analysis_section(agent_outputs, "Experience Analysis:")
             }
             
             # Format usage statistics
@@ -599,67 +592,24 @@ class LatexProcessor:
                 with open(tex_path, 'w') as f:
                     f.write(latex_content)
 
-                # Compile LaTeX to PDF
-                original_dir = os.getcwd()
-                os.chdir(temp_dir)
+                # Compile LaTeX to PDF on the shared worker pool
+                pdf_path = compile_pool.compile(tex_path, engine='pdflatex', label=template_name)
 
-                try:
-                    # Verify required packages are installed
-                    package_check = subprocess.run(
-                        ['kpsewhich', 'fontawesome5.sty', 'lmodern.sty', 'hyperref.sty',
-                         'geometry.sty', 'titlesec.sty', 'fancyhdr.sty', 'ragged2e.sty'],
-                        capture_output=True,
-                        text=True
-                    )
-                    
-                    if package_check.returncode != 0:
-                        missing_packages = [pkg for pkg in package_check.stdout.split('\n') if not pkg]
-                        if missing_packages:
-                            raise Exception(f"Missing LaTeX packages: {', '.join(missing_packages)}")
-
-                    # Run pdflatex twice to resolve references
-                    for i in range(2):
-                        process = subprocess.run(
-                            ['pdflatex', '-interaction=nonstopmode', 'output.tex'],
-                            capture_output=True,
-                            text=True
-                        )
-                        
-                        # Write full LaTeX output to log file for debugging
-                        log_path = os.path.join(temp_dir, f'latex_output_{i}.log')
-                        with open(log_path, 'w') as log_file:
-                            log_file.write(f"STDOUT:\n{process.stdout}\n\nSTDERR:\n{process.stderr}")
-                        
-                        if process.returncode != 0:
-                            error_output = process.stderr if process.stderr else process.stdout
-                            logger.error(f"PDF compilation failed with output:\n{error_output}")
-                            logger.error(f"Full LaTeX output:\n{process.stdout}")
-                            # Include the log file path in the error message
-                            raise Exception(f"PDF compilation failed: {error_output}\nSee full log at: {log_path}")
-
-                    # Check if PDF was created
-                    pdf_path = os.path.join(temp_dir, 'output.pdf')
-                    if not os.path.exists(pdf_path):
-                        raise Exception("PDF file was not created")
-
-                    # Create output directory if it doesn't exist
-                    output_dir = Path(__file__).parent.parent / "output"
-                    output_dir.mkdir(exist_ok=True)
-
-                    # Generate unique filename
-                    timestamp = int(time.time())
-                    output_filename = f"{template_name.split('.')[0]}_{timestamp}.pdf"
-                    output_path = output_dir / output_filename
-
-                    # Copy PDF to output directory
-                    with open(pdf_path, 'rb') as src, open(output_path, 'wb') as dst:
-                        dst.write(src.read())
-
-                    logger.info(f"Successfully generated PDF at: {output_path}")
-                    return str(output_path)
-
-                finally:
-                    os.chdir(original_dir)
+                # Create output directory if it doesn't exist
+                output_dir = Path(__file__).parent.parent / "output"
+                output_dir.mkdir(exist_ok=True)
+
+                # Generate unique filename
+                timestamp = int(time.time())
+                output_filename = f"{template_name.split('.')[0]}_{timestamp}.pdf"
+                output_path = output_dir / output_filename
+
+                # Copy PDF to output directory
+                with open(pdf_path, 'rb') as src, open(output_path, 'wb') as dst:
+                    dst.write(src.read())
+
+                logger.info(f"Successfully generated PDF at: {output_path}")
+                return str(output_path)
 
         except Exception as e:
             logger.error(f"Error generating PDF: {str(e)}")
@@ -722,50 +672,52 @@ class LatexProcessor:
         This is a helper method used by the validation process.
         """
         try:
-            # Get directory and filename
-            tex_dir = os.path.dirname(tex_path)
-            tex_filename = os.path.basename(tex_path)
-            pdf_filename = tex_filename.replace('.tex', '.pdf')
-
-            # Change to the LaTeX file directory
-            original_dir = os.getcwd()
-            os.chdir(tex_dir)
-
-            try:
-                # Run xelatex twice to resolve references
-                for i in range(2):
-                    process = subprocess.run(
-                        ['xelatex', '-interaction=nonstopmode', tex_filename],
-                        capture_output=True,
-                        text=True
-                    )
-
-                    if process.returncode != 0:
-                        error_output = process.stderr if process.stderr else process.stdout
-                        logger.error(f"LaTeX compilation failed: {error_output}")
-                        raise Exception(f"LaTeX compilation failed: {error_output}")
-
-                # Check if PDF was created
-                pdf_path = os.path.join(tex_dir, pdf_filename)
-                if not os.path.exists(pdf_path):
-                    raise Exception("PDF file was not created")
-
-                return pdf_path
-
-            finally:
-                os.chdir(original_dir)
+            return compile_pool.compile(tex_path, engine='xelatex', label="validation")
 
         except Exception as e:
             logger.error(f"Error compiling LaTeX to PDF: {str(e)}")
             raise
 
+    def _output_path(self, content: dict, template_id: str, user_id: str) -> Path:
+        """Build a unique output path with user_id, timestamp and sanitized job title."""
+        # Create output directory if it doesn't exist
+        output_dir = Path(__file__).parent.parent / "output"
+        output_dir.mkdir(exist_ok=True)
+
+        timestamp = int(time.time())
+        safe_job_title = re.sub(r'[^\w\-_]', '_', content.get('job_title', 'generated'))
+        output_filename = f"{user_id.split(' ')[0]}_{safe_job_title}_{template_id}_resume_{timestamp}_.pdf"
+        return output_dir / output_filename
+
+    def _resume_pdf_result(self, output_path: Path, template_info: TemplateInfo) -> dict:
+        """Build the generate_resume_pdf result, checking single page overflow if the template requires it."""
+        overflow = False
+        message = ""
+
+        if template_info.single_page:
+            with open(output_path, 'rb') as f:
+                pdf = PdfReader(f)
+                if len(pdf.pages) > 1:
+                    overflow = True
+                    message = "Warning: Content exceeds single page limit for this template"
+                    logger.warning(message)
+
+        return {
+            'pdf_path': str(output_path),
+            'overflow': overflow,
+            'message': message
+        }
+
     # important
-    def generate_resume_pdf(self, content: dict, template_id: str = None, user_id: str = None) -> dict:
+    def generate_resume_pdf(self, content: dict, template_id: str = None, user_id: str = None,
+                            owner_id: str = None) -> dict:
         """Generate PDF resume from formatted content.
         
         Args:
             content: Formatted resume content
             template_id: ID of template to use (default: from config)
+            user_id: Name used in the output file name
+            owner_id: ID of the user the PDF belongs to; only owned PDFs are cached
             
         Returns:
             dict: {
@@ -784,101 +736,56 @@ class LatexProcessor:
             template_info = self.get_template_info(template_id)
             logger.info(f"Using template: {template_info.file_path} (ID: {template_id})")
             
+            # Identical content on an unchanged template always yields the same PDF
+            cache_key = pdf_cache.make_key(content, template_id, template_info.updated_at)
+            cached_pdf = pdf_cache.get(cache_key, owner_id)
+            if cached_pdf is not None:
+                logger.info(f"Serving cached PDF {cache_key} for template: {template_id}")
+                output_path = self._output_path(content, template_id, user_id)
+                with open(output_path, 'wb') as dst:
+                    dst.write(cached_pdf)
+                return self._resume_pdf_result(output_path, template_info)
+
             with tempfile.TemporaryDirectory() as temp_dir:
                 # Generate LaTeX content
-                template = self.env.get_template(template_info.file_path)
-                logger.info(f"Template content: {template.render(**content)[:200]}...")  # Log first 200 chars
+                template = template_registry.get_template(template_info.file_path, template_info.updated_at)
                 latex_content = template.render(**content)
+                logger.info(f"Template content: {latex_content[:200]}...")  # Log first 200 chars
 
                 # Debug: Write the generated LaTeX to a debug file
                 debug_path = os.path.join(temp_dir, 'resume_debug.tex')
                 with open(debug_path, 'w') as debug_file:
                     debug_file.write(latex_content)
 
+                # Use the template's precompiled preamble format when it has been built
+                prepared_content, fmt_name = format_cache.prepare(latex_content)
+
                 # Write LaTeX file
                 tex_path = os.path.join(temp_dir, 'resume.tex')
                 with open(tex_path, 'w') as f:
-                    f.write(latex_content)
-
-                # Compile LaTeX to PDF
-                original_dir = os.getcwd()
-                os.chdir(temp_dir)
+                    f.write(prepared_content)
 
+                # Compile LaTeX to PDF on the shared worker pool (xelatex is required for fontspec)
                 try:
-                    # Verify required packages are installed
-                    package_check = subprocess.run(
-                        ['kpsewhich', 'fontawesome5.sty', 'lmodern.sty', 'hyperref.sty',
-                         'geometry.sty', 'titlesec.sty', 'fancyhdr.sty', 'ragged2e.sty'],
-                        capture_output=True,
-                        text=True
-                    )
-                    
-                    if package_check.returncode != 0:
-                        missing_packages = [pkg for pkg in package_check.stdout.split('\n') if not pkg]
-                        if missing_packages:
-                            raise Exception(f"Missing LaTeX packages: {', '.join(missing_packages)}")
-
-                    # Run xelatex twice to resolve references (required for fontspec)
-                    for i in range(2):
-                        process = subprocess.run(
-                            ['xelatex', '-interaction=nonstopmode', 'resume.tex'],
-                            capture_output=True,
-                            text=True
-                        )
-                        
-                        # Write full LaTeX output to log file for debugging
-                        log_path = os.path.join(temp_dir, f'latex_output_{i}.log')
-                        with open(log_path, 'w') as log_file:
-                            log_file.write(f"STDOUT:\n{process.stdout}\n\nSTDERR:\n{process.stderr}")
-                        
-                        if process.returncode != 0:
-                            error_output = process.stderr if process.stderr else process.stdout
-                            logger.error(f"PDF compilation failed with output:\n{error_output}")
-                            # logger.error(f"Full LaTeX output:\n{process.stdout}")
-                            # Include the log file path in the error message
-                            raise Exception(f"PDF compilation failed: {error_output}\nSee full log at: {log_path}")
-
-                    # Check if PDF was created
-                    pdf_path = os.path.join(temp_dir, 'resume.pdf')
-                    if not os.path.exists(pdf_path):
-                        raise Exception("PDF file was not created")
-
-                    # Create output directory if it doesn't exist
-                    output_dir = Path(__file__).parent.parent / "output"
-                    output_dir.mkdir(exist_ok=True)
-
-                    # Copy PDF to output directory
-                    # Generate unique filename with user_id, timestamp and sanitized job title
-                    timestamp = int(time.time())
-                    safe_job_title = re.sub(r'[^\w\-_]', '_', content.get('job_title', 'generated'))
-                    output_filename = f"{user_id.split(' ')[0]}_{safe_job_title}_{template_id}_resume_{timestamp}_.pdf"
-                    output_path = output_dir / output_filename
-                    with open(pdf_path, 'rb') as src, open(output_path, 'wb') as dst:
-                        dst.write(src.read())
-
-                    logger.info(f"Successfully generated PDF resume at: {output_path} using template: {template_id}")
-                    
-                    # Check for single page overflow if template requires it
-                    template_info = self.get_template_info(template_id)
-                    overflow = False
-                    message = ""
-                    
-                    if template_info.single_page:
-                        with open(pdf_path, 'rb') as f:
-                            pdf = PdfReader(f)
-                            if len(pdf.pages) > 1:
-                                overflow = True
-                                message = "Warning: Content exceeds single page limit for this template"
-                                logger.warning(message)
-                    
-                    return {
-                        'pdf_path': str(output_path),
-                        'overflow': overflow,
-                        'message': message
-                    }
-
-                finally:
-                    os.chdir(original_dir)
+                    pdf_path = compile_pool.compile(tex_path, engine='xelatex', fmt=fmt_name, label=template_info.name)
+                except LatexCompileError:
+                    if not fmt_name:
+                        raise
+                    # A stale or broken format must never fail a request, retry from the full source
+                    logger.warning(f"Compile with format {fmt_name} failed, retrying without it")
+                    with open(tex_path, 'w') as f:
+                        f.write(latex_content)
+                    pdf_path = compile_pool.compile(tex_path, engine='xelatex', label=template_info.name)
+
+                pdf_cache.put(cache_key, pdf_path, owner_id)
+
+                # Copy PDF to output directory
+                output_path = self._output_path(content, template_id, user_id)
+                with open(pdf_path, 'rb') as src, open(output_path, 'wb') as dst:
+                    dst.write(src.read())
+
+                logger.info(f"Successfully generated PDF resume at: {output_path} using template: {template_id}")
+                return self._resume_pdf_result(output_path, template_info)
 
         except Exception as e:
             logger.error(f"Error generating PDF: {str(e)}")
@@ -935,47 +842,24 @@ class StagingTemplateProcessor(LatexProcessor):
                 with open(tex_path, 'w') as f:
                     f.write(latex_content)
 
-                # Compile LaTeX to PDF
-                original_dir = os.getcwd()
-                os.chdir(temp_dir)
+                # Compile LaTeX to PDF on the shared worker pool
+                pdf_path = compile_pool.compile(tex_path, engine='xelatex', label=f"staging:{staging_template.name}")
 
-                try:
-                    # Run xelatex twice to resolve references
-                    for i in range(2):
-                        process = subprocess.run(
-                            ['xelatex', '-interaction=nonstopmode', 'staging_preview.tex'],
-                            capture_output=True,
-                            text=True
-                        )
-                        
-                        if process.returncode != 0:
-                            error_output = process.stderr if process.stderr else process.stdout
-                            logger.error(f"PDF compilation failed: {error_output}")
-                            raise Exception(f"PDF compilation failed: {error_output}")
-
-                    # Check if PDF was created
-                    pdf_path = os.path.join(temp_dir, 'staging_preview.pdf')
-                    if not os.path.exists(pdf_path):
-                        raise Exception("PDF file was not created")
-
-                    # Create output directory if it doesn't exist
-                    output_dir = Path(__file__).parent.parent / "output"
-                    output_dir.mkdir(exist_ok=True)
-
-                    # Generate unique filename
-                    timestamp = int(time.time())
-                    output_filename = f"staging_{staging_template.name}_{timestamp}.pdf"
-                    output_path = output_dir / output_filename
-
-                    # Copy PDF to output directory
-                    with open(pdf_path, 'rb') as src, open(output_path, 'wb') as dst:
-                        dst.write(src.read())
-
-                    logger.info(f"Successfully generated staging PDF at: {output_path}")
-                    return str(output_path)
-
-                finally:
-                    os.chdir(original_dir)
+                # Create output directory if it doesn't exist
+                output_dir = Path(__file__).parent.parent / "output"
+                output_dir.mkdir(exist_ok=True)
+
+                # Generate unique filename
+                timestamp = int(time.time())
+                output_filename = f"staging_{staging_template.name}_{timestamp}.pdf"
+                output_path = output_dir / output_filename
+
+                # Copy PDF to output directory
+                with open(pdf_path, 'rb') as src, open(output_path, 'wb') as dst:
+                    dst.write(src.read())
+
+                logger.info(f"Successfully generated staging PDF at: {output_path}")
+                return str(output_path)
 
         except Exception as e:
             logger.error(f"Error generating staging PDF: {str(e)}")
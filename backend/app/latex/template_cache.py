@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import threading
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "latex_templates:invalidate"
+
+
+@dataclass(frozen=True)
+class TemplateInfo:
+    """Detached, read-only copy of an active LatexTemplate row."""
+    id: str
+    name: str
+    description: Optional[str]
+    file_path: str
+    image_path: Optional[str]
+    is_default: bool
+    single_page: bool
+    is_active: bool
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+class TemplateMetadataCache:
+    """Thread-safe, process-wide snapshot of active template metadata.
+
+    The snapshot is loaded once, reloaded after ``TEMPLATE_METADATA_TTL``
+    seconds, and dropped immediately when an invalidation message arrives on
+    the Redis channel the admin template endpoints publish to, so every
+    replica picks up template changes without polling the database per request.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("TEMPLATE_METADATA_TTL", 300))
+        self._lock = threading.Lock()
+        self._by_id: Dict[str, TemplateInfo] = {}
+        self._by_name: Dict[str, TemplateInfo] = {}
+        self._ordered: List[TemplateInfo] = []
+        self._default: Optional[TemplateInfo] = None
+        self._loaded_at: Optional[float] = None
+        # Bumped on every reload so derived caches (e.g. the template listing) can key on it
+        self.version = 0
+        self._subscriber: Optional[threading.Thread] = None
+
+    def all(self) -> List[TemplateInfo]:
+        """Return all active templates in creation order."""
+        self._ensure_fresh()
+        return list(self._ordered)
+
+    def by_id(self, template_id: str) -> Optional[TemplateInfo]:
+        self._ensure_fresh()
+        return self._by_id.get(str(template_id))
+
+    def by_name(self, name: str) -> Optional[TemplateInfo]:
+        self._ensure_fresh()
+        return self._by_name.get(name)
+
+    def default(self) -> Optional[TemplateInfo]:
+        """Return the default active template, falling back to the first active one."""
+        self._ensure_fresh()
+        return self._default
+
+    def invalidate(self):
+        """Drop the local snapshot so the next lookup reloads it."""
+        with self._lock:
+            self._loaded_at = None
+
+    def notify_changed(self, *file_paths: Optional[str]):
+        """Invalidate template caches in this process and on every other replica.
+
+        :param file_paths: S3 keys of templates whose source changed, if any.
+        """
+        from .template_registry import template_registry
+
+        paths = [p for p in file_paths if p]
+        self.invalidate()
+        for path in paths:
+            template_registry.invalidate(path)
+        try:
+            from ..database import get_redis
+            get_redis().publish(INVALIDATION_CHANNEL, json.dumps({"file_paths": paths}))
+        except Exception as e:
+            # Other replicas still converge on the TTL
+            logger.warning(f"Could not publish template invalidation: {str(e)}")
+
+    def start_listener(self):
+        """Subscribe to invalidation messages on a background thread (idempotent)."""
+        if self._subscriber is not None:
+            return
+        self._subscriber = threading.Thread(target=self._listen, name="template-invalidation", daemon=True)
+        self._subscriber.start()
+
+    def _listen(self):
+        from ..database import get_redis
+        from .template_registry import template_registry
+
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    self.invalidate()
+                    try:
+                        paths = json.loads(message["data"]).get("file_paths", [])
+                    except (ValueError, AttributeError):
+                        paths = []
+                    for path in paths:
+                        template_registry.invalidate(path)
+                    logger.info("Template caches invalidated by admin change")
+            except Exception as e:
+                logger.warning(f"Template invalidation listener error, reconnecting: {str(e)}")
+                time.sleep(5)
+
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+            return
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            try:
+                self._load()
+            except Exception as e:
+                if not self._ordered:
+                    raise
+                # Keep serving the last good snapshot rather than failing requests
+                logger.error(f"Error reloading template metadata, keeping previous snapshot: {str(e)}")
+                self._loaded_at = time.monotonic()
+
+    def _load(self):
+        from ..database import SessionLocal
+        from .. import models
+
+        db = SessionLocal()
+        try:
+            rows = db.query(models.LatexTemplate).filter(
+                models.LatexTemplate.is_active == True
+            ).order_by(models.LatexTemplate.created_at).all()
+            templates = [
+                TemplateInfo(
+                    id=str(t.id),
+                    name=t.name,
+                    description=t.description,
+                    file_path=t.file_path,
+                    image_path=t.image_path,
+                    is_default=t.is_default,
+                    single_page=t.single_page,
+                    is_active=t.is_active,
+                    created_at=t.created_at,
+                    updated_at=t.updated_at,
+                )
+                for t in rows
+            ]
+        finally:
+            db.close()
+
+        self._ordered = templates
+        self._by_id = {t.id: t for t in templates}
+        self._by_name = {t.name: t for t in templates}
+        self._default = next((t for t in templates if t.is_default), templates[0] if templates else None)
+        self._loaded_at = time.monotonic()
+        self.version += 1
+        logger.info(f"Loaded {len(templates)} templates into the metadata cache")
+
+
+template_cache = TemplateMetadataCache()
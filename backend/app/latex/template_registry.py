@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from jinja2 import Environment, BaseLoader, TemplateNotFound, Template
+
+from ..utils.s3_storage import s3_storage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TemplateSource:
+    source: str
+    etag: Optional[str]
+    updated_at: Optional[datetime]
+    checked_at: float
+
+
+class S3TemplateLoader(BaseLoader):
+    """Loads template sources through the registry instead of hitting S3 directly.
+
+    The uptodate callback lets Jinja keep the compiled template until the
+    registry decides the S3 object changed.
+    """
+
+    def __init__(self, registry: "TemplateRegistry"):
+        self.registry = registry
+
+    def get_source(self, environment, template):
+        entry = self.registry.fetch(template)
+        if entry is None:
+            raise TemplateNotFound(template)
+        return entry.source, template, lambda: self.registry.is_current(template, entry)
+
+
+class TemplateRegistry:
+    """Process-wide store of compiled Jinja templates backed by S3.
+
+    Sources are revalidated at most every ``TEMPLATE_REVALIDATE_SECONDS`` with a
+    conditional (ETag) GET, immediately when the template row's ``updated_at``
+    moves forward, and whenever an admin change calls ``invalidate``.
+    """
+
+    def __init__(self, revalidate_seconds: Optional[float] = None):
+        self.revalidate_seconds = revalidate_seconds if revalidate_seconds is not None else float(
+            os.getenv("TEMPLATE_REVALIDATE_SECONDS", 300)
+        )
+        self._sources: Dict[str, TemplateSource] = {}
+        self._lock = threading.Lock()
+        self.env = Environment(
+            loader=S3TemplateLoader(self),
+            block_start_string='[%',
+            block_end_string='%]',
+            variable_start_string='[[',
+            variable_end_string=']]',
+            comment_start_string='[#',
+            comment_end_string='#]',
+            trim_blocks=True,
+            autoescape=False,
+            auto_reload=True,
+            cache_size=int(os.getenv("TEMPLATE_CACHE_SIZE", 400)),
+        )
+
+    def get_template(self, file_path: str, updated_at: Optional[datetime] = None) -> Template:
+        """Return the compiled template for an S3 key.
+
+        :param file_path: S3 key of the template.
+        :param updated_at: updated_at of the template row; a newer value forces a reload.
+        """
+        entry = self._sources.get(file_path)
+        if entry is not None and updated_at is not None and (entry.updated_at is None or updated_at > entry.updated_at):
+            self.invalidate(file_path)
+        template = self.env.get_template(file_path)
+        if updated_at is not None:
+            entry = self._sources.get(file_path)
+            if entry is not None:
+                entry.updated_at = updated_at
+        return template
+
+    def fetch(self, file_path: str) -> Optional[TemplateSource]:
+        """Return the current source for a template, downloading it only if it changed.
+
+        Returns None only when the object no longer exists; S3 errors propagate so
+        ``is_current`` can keep serving the compiled template through them.
+        """
+        with self._lock:
+            entry = self._sources.get(file_path)
+        content, etag = s3_storage.download_text_if_changed(file_path, entry.etag if entry else None)
+        if content is None:
+            if entry is not None and etag is not None:
+                # Not modified since we last saw it
+                entry.checked_at = time.monotonic()
+                return entry
+            return None
+
+        new_entry = TemplateSource(
+            source=content,
+            etag=etag,
+            updated_at=entry.updated_at if entry else None,
+            checked_at=time.monotonic()
+        )
+        with self._lock:
+            self._sources[file_path] = new_entry
+        return new_entry
+
+    def is_current(self, file_path: str, entry: TemplateSource) -> bool:
+        """Jinja uptodate check: cheap while fresh, conditional GET once the TTL has passed."""
+        current = self._sources.get(file_path)
+        if current is not entry:
+            return False
+        if time.monotonic() - entry.checked_at < self.revalidate_seconds:
+            return True
+        try:
+            fresh = self.fetch(file_path)
+        except Exception as e:
+            # Keep serving the compiled template if S3 is unreachable or returns an error
+            logger.warning(f"Could not revalidate template {file_path}: {str(e)}")
+            entry.checked_at = time.monotonic()
+            return True
+        return fresh is entry
+
+    def invalidate(self, file_path: Optional[str] = None):
+        """Drop one template (or all of them) so the next use reloads from S3."""
+        with self._lock:
+            if file_path is None:
+                self._sources.clear()
+            else:
+                self._sources.pop(file_path, None)
+        if file_path is None:
+            self.env.cache.clear()
+        logger.info(f"Invalidated template cache for {file_path or 'all templates'}")
+
+    def warm(self, templates: Iterable):
+        """Download and compile a batch of templates, e.g. all active ones at startup.
+
+        :param templates: LatexTemplate rows (anything with file_path and updated_at).
+        """
+        loaded = 0
+        for template in templates:
+            if not template.file_path:
+                continue
+            try:
+                self.get_template(template.file_path, template.updated_at)
+                loaded += 1
+            except Exception as e:
+                logger.warning(f"Could not warm template {template.file_path}: {str(e)}")
+        logger.info(f"Warmed {loaded} templates into the template registry")
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of cached template sources."""
+        return {"templates": len(self._sources)}
+
+
+template_registry = TemplateRegistry()
@@ -5,9 +5,9 @@ from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, sta
 from pydantic import BaseModel
 import sqlalchemy.exc
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordRequestForm
-import groq
 import stripe
 from .database import get_redis
 from typing import Optional, Tuple, List
@@ -17,12 +17,21 @@ import time
 from dotenv import load_dotenv
 import logging
 import json
+import base64
+import hashlib
 import traceback
 import re
 from pathlib import Path
 from datetime import timedelta
+from sqlalchemy import or_, tuple_
 from sqlalchemy.orm import Session
 from .latex.processor import LatexProcessor
+from .latex.compile_pool import compile_pool, CompileQueueFullError
+from .latex.format_cache import format_cache
+from .latex.pdf_cache import pdf_cache
+from .latex.template_registry import template_registry
+from .latex.template_cache import template_cache
+from .utils.s3_storage import s3_storage
 from .database import *
 from . import models, schemas
 from .utils.auth import (
@@ -33,6 +42,9 @@ from .utils.auth import (
     get_current_user,
     get_current_admin_user,
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    STREAM_TOKEN_EXPIRE_SECONDS,
+    create_stream_token,
+    verify_stream_token,
     verify_token
 )
 from .database import (
@@ -40,7 +52,10 @@ from .database import (
     get_generation_status,
     save_generation_result,
     get_generation_result,
+    generation_result_artifacts,
     cleanup_generation_cache,
+    save_generation_owner,
+    get_generation_owner,
     generate_uuid
 )
 from .utils.linkedin_oauth import linkedin_oauth
@@ -88,8 +103,15 @@ api_key = os.getenv("GROQ_API_KEY")
 model_name = os.getenv("GROQ_MODEL")
 isProd = os.getenv("PROD_MODE")
 
-# Initialize Groq client
-groq_client = groq.Groq(api_key=api_key)
+# Shared LLM clients, created lazily so rendering-only paths never touch Groq
+from .utils.llm_clients import llm_clients
+from .utils.async_llm import async_llm
+from .utils.llm_cache import llm_cache
+from .utils.rate_limiter import rate_limiter
+from .utils.provider_router import provider_router
+from .utils.job_queue import generation_queue, QueueFullError
+from .utils.s3_cleanup import s3_cleanup_queue, resume_s3_keys
+from .utils.generation_events import generation_events
 
 app = FastAPI()
 
@@ -100,6 +122,29 @@ app.include_router(admin_templates.router, prefix="/api/admin", tags=["admin"])
 output_dir = Path(__file__).parent / "output"
 output_dir.mkdir(exist_ok=True, parents=True)
 
+@app.on_event("startup")
+def start_background_services():
+    """Start process-wide workers shared by all requests."""
+    compile_pool.start()
+    llm_clients.start_health_probe()
+
+    # Compile every active template and its preamble format before traffic arrives
+    template_cache.start_listener()
+    try:
+        active_templates = template_cache.all()
+        template_registry.warm(active_templates)
+        for template in active_templates:
+            format_cache.schedule_template_build(file_path=template.file_path)
+    except Exception as e:
+        logger.warning(f"Could not warm active templates: {str(e)}")
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    """Stop process-wide workers."""
+    compile_pool.shutdown()
+    llm_clients.stop_health_probe()
+    await async_llm.aclose()
+
 # Enable CORS
 app.add_middleware(
     CORSMiddleware,
@@ -107,6 +152,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Authentication endpoints
@@ -554,7 +600,7 @@ async def upload_resume(
                 
                 # Step 2: Use Groq parser to get structured data
                 groq_parser = GroqResumeParser()
-                structured_data = groq_parser.parse_resume(resume_text)
+                structured_data = await groq_parser.parse_resume(resume_text)
 
                 if not structured_data:
                     raise HTTPException(
@@ -812,7 +858,8 @@ async def admin_delete_user(
         
         return {
             "message": "User and all associated data deleted successfully",
-            "deletion_summary": deletion_result
+            "deletion_summary": deletion_result,
+            "s3_cleanup_url": f"/api/admin/s3-cleanup/{deletion_result['s3_cleanup_job_id']}" if deletion_result.get("s3_cleanup_job_id") else None
         }
         
     except HTTPException:
@@ -824,6 +871,20 @@ async def admin_delete_user(
             detail=f"Error deleting user: {str(e)}"
         )
 
+@app.get("/api/admin/s3-cleanup/{job_id}")
+async def admin_get_s3_cleanup_progress(
+    job_id: str,
+    current_admin: models.User = Depends(get_current_admin_user)
+):
+    """Get the progress of a background S3 deletion job (admin only)"""
+    progress = s3_cleanup_queue.progress(job_id)
+    if not progress:
+        raise HTTPException(
+            status_code=404,
+            detail="S3 cleanup job not found or expired"
+        )
+    return progress
+
 @app.post("/api/admin/users/credits")
 async def admin_update_user_credits(
     credit_update: schemas.UserCreditUpdate,
@@ -903,6 +964,10 @@ async def admin_add_template(
         db.add(new_template)
         db.commit()
         db.refresh(new_template)
+        template_cache.notify_changed(template_s3_key)
+
+        if is_active:
+            format_cache.schedule_template_build(source=template_file_content.decode('utf-8', errors='replace'))
         
         return {"message": "Template added successfully", "template": new_template}
     except Exception as e:
@@ -941,10 +1006,12 @@ async def admin_update_template(
         db_template.is_active = is_active
 
         # Handle file updates if new files are provided
+        changed_paths = []
         if template_file:
             template_file_content = await template_file.read()
             template_s3_key = f"latex_templates/{template_file.filename}"
             s3_storage.upload_file(template_file_content, template_s3_key, "application/x-tex")
+            changed_paths.extend([db_template.file_path, template_s3_key])
             db_template.file_path = template_s3_key
         
         if image_file:
@@ -955,6 +1022,10 @@ async def admin_update_template(
 
         db.commit()
         db.refresh(db_template)
+        template_cache.notify_changed(*changed_paths)
+
+        if db_template.is_active:
+            format_cache.schedule_template_build(file_path=db_template.file_path)
         
         return db_template
     except Exception as e:
@@ -985,8 +1056,10 @@ async def admin_delete_template(
             s3_storage.delete_file(db_template.image_path)
 
         # Delete from database
+        deleted_file_path = db_template.file_path
         db.delete(db_template)
         db.commit()
+        template_cache.notify_changed(deleted_file_path)
         
         return {"message": "Template deleted successfully"}
     except Exception as e:
@@ -996,6 +1069,32 @@ async def admin_delete_template(
             detail=f"Error deleting template: {str(e)}"
         )
 
+@app.get("/api/admin/latex/compile-stats")
+async def admin_get_compile_stats(
+    current_admin: models.User = Depends(get_current_admin_user)
+):
+    """Get LaTeX compile pool utilisation, per-template pass counts and PDF cache stats (admin only)"""
+    return {
+        "pool": compile_pool.stats(),
+        "passes": compile_pool.pass_stats(),
+        "pdf_cache": pdf_cache.stats(),
+        "llm_health": llm_clients.health(),
+        "redis_pool": redis_pool_stats(),
+        "generation_queue": generation_queue.stats(),
+        "s3_cleanup": s3_cleanup_queue.stats(),
+        "generation_streams": generation_events.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_rate_limits": rate_limiter.stats(),
+        "llm_routes": provider_router.stats()
+    }
+
+@app.get("/api/admin/metrics/db")
+async def admin_get_db_metrics(
+    current_admin: models.User = Depends(get_current_admin_user)
+):
+    """Get database session and connection pool metrics for this replica (admin only)"""
+    return get_db_metrics()
+
 @app.get("/api/admin/analytics")
 async def admin_get_analytics(
     current_admin: models.User = Depends(get_current_admin_user),
@@ -1038,13 +1137,39 @@ async def admin_get_analytics(
 # Resume generation endpoints
 from typing import List, Optional
 
+# Serialized /api/templates response, rebuilt when template metadata reloads or the preview URLs near expiry
+_templates_listing_cache = {"version": None, "expires_at": 0.0, "body": None, "etag": None}
+
+def get_templates_listing(db: Session) -> Tuple[bytes, str]:
+    """Return the cached templates listing body and its ETag."""
+    template_cache.all()  # reload metadata first if it is stale, so the version below is current
+    template_version = template_cache.version
+    cached = _templates_listing_cache
+    if cached["body"] is not None and cached["version"] == template_version and cached["expires_at"] > time.time():
+        return cached["body"], cached["etag"]
+
+    latex_processor = LatexProcessor(db)
+    templates = latex_processor.get_available_templates()
+    body = json.dumps(jsonable_encoder({"templates": templates})).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    _templates_listing_cache.update({
+        # Presigned preview URLs in the body must stay valid for as long as it is served
+        "version": template_version,
+        "expires_at": time.time() + s3_storage.presigned_urls_valid_for(),
+        "body": body,
+        "etag": etag
+    })
+    return body, etag
+
 @app.get("/api/templates")
-async def get_templates(db: Session = Depends(get_db)):
+async def get_templates(request: Request, db: Session = Depends(get_db)):
     """Get list of available resume templates"""
     try:
-        latex_processor = LatexProcessor(db)
-        templates = latex_processor.get_available_templates()
-        return {"templates": templates}
+        body, etag = get_templates_listing(db)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
     except Exception as e:
         logger.error(f"Error getting templates: {str(e)}")
         raise HTTPException(
@@ -1086,7 +1211,8 @@ async def generate_pdf_endpoint(
             personal_info=personal_info,
             job_title=resume_data.get('job_title', 'Resume'),
             format='pdf',
-            template_id=template_id
+            template_id=template_id,
+            owner_id=str(current_user.id)
         )
         
         # Handle both tuple (path, usage) and dict return formats
@@ -1104,6 +1230,11 @@ async def generate_pdf_endpoint(
         pdf_url = f"/download-resume/{os.path.basename(pdf_path)}"
         return {"pdf_url": pdf_url}
         
+    except CompileQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error generating PDF: {str(e)}")
         raise HTTPException(
@@ -1309,10 +1440,10 @@ async def read_job_description(job_description: UploadFile) -> str:
             detail=f"Error reading job description file: {str(e)}"
         )
 
-def extract_job_title(text: str) -> str:
+async def extract_job_title(text: str) -> str:
     """Extract job title from job description using Groq."""
     try:
-        completion = groq_client.chat.completions.create(
+        completion = await async_llm.chat(
             messages=[
                 {"role": "system", "content": "You are a an expert recruiter. Extract only the main job title/role from the given job description. Return only the title, nothing else."},
                 {"role": "user", "content": f"Extract the main job title from this job description:\n\n{text}"}
@@ -1321,7 +1452,7 @@ def extract_job_title(text: str) -> str:
             temperature=0.7,
             max_tokens=30
         )
-        job_title = completion.choices[0].message.content.strip() # type: ignore
+        job_title = completion.content.strip()
         # Clean up the job title
         job_title = re.sub(r'[^\w\s-]', '', job_title)
         job_title = job_title.replace(' ', '-').lower()
@@ -1330,39 +1461,79 @@ def extract_job_title(text: str) -> str:
         logger.error(f"Error extracting job title: {str(e)}")
         return "Ambiguous_job_title"
 
-def save_company_name_to_cache(job_id: str, company_name: str, expiration: int = 1800):
-    """Save company name to Redis cache."""
-    redis_client = get_redis()
-    if redis_client:
-        redis_client.setex(f"company_name:{job_id}", expiration, company_name)
-
-def get_company_name_from_cache(job_id: str) -> Optional[str]:
-    """Retrieve company name from Redis cache."""
-    redis_client = get_redis()
-    if redis_client:
-        company_name = redis_client.get(f"company_name:{job_id}")
-        if company_name:
-            return company_name.decode('utf-8')
-    return None
+RESUMES_PAGE_DEFAULT = 20
+RESUMES_PAGE_MAX = 100
+
+def _encode_resume_cursor(created_at: datetime, resume_id) -> str:
+    raw = f"{created_at.isoformat()}|{resume_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_resume_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Position after which the next page starts; raises ValueError if the cursor is malformed"""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    created_at, resume_id = raw.split("|", 1)
+    return datetime.fromisoformat(created_at), UUID(resume_id)
 
 @app.get("/api/resumes")
 async def get_resumes(
+    request: Request,
+    limit: int = RESUMES_PAGE_DEFAULT,
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's resume history"""
+    """Get user's resume history, newest first.
+
+    Keyset-paginated on (created_at, id): pass the X-Next-Cursor header of
+    a page as ``cursor`` to get the next one. ``q`` filters by company name
+    or job title. Responses carry an ETag and honour If-None-Match.
+    """
     if not current_user.profile:
         raise HTTPException(
             status_code=404,
             detail="Profile not found"
         )
+    limit = max(1, min(limit, RESUMES_PAGE_MAX))
+    
+    # Only the listed columns; the content fallback column can be large
+    query = db.query(
+        models.Resume.id,
+        models.Resume.name,
+        models.Resume.version,
+        models.Resume.created_at,
+        models.Resume.status,
+        models.Resume.company_name,
+        models.Resume.job_title
+    ).filter(models.Resume.profile_id == current_user.profile.id)
+    
+    if q and q.strip():
+        pattern = "%" + re.sub(r"([\\%_])", r"\\\1", q.strip()) + "%"
+        query = query.filter(or_(
+            models.Resume.company_name.ilike(pattern, escape="\\"),
+            models.Resume.job_title.ilike(pattern, escape="\\")
+        ))
+    
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = _decode_resume_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid cursor"
+            )
+        query = query.filter(
+            tuple_(models.Resume.created_at, models.Resume.id) < tuple_(cursor_created_at, cursor_id)
+        )
     
-    resumes = db.query(models.Resume)\
-        .filter(models.Resume.profile_id == current_user.profile.id)\
-        .order_by(models.Resume.created_at.desc())\
+    # One extra row tells whether there is a next page
+    rows = query\
+        .order_by(models.Resume.created_at.desc(), models.Resume.id.desc())\
+        .limit(limit + 1)\
         .all()
     
-    return [
+    page = rows[:limit]
+    resumes = [
         {
             "id": str(resume.id),
             "name": resume.name,
@@ -1372,8 +1543,17 @@ async def get_resumes(
             "company_name": resume.company_name,
             "job_title": resume.job_title
         }
-        for resume in resumes
+        for resume in page
     ]
+    
+    body = json.dumps(resumes).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if len(rows) > limit:
+        headers["X-Next-Cursor"] = _encode_resume_cursor(page[-1].created_at, page[-1].id)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 from uuid import UUID
 
@@ -1398,7 +1578,7 @@ async def get_resume(
     if resume.content_s3_key:
         try:
             from .utils.s3_storage import s3_storage
-            s3_content = s3_storage.download_text(resume.content_s3_key)
+            s3_content = await s3_storage.download_text_async(resume.content_s3_key)
             if s3_content:
                 content = s3_content
                 logger.info(f"Retrieved resume content from S3 for resume {resume_id}")
@@ -1445,7 +1625,7 @@ async def update_resume_content(
         if resume.content_s3_key:
             try:
                 from .utils.s3_storage import s3_storage
-                s3_update_success = s3_storage.upload_text(content_update.content, resume.content_s3_key)
+                s3_update_success = await s3_storage.upload_text_async(content_update.content, resume.content_s3_key)
                 if s3_update_success:
                     logger.info(f"Successfully updated resume content in S3 for resume {resume_id}")
                 else:
@@ -1503,22 +1683,13 @@ async def delete_resume_by_id(
             detail="Resume not found"
         )
     
-    # Delete from S3 if S3 key exists
-    if resume.content_s3_key:
-        try:
-            from .utils.s3_storage import s3_storage
-            s3_delete_success = s3_storage.delete_file(resume.content_s3_key)
-            if s3_delete_success:
-                logger.info(f"Successfully deleted resume content from S3 for resume {resume_id}")
-            else:
-                logger.warning(f"Failed to delete resume content from S3 for resume {resume_id}")
-        except Exception as s3_error:
-            logger.error(f"Error deleting content from S3 for resume {resume_id}: {str(s3_error)}")
-            # Continue with DB deletion even if S3 deletion fails
-    
-    # Delete from database
+    # Delete from database, then hand its S3 content and artifacts to the cleanup worker
+    s3_keys = resume_s3_keys(resume)
     db.delete(resume)
     db.commit()
+    # Cached PDFs are keyed by content, not by resume, so all of the user's go with it
+    s3_keys.extend(pdf_cache.purge_owner(str(current_user.id)))
+    s3_cleanup_queue.enqueue(s3_keys, f"delete resume {resume_id}")
     return {"message": "Resume deleted successfully"}
 
 @app.delete("/resumes/{resume_id}")
@@ -1540,7 +1711,7 @@ async def parse_resume_with_groq(
     """Parse resume text using Groq AI and return structured data"""
     try:
         parser = GroqResumeParser()
-        parsed_data = parser.parse_resume(request.resume_text)
+        parsed_data = await parser.parse_resume(request.resume_text)
         return parsed_data
     except Exception as e:
         logger.error(f"Error parsing resume with Groq: {str(e)}")
@@ -2021,10 +2192,174 @@ async def get_generation_status_endpoint(
             detail=f"Error getting generation status: {str(e)}"
         )
 
+GENERATION_EVENTS_KEEPALIVE = 15
+
+def _sse_message(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _partial_from(job_id: str, data: dict, sent: int) -> Optional[dict]:
+    """The part of a streamed-text event a client that has ``sent`` characters still needs.
+
+    Fills a gap (events dropped by a full queue or a reconnect) from the
+    accumulated copy in Redis; returns None if the client already has it all.
+    """
+    offset, delta, done = data["offset"], data["delta"], data.get("done", False)
+    if offset > sent:
+        # The accumulated copy is appended before each event is published, so it covers this delta too
+        return {"offset": sent, "delta": get_generation_partial(job_id, sent), "done": done}
+    if offset + len(delta) <= sent and not done:
+        return None
+    return {"offset": sent, "delta": delta[sent - offset:], "done": done}
+
+@app.post("/api/generation-events/{job_id}/token")
+async def generation_events_token_endpoint(
+    job_id: str,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Issue a short-lived token that opens the event stream of one of the user's generation jobs."""
+    if get_generation_owner(job_id) != str(current_user.id):
+        raise HTTPException(
+            status_code=404,
+            detail="Generation job not found or expired"
+        )
+    return {
+        "token": create_stream_token(current_user.email, current_user.id, job_id),
+        "expires_in": STREAM_TOKEN_EXPIRE_SECONDS
+    }
+
+@app.get("/api/generation-events/{job_id}")
+async def generation_events_endpoint(job_id: str, token: str, request: Request):
+    """Stream status updates, partial agent outputs and the final result of a generation job.
+
+    Server-Sent Events. EventSource cannot set an Authorization header, so the
+    token comes in the query string; it is a short-lived token scoped to this
+    job (from the token endpoint above), never the session token, since URLs
+    end up in access logs.
+    """
+    user_id = verify_stream_token(token, job_id)
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+    if get_generation_owner(job_id) != user_id:
+        raise HTTPException(
+            status_code=404,
+            detail="Generation job not found or expired"
+        )
+
+    # Subscribe (and wait for Redis to confirm it) before reading the current state,
+    # so no update falls in between
+    queue = await generation_events.subscribe(job_id)
+    status_data = get_generation_status(job_id)
+    if not status_data:
+        generation_events.unsubscribe(job_id, queue)
+        raise HTTPException(
+            status_code=404,
+            detail="Generation job not found or expired"
+        )
+
+    async def event_stream():
+        try:
+            current = status_data
+            yield _sse_message("status", current)
+            # Resume text streamed before this client connected, then only deltas from `sent` on
+            sent = 0
+            if current["status"] == "constructing":
+                snapshot = get_generation_partial(job_id)
+                if snapshot:
+                    yield _sse_message("partial", {"offset": 0, "delta": snapshot, "done": False})
+                    sent = len(snapshot)
+            while current["status"] not in ("completed", "failed"):
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=GENERATION_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Events published while the subscription reconnected are lost; re-read
+                    # the state so a missed terminal status still ends the stream
+                    latest = get_generation_status(job_id)
+                    if latest is None:
+                        return
+                    if latest["status"] != current["status"] or latest["progress"] != current["progress"]:
+                        current = latest
+                        yield _sse_message("status", current)
+                    else:
+                        yield ": keep-alive\n\n"
+                    continue
+                if event.get("event") == "partial_reset":
+                    sent = 0
+                    yield _sse_message("partial_reset", {})
+                    continue
+                if event.get("event") == "partial":
+                    partial = _partial_from(job_id, event["data"], sent)
+                    if partial is None:
+                        continue
+                    sent = partial["offset"] + len(partial["delta"])
+                    yield _sse_message("partial", partial)
+                    continue
+                yield _sse_message(event.get("event", "message"), event.get("data"))
+                if event.get("event") == "status":
+                    current = event["data"]
+
+            if current["status"] == "completed":
+                result_data = get_generation_result(job_id)
+                if result_data:
+                    yield _sse_message("result", result_data)
+        finally:
+            generation_events.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _find_generated_resume(job_id: str, current_user: models.User, db: Session) -> Optional[models.Resume]:
+    """The durable Resume row a generation job produced, if it belongs to the user"""
+    if not current_user.profile:
+        return None
+    try:
+        resume_id = UUID(job_id)
+    except ValueError:
+        return None
+    return db.query(models.Resume)\
+        .filter(models.Resume.id == resume_id)\
+        .filter(models.Resume.profile_id == current_user.profile.id)\
+        .first()
+
+def _rebuild_generation_result(job_id: str, current_user: models.User, db: Session) -> Optional[dict]:
+    """Rebuild an expired generation result from the Resume row and S3, and cache it again"""
+    resume = _find_generated_resume(job_id, current_user, db)
+    if not resume:
+        return None
+
+    content = resume.content
+    if resume.content_s3_key:
+        content = s3_storage.download_text(resume.content_s3_key) or content
+    if content is None:
+        logger.warning(f"No stored content for resume {job_id}, cannot rebuild its result")
+        return None
+
+    result_data = {
+        "job_id": job_id,
+        "job_title": resume.job_title or "Resume",
+        "company_name": resume.company_name,
+        "content": content,
+        "token_usage": None,  # Not kept beyond the Redis copy
+        "total_usage": None,
+        "artifacts": generation_result_artifacts(job_id),
+        "message": "Resume generated successfully"
+    }
+    save_generation_result(job_id, result_data, expiration=3600)
+    logger.info(f"Rebuilt generation result for job {job_id} from the database")
+    return result_data
+
 @app.get("/api/generation-result/{job_id}")
 async def get_generation_result_endpoint(
     job_id: str,
-    current_user: models.User = Depends(get_current_user)
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """Get the result of a completed resume generation job."""
     try:
@@ -2032,15 +2367,18 @@ async def get_generation_result_endpoint(
         if not result_data:
             # Check if job is still in progress
             status_data = get_generation_status(job_id)
-            if status_data and status_data['status'] != 'completed':
+            if status_data and status_data['status'] not in ('completed', 'failed'):
                 raise HTTPException(
                     status_code=202,
                     detail="Generation still in progress"
                 )
-            raise HTTPException(
-                status_code=404,
-                detail="Generation result not found or expired"
-            )
+            # The cached copy expired; the resume itself is durable
+            result_data = await asyncio.to_thread(_rebuild_generation_result, job_id, current_user, db)
+            if not result_data:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Generation result not found or expired"
+                )
         return result_data
     except HTTPException:
         raise
@@ -2051,6 +2389,30 @@ async def get_generation_result_endpoint(
             detail=f"Error getting generation result: {str(e)}"
         )
 
+@app.get("/api/generation-result/{job_id}/analysis")
+async def get_generation_analysis_endpoint(
+    job_id: str,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the analysis summary and detailed agent outputs of a completed generation job."""
+    resume = _find_generated_resume(job_id, current_user, db)
+    if not resume:
+        raise HTTPException(
+            status_code=404,
+            detail="Generation analysis not found"
+        )
+
+    keys = [key for key in (resume.summary_s3_key, resume.detailed_analysis_s3_key) if key]
+    artifacts = await s3_storage.download_texts_async(keys)
+    analysis_summary = artifacts.get(resume.summary_s3_key)
+    agent_outputs = artifacts.get(resume.detailed_analysis_s3_key)
+    return {
+        "job_id": job_id,
+        "analysis_summary": analysis_summary,
+        "agent_outputs": agent_outputs
+    }
+
 @app.post("/api/start-generation")
 async def start_generation_endpoint(
     job_description: UploadFile = File(...),
@@ -2058,6 +2420,7 @@ async def start_generation_endpoint(
     job_title: str = Form(...),     # New parameter
     skills: Optional[List[str]] = None,
     template_id: Optional[str] = None,
+    fresh_variation: bool = Form(False),  # Bypass cached LLM responses for a new variation
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -2108,73 +2471,42 @@ async def start_generation_endpoint(
             "certifications": [] # Assuming no certifications are stored in the profile
         }
         
-        # Start background task for generation using thread pool
-        import concurrent.futures
-        import threading
-        
-        def generate_resume_background():
-            try:
-                # Check credits before starting generation
-                db = next(get_db())
-                try:
-                    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-                    if not user or (user.credits or 0) < 1:
-                        save_generation_status(job_id, "failed", 0, "Insufficient credits", 0)
-                        return
-                finally:
-                    db.close()
-                
-                # Set initial status
-                save_generation_status(job_id, "parsing", 5, "Starting resume generation...")
-                
-                resume_generator = ResumeGenerator(db)
-                # Use asyncio.run to handle the async function in the thread
-                import asyncio
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    optimized_data = loop.run_until_complete(
-                        resume_generator.optimize_resume(
-                            job_id, parsed_data, job_desc_text, skills, current_user.id, company_name, job_title
-                        )
-                    )
-                finally:
-                    loop.close()
-                
-                # Deduct 1 credit after successful generation
-                db = next(get_db())
-                try:
-                    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-                    if user:
-                        user.credits = (user.credits or 0) - 1
-                        db.commit()
-                        db.refresh(user)
-                        logger.info(f"Deducted 1 credit from user {current_user.id}. Remaining credits: {user.credits}")
-                finally:
-                    db.close()
-                
-                # The result is already saved in optimize_resume method
-                # Just log success here
-                logger.info(f"Resume generation completed successfully for job {job_id}")
-                
-            except Exception as e:
-                logger.error(f"Background generation failed for job {job_id}: {str(e)}")
-                save_generation_status(job_id, "failed", 0, f"Generation failed: {str(e)}", 0)
-        
-        # Start the background task in a separate thread
-        thread = threading.Thread(target=generate_resume_background)
-        thread.daemon = True
-        thread.start()
+        # Written before the job is queued, so a worker that picks it up at once is never overwritten
+        save_generation_owner(job_id, current_user.id)
+        save_generation_status(job_id, "queued", 0, "Waiting for an available generator...")
+        # Hand the job to the generation workers; it survives API restarts and is retried on failure
+        try:
+            generation_queue.enqueue(job_id, str(current_user.id), {
+                "user_id": str(current_user.id),
+                "parsed_data": parsed_data,
+                "job_description": job_desc_text,
+                "skills": skills,
+                "company_name": company_name,
+                "job_title": job_title,
+                "template_id": template_id,
+                "fresh_variation": fresh_variation
+            })
+        except Exception as e:
+            # Nothing will pick the job up, so its queued status must not be left waiting
+            save_generation_status(job_id, "failed", 0, str(e), 0)
+            raise
         
         return {
             "job_id": job_id,
             "message": "Resume generation started",
             "status_url": f"/api/generation-status/{job_id}",
+            "events_url": f"/api/generation-events/{job_id}",
+            "events_token_url": f"/api/generation-events/{job_id}/token",
             "result_url": f"/api/generation-result/{job_id}"
         }
         
     except HTTPException:
         raise
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error starting generation: {str(e)}")
         raise HTTPException(
@@ -2622,7 +2954,7 @@ async def generate_resume_endpoint(
     # Upload job description to S3
     from .utils.s3_storage import s3_storage
     job_description_s3_key = f"job_descriptions/{current_user.id}/{current_uuid}.txt"
-    s3_upload_success = s3_storage.upload_text(job_desc_text, job_description_s3_key)
+    s3_upload_success = await s3_storage.upload_text_async(job_desc_text, job_description_s3_key)
     if not s3_upload_success:
         job_description_s3_key = None # Fallback
     
@@ -2701,11 +3033,8 @@ async def get_template_definition(
 ):
     """Get template definition JSON for WYSIWYG editor"""
     try:
-        # Get template from database
-        template = db.query(models.LatexTemplate)\
-            .filter(models.LatexTemplate.name == template_id)\
-            .filter(models.LatexTemplate.is_active == True)\
-            .first()
+        # Get template from the metadata cache
+        template = template_cache.by_name(template_id)
         
         if not template:
             raise HTTPException(
@@ -2763,7 +3092,7 @@ async def get_resume_editor_data(
         if resume.content_s3_key:
             try:
                 from .utils.s3_storage import s3_storage
-                s3_content = s3_storage.download_text(resume.content_s3_key)
+                s3_content = await s3_storage.download_text_async(resume.content_s3_key)
                 if s3_content:
                     content = s3_content
             except Exception as e:
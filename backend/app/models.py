@@ -81,6 +81,8 @@ class Resume(Base):
     __table_args__ = (
         Index('ix_resumes_profile_id_status', 'profile_id', 'status'),
         Index('ix_resumes_created_at', 'created_at'),
+        # Keyset pagination of a profile's resume history, newest first
+        Index('ix_resumes_profile_id_created_at_id', 'profile_id', created_at.desc(), id.desc()),
     )
 
 class WorkExperience(Base):
@@ -229,3 +231,18 @@ class StagingLatexTemplate(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     template = relationship("LatexTemplate")
+
+
+class JobDescriptionAnalysis(Base):
+    __tablename__ = "job_description_analyses"
+
+    fingerprint = Column(String(64), primary_key=True)  # SHA-256 of the normalized job description
+    title = Column(String, nullable=True)
+    seniority = Column(String, nullable=True)
+    required_skills = Column(JSON, nullable=False, default=list)
+    keywords = Column(JSON, nullable=False, default=list)
+    responsibilities = Column(JSON, nullable=False, default=list)
+    normalized_length = Column(Integer, nullable=False, default=0)
+    use_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import FileResponse
 from app.latex.processor import StagingTemplateProcessor
+from app.latex.format_cache import format_cache
+from app.latex.template_cache import template_cache
 from sqlalchemy.orm import Session
 from app import models, schemas
 from app.database import get_db
@@ -84,6 +86,11 @@ def push_to_production(template_id: uuid.UUID, db: Session = Depends(get_db)):
 
     db.commit()
     db.refresh(production_template)
+    template_cache.notify_changed(production_template.file_path)
+
+    # Precompile the template preamble so the first resumes on it are already fast
+    if production_template.is_active:
+        format_cache.schedule_template_build(source=staging_template.latex_code)
     return production_template
 @router.post("/staging-templates/{template_id}/generate-pdf")
 def generate_staging_pdf(template_id: uuid.UUID, db: Session = Depends(get_db)):
@@ -0,0 +1,212 @@
+import os
+import random
+import asyncio
+import logging
+import weakref
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from .llm_clients import llm_clients
+from .llm_cache import llm_cache
+from .rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Both providers expose an OpenAI-compatible chat completions API
+PROVIDERS = {
+    "groq": {
+        "base_url": os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1"),
+        "api_key_env": "GROQ_API_KEY",
+        "model_env": "GROQ_MODEL",
+    },
+    "gemini": {
+        "base_url": os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta/openai"),
+        "api_key_env": "GOOGLE_API_KEY",
+        "model_env": "GEMINI_MODEL_AGENT",
+    },
+}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMRequestError(Exception):
+    """An LLM request failed and was not (or no longer) retryable"""
+    pass
+
+
+@dataclass
+class ChatResult:
+    """Text and usage of a chat completion."""
+    content: str
+    provider: str
+    model: str
+    usage: Dict[str, Any] = field(default_factory=dict)
+
+
+class AsyncLLMClient:
+    """Asyncio-native chat completions over Groq and Gemini.
+
+    Requests share one pooled ``httpx.AsyncClient`` per event loop, are
+    retried with full-jitter exponential backoff (honouring Retry-After),
+    go through the same circuit breakers as the sync clients, and are
+    bounded by an overall timeout that cancels the in-flight request
+    rather than leaving a thread running.
+    """
+
+    def __init__(self):
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", 3))
+        self.base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", 1))
+        self.max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", 10))
+        self.default_timeout = float(os.getenv("LLM_REQUEST_TIMEOUT", 60))
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.default_timeout, connect=10),
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 20)),
+                    max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 10))
+                )
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Close the HTTP client of the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        provider: str = "groq",
+        model: Optional[str] = None,
+        fallback: Sequence[str] = (),
+        timeout: Optional[float] = None,
+        cache: Optional[str] = None,
+        fresh: bool = False,
+        **params
+    ) -> ChatResult:
+        """Run a chat completion, falling back to other providers if it fails.
+
+        Args:
+            messages: OpenAI-style chat messages
+            provider: Provider to try first ("groq" or "gemini")
+            model: Model for the first provider; defaults to the provider's configured model
+            fallback: Providers to try, with their configured models, if the first one fails
+            timeout: Overall seconds allowed per provider, retries included
+            cache: Response cache namespace; responses are not cached when omitted
+            fresh: Skip the cached response (the new one still replaces it)
+            **params: Extra request fields such as temperature or max_tokens
+
+        Returns:
+            ChatResult: Completion text and provider-reported usage
+
+        Raises:
+            LLMRequestError: If every provider failed
+        """
+        cache_key = None
+        if cache:
+            cache_key = llm_cache.chat_key(
+                cache, model or os.getenv(PROVIDERS[provider]["model_env"]), messages, **params
+            )
+            cached = None if fresh else llm_cache.get(cache_key, cache)
+            if cached is not None:
+                return ChatResult(**cached)
+
+        last_error: Optional[Exception] = None
+        for index, name in enumerate([provider, *fallback]):
+            try:
+                result = await self._chat_with_retries(
+                    name, model if index == 0 else None, messages, timeout or self.default_timeout, params
+                )
+                if cache_key and result.content:
+                    llm_cache.put(cache_key, cache, asdict(result))
+                return result
+            except Exception as e:
+                last_error = e
+                logger.warning(f"{name} chat completion failed: {str(e)}")
+        raise LLMRequestError(str(last_error))
+
+    async def _chat_with_retries(self, provider, model, messages, timeout, params) -> ChatResult:
+        config = PROVIDERS[provider]
+        model = (model or os.getenv(config["model_env"]) or "").removeprefix(f"{provider}/")
+        if not model:
+            raise LLMRequestError(f"No model configured for {provider}")
+
+        estimated_tokens = rate_limiter.estimate_tokens(
+            "\n".join(m["content"] for m in messages), params.get("max_tokens")
+        )
+        async with asyncio.timeout(timeout):
+            for attempt in range(self.max_retries):
+                # Cancellation, limiter timeouts and non-retryable errors record no outcome, so the
+                # breaker permit is released on the way out rather than leaving a trial in flight
+                with llm_clients.admitted(provider):
+                    await rate_limiter.acquire_async(provider, model, estimated_tokens)
+                    try:
+                        result = await self._request(provider, config, model, messages, params)
+                    except _RetryableError as e:
+                        llm_clients.record_failure(provider, e)
+                        if e.status_code == 429:
+                            await rate_limiter.penalize_async(provider, model, e.retry_after or self.base_delay * (2 ** attempt))
+                        if attempt == self.max_retries - 1:
+                            raise LLMRequestError(f"{provider} failed after {self.max_retries} attempts: {str(e)}")
+                        delay = e.retry_after or random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+                        logger.warning(f"{provider} request failed (attempt {attempt + 1}/{self.max_retries}), retrying in {delay:.1f}s: {str(e)}")
+                    else:
+                        llm_clients.record_success(provider)
+                        await rate_limiter.reconcile_async(provider, model, estimated_tokens, result.usage.get("total_tokens"))
+                        return result
+                await asyncio.sleep(min(delay, self.max_delay))
+
+    async def _request(self, provider, config, model, messages, params) -> ChatResult:
+        try:
+            response = await self._http().post(
+                f"{config['base_url']}/chat/completions",
+                headers={"Authorization": f"Bearer {os.getenv(config['api_key_env'])}"},
+                json={"model": model, "messages": messages, **params}
+            )
+        except httpx.TransportError as e:
+            raise _RetryableError(f"{type(e).__name__}: {str(e)}")
+
+        if response.status_code in RETRYABLE_STATUS:
+            raise _RetryableError(
+                f"HTTP {response.status_code}: {response.text[:200]}",
+                _retry_after(response.headers.get("retry-after")),
+                response.status_code
+            )
+        if response.status_code >= 400:
+            raise LLMRequestError(f"{provider} returned HTTP {response.status_code}: {response.text[:500]}")
+
+        data = response.json()
+        choices = data.get("choices") or []
+        content = (choices[0].get("message") or {}).get("content") if choices else None
+        return ChatResult(
+            content=content or "",
+            provider=provider,
+            model=data.get("model", model),
+            usage=data.get("usage") or {}
+        )
+
+
+class _RetryableError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+async_llm = AsyncLLMClient()
@@ -1,28 +1,24 @@
 from datetime import datetime, timedelta
 from typing import Optional
-import redis
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_db, get_redis
 from ..models import User
 import os
 
-# Redis connection
-redis_client = redis.Redis(
-    host=os.getenv('REDIS_HOST', 'redis'),
-    port=int(os.getenv('REDIS_PORT', 6379)),
-    db=int(os.getenv('REDIS_DB', 0)),
-    password=os.getenv('REDIS_PASSWORD', None),
-    decode_responses=True
-)
+# Redis connection (shared pool)
+redis_client = get_redis()
 
 # Configuration
 SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-keep-it-secret')  # In production, set SECRET_KEY in .env
 ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '1440')) # 24 hours
+# Event stream tokens travel in a URL (EventSource cannot send headers), so they are short-lived and job-scoped
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv('STREAM_TOKEN_EXPIRE_SECONDS', '120'))
+STREAM_TOKEN_SCOPE = "generation-events"
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -96,7 +92,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         # Always validate JWT first
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        # Scoped tokens (event streams) are not session tokens
+        if email is None or payload.get("scope"):
             raise credentials_exception
             
         # Check Redis cache
@@ -126,6 +123,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
+def create_stream_token(email: str, user_id: str, job_id: str) -> str:
+    """Create a short-lived token that only opens the event stream of one generation job."""
+    return jwt.encode({
+        "sub": email,
+        "uid": str(user_id),
+        "job": job_id,
+        "scope": STREAM_TOKEN_SCOPE,
+        "exp": datetime.utcnow() + timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    }, SECRET_KEY, algorithm=ALGORITHM)
+
+def verify_stream_token(token: str, job_id: str) -> Optional[str]:
+    """Verify an event stream token for a job and return the user id it was issued to."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("scope") != STREAM_TOKEN_SCOPE or payload.get("job") != job_id:
+        return None
+    return payload.get("uid")
+
 def verify_token(token: str) -> Optional[str]:
     """Verify a JWT token and return the email if valid."""
     try:
@@ -0,0 +1,141 @@
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+class DatabaseMetrics:
+    """Rolling statistics for connection checkout, session lifetime and query counts.
+
+    Samples are kept in fixed-size windows so the numbers reflect recent
+    traffic; saturation is sampled on every checkout.
+    """
+
+    def __init__(self, window: int = 2000):
+        self._lock = threading.Lock()
+        self.checkout_wait_ms = deque(maxlen=window)
+        self.session_lifetime_ms = deque(maxlen=window)
+        self.queries_per_session = deque(maxlen=window)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.sessions = 0
+        self.max_checked_out = 0
+        self.saturated_checkouts = 0
+
+    def record_checkout(self, wait_seconds: float, checked_out: int, capacity: int):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_ms.append(wait_seconds * 1000)
+            self.max_checked_out = max(self.max_checked_out, checked_out)
+            if checked_out >= capacity:
+                self.saturated_checkouts += 1
+
+    def record_checkout_timeout(self):
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def record_session(self, lifetime_seconds: float, queries: int):
+        with self._lock:
+            self.sessions += 1
+            self.session_lifetime_ms.append(lifetime_seconds * 1000)
+            self.queries_per_session.append(queries)
+
+    def snapshot(self, pool=None) -> Dict[str, Any]:
+        """Return summary statistics, plus live pool state if a pool is given."""
+        with self._lock:
+            data = {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "sessions": self.sessions,
+                "max_checked_out": self.max_checked_out,
+                "saturated_checkouts": self.saturated_checkouts,
+                "checkout_wait_ms": _summary(self.checkout_wait_ms),
+                "session_lifetime_ms": _summary(self.session_lifetime_ms),
+                "queries_per_session": _summary(self.queries_per_session),
+            }
+        if pool is not None:
+            data["pool"] = {
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }
+        return data
+
+
+def _summary(samples) -> Dict[str, Optional[float]]:
+    values = sorted(samples)
+    if not values:
+        return {"count": 0, "avg": None, "p50": None, "p95": None, "p99": None, "max": None}
+
+    def pct(p):
+        return round(values[min(len(values) - 1, int(p * len(values)))], 2)
+
+    return {
+        "count": len(values),
+        "avg": round(sum(values) / len(values), 2),
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "max": round(values[-1], 2),
+    }
+
+
+db_metrics = DatabaseMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            db_metrics.record_checkout_timeout()
+            raise
+        db_metrics.record_checkout(
+            time.perf_counter() - start,
+            self.checkedout(),
+            self.size() + max(self._max_overflow, 0)
+        )
+        return connection
+
+
+def instrument_engine(engine):
+    """Count statements per session on the given engine.
+
+    The session's metrics dict is attached to the connection when a
+    transaction begins, so cursor executions can be attributed to it.
+    """
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        session_info = conn.info.get("session_metrics")
+        if session_info is not None:
+            session_info["queries"] += 1
+
+
+def attach_session_metrics(session_factory):
+    """Attribute statements to sessions created by session_factory that are being tracked."""
+
+    @event.listens_for(session_factory, "after_begin")
+    def bind_connection(session, transaction, connection):
+        # Overwritten by the next tracked session that checks the connection out
+        connection.info["session_metrics"] = session.info.get("metrics")
+
+
+def start_session(session):
+    """Begin tracking a request-scoped session."""
+    session.info["metrics"] = {"started": time.perf_counter(), "queries": 0}
+
+
+def finish_session(session):
+    """Record a tracked session's lifetime and query count when it is closed."""
+    metrics = session.info.pop("metrics", None)
+    if metrics is not None:
+        db_metrics.record_session(time.perf_counter() - metrics["started"], metrics["queries"])
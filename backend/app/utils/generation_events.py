@@ -0,0 +1,103 @@
+import json
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+from ..database import get_async_redis, GENERATION_CHANNEL_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationEventBroker:
+    """Fans generation events out from Redis pub/sub to streaming clients.
+
+    Each API process holds a single pattern subscription on
+    ``generation:*`` and hands every message to the in-process queues of
+    the clients watching that job, so open event streams do not each hold
+    a Redis connection.
+    """
+
+    def __init__(self, queue_size: int = 100, ready_timeout: float = 5):
+        self.queue_size = queue_size
+        self.ready_timeout = ready_timeout
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Event] = None
+
+    async def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Start receiving a job's events; call ``unsubscribe`` when done.
+
+        Returns once the pattern subscription is active, so events published
+        after this call are delivered. If Redis does not confirm the
+        subscription within ``ready_timeout`` the queue is returned anyway and
+        callers must fall back to re-reading the job state.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.get_running_loop().create_task(self._read_loop())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=self.ready_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Generation event subscription not ready, job {job_id} relies on status re-reads")
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(job_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "jobs": len(self._subscribers),
+            "streams": sum(len(queues) for queues in self._subscribers.values()),
+        }
+
+    async def _read_loop(self):
+        pattern = f"{GENERATION_CHANNEL_PREFIX}:*"
+        while True:
+            pubsub = get_async_redis().pubsub()
+            try:
+                await pubsub.psubscribe(pattern)
+                async for message in pubsub.listen():
+                    if message.get("type") == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+                    elif message.get("type") == "psubscribe":
+                        # psubscribe only sends the command; events flow once Redis confirms it
+                        self._ready.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Generation event subscription error, reconnecting: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                # Events are missed until the next subscription is confirmed
+                self._ready.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def _dispatch(self, channel: str, data: str):
+        job_id = channel.split(":", 1)[1]
+        queues = self._subscribers.get(job_id)
+        if not queues:
+            return
+        try:
+            event = json.loads(data)
+        except ValueError:
+            logger.warning(f"Dropping malformed generation event for job {job_id}")
+            return
+        for queue in list(queues):
+            if queue.full():
+                # A slow client only needs the latest state, drop its oldest event
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+generation_events = GenerationEventBroker()
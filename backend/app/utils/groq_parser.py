@@ -1,21 +1,18 @@
 import os
 import json
 from typing import Dict, Any
-from groq import Groq
 from ..schemas import ResumeParseResponse
+from .async_llm import async_llm
 
 class GroqResumeParser:
-    def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        
-    def parse_resume(self, resume_text: str) -> ResumeParseResponse:
+    async def parse_resume(self, resume_text: str) -> ResumeParseResponse:
         """
         Parse resume text using Groq AI and return structured data
         """
         prompt = self._create_parsing_prompt(resume_text)
         
         try:
-            chat_completion = self.client.chat.completions.create(
+            chat_completion = await async_llm.chat(
                 messages=[
                     {
                         "role": "system",
@@ -31,7 +28,7 @@ class GroqResumeParser:
                 max_tokens=4000,
             )
             
-            response_text = chat_completion.choices[0].message.content
+            response_text = chat_completion.content
             print(f"Groq raw response: {response_text[:200]}...")  # Debug log
             
             if not response_text or response_text.strip() == "":
@@ -0,0 +1,224 @@
+import os
+import re
+import json
+import html
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Tuple
+
+from ..database import SessionLocal, get_redis
+from .async_llm import async_llm
+
+logger = logging.getLogger(__name__)
+
+SENIORITY_LEVELS = ("intern", "junior", "mid", "senior", "lead", "principal", "executive", "unspecified")
+
+EXTRACTION_PROMPT = """Extract the key requirements from the job description below and return ONLY valid JSON in this exact format:
+{{
+  "title": "Main job title",
+  "seniority": "one of: {levels}",
+  "required_skills": ["Up to 15 required or strongly preferred skills, most important first"],
+  "keywords": ["Up to 20 ATS keywords and phrases from the posting"],
+  "responsibilities": ["Up to 8 short statements of the core responsibilities"]
+}}
+
+Job Description:
+{text}
+"""
+
+
+def normalize_job_description(text: str) -> str:
+    """Normalize a job description so the same posting pasted differently compares equal.
+
+    Unescapes HTML entities, strips tags, applies NFKC and collapses
+    whitespace within lines and runs of blank lines.
+    """
+    text = html.unescape(text or "")
+    text = re.sub(r"<[^>]+>", " ", text)
+    text = unicodedata.normalize("NFKC", text)
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def fingerprint_job_description(normalized: str) -> str:
+    """Case- and whitespace-insensitive SHA-256 of a normalized job description."""
+    return hashlib.sha256(" ".join(normalized.lower().split()).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class JobDescriptionProfile:
+    """Structured extraction of a job description."""
+    fingerprint: str
+    title: Optional[str] = None
+    seniority: Optional[str] = None
+    required_skills: List[str] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+    responsibilities: List[str] = field(default_factory=list)
+    normalized_length: int = 0
+
+    def to_prompt(self) -> str:
+        """Compact form of the job description for agent prompts."""
+        sections = [
+            f"Title: {self.title or 'Not specified'}",
+            f"Seniority: {self.seniority or 'unspecified'}",
+            "Required skills: " + (", ".join(self.required_skills) or "Not specified"),
+            "Keywords: " + (", ".join(self.keywords) or "Not specified"),
+            "Responsibilities:\n" + ("\n".join(f"- {r}" for r in self.responsibilities) or "- Not specified"),
+        ]
+        return "\n".join(sections)
+
+    @property
+    def complexity(self) -> int:
+        """Rough size of what the resume has to address, used for time estimates."""
+        return len(self.required_skills) + len(self.responsibilities) + len(self.keywords) // 2
+
+
+class JobDescriptionAnalyzer:
+    """Normalizes, fingerprints and extracts job descriptions once for all users.
+
+    Extractions are looked up by fingerprint in Redis, then in the
+    ``job_description_analyses`` table, and only extracted with the LLM
+    when neither has them. A short Redis lock stops concurrent generations
+    for the same posting from extracting it twice.
+    """
+
+    def __init__(self):
+        self.ttl = int(os.getenv("JOB_DESCRIPTION_CACHE_TTL", 7 * 24 * 3600))
+        self.lock_timeout = int(os.getenv("JOB_DESCRIPTION_LOCK_SECONDS", 60))
+        self.max_input_chars = int(os.getenv("JOB_DESCRIPTION_MAX_CHARS", 12000))
+
+    def _key(self, fingerprint: str) -> str:
+        return f"jd:{fingerprint}"
+
+    async def analyze(self, text: str) -> Optional[JobDescriptionProfile]:
+        """Return the structured job description, or None if it could not be extracted."""
+        normalized = normalize_job_description(text)
+        if not normalized:
+            return None
+        fingerprint = fingerprint_job_description(normalized)
+
+        profile, source = await self._lookup(fingerprint)
+        if profile is not None:
+            logger.info(f"Job description {fingerprint[:12]} served from {source}")
+            return profile
+
+        redis_client = get_redis()
+        lock_key = f"{self._key(fingerprint)}:lock"
+        if not redis_client.set(lock_key, "1", nx=True, ex=self.lock_timeout):
+            # Another generation is extracting this posting; wait for its result
+            for _ in range(self.lock_timeout):
+                await asyncio.sleep(1)
+                profile, _ = await self._lookup(fingerprint)
+                if profile is not None:
+                    return profile
+                if not redis_client.exists(lock_key):
+                    break
+
+        try:
+            profile = await self._extract(fingerprint, normalized)
+            if profile is not None:
+                await asyncio.to_thread(self._save, profile)
+                self._cache(profile)
+            return profile
+        finally:
+            redis_client.delete(lock_key)
+
+    async def _lookup(self, fingerprint: str) -> Tuple[Optional[JobDescriptionProfile], Optional[str]]:
+        try:
+            cached = get_redis().get(self._key(fingerprint))
+            if cached:
+                return JobDescriptionProfile(**json.loads(cached)), "redis"
+        except Exception as e:
+            logger.warning(f"Job description cache lookup failed: {str(e)}")
+
+        profile = await asyncio.to_thread(self._load, fingerprint)
+        if profile is not None:
+            self._cache(profile)
+            return profile, "database"
+        return None, None
+
+    def _cache(self, profile: JobDescriptionProfile):
+        try:
+            get_redis().set(self._key(profile.fingerprint), json.dumps(asdict(profile)), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Failed to cache job description analysis: {str(e)}")
+
+    def _load(self, fingerprint: str) -> Optional[JobDescriptionProfile]:
+        from .. import models
+
+        db = SessionLocal()
+        try:
+            row = db.query(models.JobDescriptionAnalysis).filter(
+                models.JobDescriptionAnalysis.fingerprint == fingerprint
+            ).first()
+            if row is None:
+                return None
+            row.use_count = (row.use_count or 0) + 1
+            db.commit()
+            return JobDescriptionProfile(
+                fingerprint=row.fingerprint,
+                title=row.title,
+                seniority=row.seniority,
+                required_skills=row.required_skills or [],
+                keywords=row.keywords or [],
+                responsibilities=row.responsibilities or [],
+                normalized_length=row.normalized_length or 0,
+            )
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Job description analysis lookup failed: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    def _save(self, profile: JobDescriptionProfile):
+        from .. import models
+
+        db = SessionLocal()
+        try:
+            db.merge(models.JobDescriptionAnalysis(**asdict(profile)))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to store job description analysis: {str(e)}")
+        finally:
+            db.close()
+
+    async def _extract(self, fingerprint: str, normalized: str) -> Optional[JobDescriptionProfile]:
+        try:
+            completion = await async_llm.chat(
+                messages=[
+                    {"role": "system", "content": "You are an expert recruiter. You extract structured requirements from job descriptions and return valid JSON only."},
+                    {"role": "user", "content": EXTRACTION_PROMPT.format(
+                        levels=", ".join(SENIORITY_LEVELS), text=normalized[:self.max_input_chars]
+                    )}
+                ],
+                fallback=("gemini",),
+                temperature=0.1,
+                max_tokens=1200,
+                response_format={"type": "json_object"}
+            )
+            data = json.loads(completion.content)
+        except Exception as e:
+            logger.error(f"Job description extraction failed: {str(e)}")
+            return None
+
+        def strings(value, limit):
+            return [str(v).strip() for v in (value or []) if str(v).strip()][:limit]
+
+        seniority = str(data.get("seniority") or "unspecified").strip().lower()
+        return JobDescriptionProfile(
+            fingerprint=fingerprint,
+            title=(data.get("title") or "").strip() or None,
+            seniority=seniority if seniority in SENIORITY_LEVELS else "unspecified",
+            required_skills=strings(data.get("required_skills"), 15),
+            keywords=strings(data.get("keywords"), 20),
+            responsibilities=strings(data.get("responsibilities"), 8),
+            normalized_length=len(normalized),
+        )
+
+
+job_description_analyzer = JobDescriptionAnalyzer()
@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, Optional
+
+from ..database import get_redis
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PREFIX = os.getenv("GENERATION_QUEUE_PREFIX", "genq")
+
+
+class QueueFullError(Exception):
+    """The generation queue (or the user's share of it) is full"""
+    pass
+
+
+# Add a job to its user's queue and put the user on the round-robin ring if not already there
+ENQUEUE_SCRIPT = """
+local prefix = ARGV[1]
+local job_id = ARGV[2]
+local user_id = ARGV[3]
+local max_pending = tonumber(ARGV[6])
+local max_user_pending = tonumber(ARGV[7])
+local user_queue = prefix .. ':user:' .. user_id
+if redis.call('LLEN', user_queue) >= max_user_pending then
+    return -2
+end
+if tonumber(redis.call('GET', prefix .. ':pending') or '0') >= max_pending then
+    return -1
+end
+redis.call('HSET', prefix .. ':job:' .. job_id, 'user_id', user_id, 'payload', ARGV[4], 'attempts', 0, 'enqueued_at', ARGV[5])
+redis.call('EXPIRE', prefix .. ':job:' .. job_id, 86400)
+redis.call('RPUSH', user_queue, job_id)
+redis.call('INCR', prefix .. ':pending')
+if redis.call('SADD', prefix .. ':active_users', user_id) == 1 then
+    redis.call('RPUSH', prefix .. ':users', user_id)
+end
+return redis.call('LLEN', prefix .. ':users')
+"""
+
+# Take the next job round-robin across users and lease it until the visibility deadline
+DEQUEUE_SCRIPT = """
+local prefix = ARGV[1]
+local deadline = ARGV[2]
+for i = 1, 100 do
+    local user_id = redis.call('LPOP', prefix .. ':users')
+    if not user_id then
+        return nil
+    end
+    local user_queue = prefix .. ':user:' .. user_id
+    local job_id = redis.call('LPOP', user_queue)
+    if redis.call('LLEN', user_queue) > 0 then
+        redis.call('RPUSH', prefix .. ':users', user_id)
+    else
+        redis.call('SREM', prefix .. ':active_users', user_id)
+    end
+    if job_id then
+        redis.call('DECR', prefix .. ':pending')
+        if redis.call('EXISTS', prefix .. ':job:' .. job_id) == 1 then
+            redis.call('ZADD', prefix .. ':processing', deadline, job_id)
+            return {job_id, redis.call('HGET', prefix .. ':job:' .. job_id, 'payload'),
+                    redis.call('HGET', prefix .. ':job:' .. job_id, 'attempts')}
+        end
+    end
+end
+return nil
+"""
+
+# Release a leased job: requeue it at the front of its user's queue, or dead-letter it
+RETRY_SCRIPT = """
+local prefix = ARGV[1]
+local job_id = ARGV[2]
+local max_attempts = tonumber(ARGV[3])
+local job_key = prefix .. ':job:' .. job_id
+if redis.call('ZREM', prefix .. ':processing', job_id) == 0 then
+    return 0
+end
+if redis.call('EXISTS', job_key) == 0 then
+    return 0
+end
+local attempts = redis.call('HINCRBY', job_key, 'attempts', 1)
+redis.call('HSET', job_key, 'last_error', ARGV[4])
+if attempts >= max_attempts then
+    redis.call('LPUSH', prefix .. ':dead', job_id)
+    redis.call('LTRIM', prefix .. ':dead', 0, 999)
+    redis.call('EXPIRE', job_key, 604800)
+    return 2
+end
+local user_id = redis.call('HGET', job_key, 'user_id')
+redis.call('LPUSH', prefix .. ':user:' .. user_id, job_id)
+redis.call('INCR', prefix .. ':pending')
+if redis.call('SADD', prefix .. ':active_users', user_id) == 1 then
+    redis.call('RPUSH', prefix .. ':users', user_id)
+end
+return 1
+"""
+
+
+class GenerationJobQueue:
+    """Durable, Redis-backed queue for resume generation jobs.
+
+    Jobs live in per-user lists and are handed out round-robin across users,
+    so one user submitting many jobs cannot starve everyone else. A dequeued
+    job is leased in a sorted set until its visibility deadline; workers
+    extend the lease with heartbeats, and leases that expire (crashed worker,
+    restarted container) are put back on the queue. A job that fails
+    ``max_attempts`` times is moved to a dead-letter list.
+    """
+
+    def __init__(self, prefix: str = QUEUE_PREFIX):
+        self.prefix = prefix
+        self.visibility_timeout = int(os.getenv("GENERATION_VISIBILITY_TIMEOUT", 600))
+        self.max_attempts = int(os.getenv("GENERATION_MAX_ATTEMPTS", 3))
+        self.max_pending = int(os.getenv("GENERATION_QUEUE_MAX_PENDING", 500))
+        self.max_user_pending = int(os.getenv("GENERATION_QUEUE_MAX_PER_USER", 3))
+        self._scripts = {}
+
+    def _script(self, name: str, source: str):
+        if name not in self._scripts:
+            self._scripts[name] = get_redis().register_script(source)
+        return self._scripts[name]
+
+    def enqueue(self, job_id: str, user_id: str, payload: Dict[str, Any]) -> int:
+        """Queue a generation job.
+
+        Args:
+            job_id: Job UUID, also used for status and result keys
+            user_id: Owner of the job, the unit of fairness
+            payload: JSON-serialisable arguments for the worker
+
+        Returns:
+            int: Number of users currently waiting in the queue
+
+        Raises:
+            QueueFullError: If the queue or the user's pending jobs are at their limit
+        """
+        result = self._script("enqueue", ENQUEUE_SCRIPT)(args=[
+            self.prefix, job_id, str(user_id), json.dumps(payload), int(time.time()),
+            self.max_pending, self.max_user_pending
+        ])
+        if result == -2:
+            raise QueueFullError("You already have resume generations in progress, please wait for them to finish")
+        if result == -1:
+            raise QueueFullError("Resume generation is very busy right now, please try again in a few minutes")
+        return result
+
+    def dequeue(self) -> Optional[Dict[str, Any]]:
+        """Lease the next job, or return None if the queue is empty."""
+        deadline = time.time() + self.visibility_timeout
+        result = self._script("dequeue", DEQUEUE_SCRIPT)(args=[self.prefix, deadline])
+        if not result:
+            return None
+        job_id, payload, attempts = result
+        return {"job_id": job_id, "payload": json.loads(payload), "attempts": int(attempts or 0)}
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Extend a job's lease; returns False if the lease was lost."""
+        deadline = time.time() + self.visibility_timeout
+        return bool(get_redis().zadd(f"{self.prefix}:processing", {job_id: deadline}, xx=True, ch=True))
+
+    def ack(self, job_id: str):
+        """Mark a leased job as done and forget it."""
+        redis_client = get_redis()
+        redis_client.zrem(f"{self.prefix}:processing", job_id)
+        redis_client.delete(f"{self.prefix}:job:{job_id}")
+
+    def fail(self, job_id: str, error: str) -> int:
+        """Release a failed job for retry.
+
+        Returns:
+            int: 1 if requeued, 2 if dead-lettered, 0 if the job was no longer leased
+        """
+        return self._script("retry", RETRY_SCRIPT)(args=[self.prefix, job_id, self.max_attempts, error[:1000]])
+
+    def requeue_expired(self) -> int:
+        """Put back jobs whose lease expired without an ack; returns how many were released."""
+        expired = get_redis().zrangebyscore(f"{self.prefix}:processing", "-inf", time.time(), start=0, num=100)
+        released = 0
+        for job_id in expired:
+            outcome = self.fail(job_id, "Visibility timeout expired")
+            if outcome:
+                released += 1
+                logger.warning(f"Generation job {job_id} lease expired, {'dead-lettered' if outcome == 2 else 'requeued'}")
+        return released
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, in-flight and dead-letter counts."""
+        redis_client = get_redis()
+        return {
+            "pending": int(redis_client.get(f"{self.prefix}:pending") or 0),
+            "waiting_users": redis_client.llen(f"{self.prefix}:users"),
+            "in_flight": redis_client.zcard(f"{self.prefix}:processing"),
+            "dead_lettered": redis_client.llen(f"{self.prefix}:dead"),
+        }
+
+
+generation_queue = GenerationJobQueue()
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+from ..database import get_redis
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = os.getenv("LLM_CACHE_PREFIX", "llmcache")
+
+# Store an entry, touch it in the LRU index and evict the least recently used beyond max_entries
+PUT_SCRIPT = """
+local entry_prefix = ARGV[1]
+local index_key = ARGV[2]
+redis.call('SET', entry_prefix .. ARGV[3], ARGV[4], 'EX', tonumber(ARGV[5]))
+redis.call('ZADD', index_key, tonumber(ARGV[6]), ARGV[3])
+local excess = redis.call('ZCARD', index_key) - tonumber(ARGV[7])
+if excess <= 0 then
+    return 0
+end
+local evicted = redis.call('ZPOPMIN', index_key, excess)
+for i = 1, #evicted, 2 do
+    redis.call('DEL', entry_prefix .. evicted[i])
+end
+return #evicted / 2
+"""
+
+
+def _normalize(text: Optional[str]) -> str:
+    """Collapse whitespace so re-indented or re-wrapped prompts share a key."""
+    return " ".join((text or "").split())
+
+
+class LLMResponseCache:
+    """Redis cache of LLM responses keyed on their normalised inputs.
+
+    The key is a hash of the namespace, model, temperature, prompts and any
+    other request parameters, so identical regenerations (same job
+    description, unchanged profile) are answered without calling the
+    provider. Entries expire after a per-namespace TTL and the cache is
+    bounded to ``LLM_CACHE_MAX_ENTRIES`` by evicting the least recently
+    used. Hit/miss counters are kept in Redis so they cover every process.
+    """
+
+    def __init__(self, prefix: str = CACHE_PREFIX):
+        self.prefix = prefix
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.default_ttl = int(os.getenv("LLM_CACHE_TTL", 3 * 24 * 3600))
+        self.max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+        self._put_script = None
+
+    def ttl_for(self, namespace: str) -> int:
+        """TTL for a namespace, overridable with LLM_CACHE_TTL_<NAMESPACE>."""
+        return int(os.getenv(f"LLM_CACHE_TTL_{namespace.upper()}", self.default_ttl))
+
+    def make_key(self, namespace: str, model: Optional[str], temperature: Optional[float],
+                 system: Optional[str], user: Optional[str], **params) -> str:
+        """Hash the normalised request inputs into a cache key."""
+        material = json.dumps({
+            "namespace": namespace,
+            "model": model or "",
+            "temperature": round(float(temperature), 2) if temperature is not None else None,
+            "system": _normalize(system),
+            "user": _normalize(user),
+            "params": {k: params[k] for k in sorted(params)},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def chat_key(self, namespace: str, model: Optional[str], messages, **params) -> str:
+        """Key for an OpenAI-style chat request."""
+        temperature = params.pop("temperature", None)
+        system = "\n".join(m["content"] for m in messages if m.get("role") == "system")
+        user = "\n".join(f"{m.get('role')}: {m['content']}" for m in messages if m.get("role") != "system")
+        return self.make_key(namespace, model, temperature, system, user, **params)
+
+    def agent_key(self, agent, task, task_context: str, model: str, temperature: Optional[float]) -> str:
+        """Key for a crewai agent executing a task on the given context.
+
+        ``model`` and ``temperature`` are those of the route that actually
+        served the call, not of the shared agent's default LLM.
+        """
+        return self.make_key(
+            "agent",
+            model,
+            temperature,
+            f"{agent.role}\n{agent.goal}\n{agent.backstory}",
+            f"{task.description}\n{task.expected_output}\n{task_context}"
+        )
+
+    def get(self, key: str, namespace: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response, or None on a miss or error."""
+        if not self.enabled:
+            return None
+        try:
+            redis_client = get_redis()
+            raw = redis_client.get(f"{self.prefix}:entry:{key}")
+            pipe = redis_client.pipeline()
+            pipe.hincrby(f"{self.prefix}:stats", f"{namespace}:{'hits' if raw else 'misses'}", 1)
+            if raw:
+                pipe.zadd(f"{self.prefix}:index", {key: time.time()}, xx=True)
+            pipe.execute()
+            if raw:
+                logger.info(f"LLM cache hit for {namespace}")
+                return json.loads(raw)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+        return None
+
+    def get_first(self, keys: List[str], namespace: str) -> Optional[Dict[str, Any]]:
+        """Return the first cached response among ``keys``, fetched in one round trip and counted as one lookup."""
+        if not self.enabled or not keys:
+            return None
+        try:
+            redis_client = get_redis()
+            values = redis_client.mget([f"{self.prefix}:entry:{key}" for key in keys])
+            hit = next(((key, raw) for key, raw in zip(keys, values) if raw), None)
+            pipe = redis_client.pipeline()
+            pipe.hincrby(f"{self.prefix}:stats", f"{namespace}:{'hits' if hit else 'misses'}", 1)
+            if hit:
+                pipe.zadd(f"{self.prefix}:index", {hit[0]: time.time()}, xx=True)
+            pipe.execute()
+            if hit:
+                logger.info(f"LLM cache hit for {namespace}")
+                return json.loads(hit[1])
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+        return None
+
+    def put(self, key: str, namespace: str, value: Dict[str, Any]) -> bool:
+        """Store a response; returns False if it could not be cached."""
+        if not self.enabled:
+            return False
+        try:
+            redis_client = get_redis()
+            if self._put_script is None:
+                self._put_script = redis_client.register_script(PUT_SCRIPT)
+            evicted = self._put_script(args=[
+                f"{self.prefix}:entry:", f"{self.prefix}:index", key, json.dumps(value),
+                self.ttl_for(namespace), time.time(), self.max_entries
+            ])
+            pipe = redis_client.pipeline()
+            pipe.hincrby(f"{self.prefix}:stats", f"{namespace}:stores", 1)
+            if evicted:
+                pipe.hincrby(f"{self.prefix}:stats", "evictions", int(evicted))
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"LLM cache store failed: {str(e)}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-namespace hits, misses, stores and hit rate, plus entry and eviction counts."""
+        redis_client = get_redis()
+        counters = redis_client.hgetall(f"{self.prefix}:stats")
+        namespaces: Dict[str, Dict[str, Any]] = {}
+        for field, value in counters.items():
+            if ":" not in field:
+                continue
+            namespace, metric = field.rsplit(":", 1)
+            namespaces.setdefault(namespace, {"hits": 0, "misses": 0, "stores": 0})[metric] = int(value)
+        for counts in namespaces.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / lookups, 3) if lookups else None
+        return {
+            "enabled": self.enabled,
+            "entries": redis_client.zcard(f"{self.prefix}:index"),
+            "max_entries": self.max_entries,
+            "evictions": int(counters.get("evictions", 0)),
+            "namespaces": namespaces,
+        }
+
+
+llm_cache = LLMResponseCache()
@@ -0,0 +1,219 @@
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import groq
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProviderUnavailableError(Exception):
+    """The provider's circuit breaker is open, calls are failing fast"""
+    pass
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open after a cool-down.
+
+    While open every call fails immediately; once the cool-down passes a
+    single trial call is let through and its outcome closes or reopens it.
+    A trial that ends without an outcome (cancelled, timed out, aborted
+    before the request) must be released, or the breaker stays half-open
+    with no call ever admitted again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        return self.acquire() is not None
+
+    def acquire(self) -> Optional[int]:
+        """Admit a call.
+
+        Returns:
+            int | None: 0 for a normal call, the trial's number for the half-open
+                trial call, or None if the call must fail fast
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial += 1
+                return self._trial
+            return None
+
+    def release(self, permit: Optional[int]):
+        """Free the trial slot of a call that ended without recording an outcome."""
+        if not permit:
+            return
+        with self._lock:
+            # Only the call holding this trial may free it, never a later trial
+            if self._trial_in_flight and self._trial == permit:
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LLMClientRegistry:
+    """Process-level LLM clients with cached health and circuit breakers.
+
+    Clients are created lazily on first use, so code paths that never talk
+    to an LLM (PDF rendering, downloads) never touch the provider. Health is
+    tracked from real call outcomes and, once ``start_health_probe`` has run,
+    from a periodic free ``models.list`` probe instead of a per-request
+    completion.
+    """
+
+    def __init__(self):
+        self.probe_interval = float(os.getenv("LLM_HEALTH_PROBE_INTERVAL", 60))
+        self._clients: Dict[str, Any] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._health: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def groq(self) -> groq.Groq:
+        """Shared synchronous Groq client."""
+        client = self._clients.get("groq")
+        if client is None:
+            with self._lock:
+                client = self._clients.get("groq")
+                if client is None:
+                    client = groq.Groq(api_key=os.getenv("GROQ_API_KEY"))
+                    self._clients["groq"] = client
+        return client
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(
+                    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", 5)),
+                    reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+                )
+            return self._breakers[provider]
+
+    def ensure_available(self, provider: str) -> int:
+        """Raise LLMProviderUnavailableError if calls to the provider should fail fast.
+
+        Returns:
+            int: Breaker permit to hand to ``release`` once the call is over
+        """
+        permit = self.breaker(provider).acquire()
+        if permit is None:
+            raise LLMProviderUnavailableError(f"{provider} is temporarily unavailable, please try again shortly")
+        return permit
+
+    def release(self, provider: str, permit: Optional[int]):
+        """Free a half-open trial that ended without record_success or record_failure."""
+        self.breaker(provider).release(permit)
+
+    @contextmanager
+    def admitted(self, provider: str):
+        """Admit one call through the provider's breaker and release its permit on every exit path."""
+        permit = self.ensure_available(provider)
+        try:
+            yield
+        finally:
+            self.release(provider, permit)
+
+    def record_success(self, provider: str):
+        self.breaker(provider).record_success()
+        self._set_health(provider, True)
+
+    def record_failure(self, provider: str, error: Exception):
+        self.breaker(provider).record_failure()
+        self._set_health(provider, False, str(error))
+
+    def groq_chat_completion_stream(self, **kwargs):
+        """Stream Groq chat completion chunks through the circuit breaker."""
+        # The consumer may stop iterating early (GeneratorExit); admitted() still frees the trial
+        with self.admitted("groq"):
+            try:
+                for chunk in self.groq.chat.completions.create(stream=True, **kwargs):
+                    yield chunk
+            except Exception as e:
+                self.record_failure("groq", e)
+                raise
+            self.record_success("groq")
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        """Return cached health and breaker state per provider."""
+        with self._lock:
+            snapshot = {provider: dict(state) for provider, state in self._health.items()}
+            for provider, breaker in self._breakers.items():
+                snapshot.setdefault(provider, {})["circuit"] = breaker.state
+        return snapshot
+
+    def start_health_probe(self):
+        """Start the background probe thread (idempotent)."""
+        if self._probe_thread is not None or self.probe_interval <= 0:
+            return
+        self._stop.clear()
+        self._probe_thread = threading.Thread(target=self._probe_loop, name="llm-health-probe", daemon=True)
+        self._probe_thread.start()
+
+    def stop_health_probe(self):
+        self._stop.set()
+        self._probe_thread = None
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            self.probe_groq()
+            self._stop.wait(self.probe_interval)
+
+    def probe_groq(self) -> bool:
+        """Check Groq reachability with a models listing, which costs no tokens."""
+        try:
+            self.groq.models.list()
+            self.record_success("groq")
+            return True
+        except Exception as e:
+            logger.warning(f"Groq health probe failed: {str(e)}")
+            self.record_failure("groq", e)
+            return False
+
+    def _set_health(self, provider: str, healthy: bool, error: Optional[str] = None):
+        with self._lock:
+            self._health[provider] = {
+                "healthy": healthy,
+                "last_checked": time.time(),
+                "last_error": error
+            }
+
+
+llm_clients = LLMClientRegistry()
@@ -0,0 +1,271 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .llm_cache import llm_cache
+from .llm_clients import llm_clients, CircuitBreaker
+from .rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Route:
+    """One way to serve an agent call: a provider and the LLM factory for a model category."""
+    name: str
+    provider: str
+    category: str
+    model_env: str
+    factory: Callable[..., Any]
+
+
+class RouteStats:
+    """Rolling latency window and error rate for one route."""
+
+    def __init__(self, window: int = 50):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.calls = 0
+        self.hedges_won = 0
+
+    def record(self, latency: Optional[float], ok: bool):
+        self.calls += 1
+        self.outcomes.append(1 if ok else 0)
+        if ok and latency is not None:
+            self.latencies.append(latency)
+
+    def percentile(self, p: float) -> Optional[float]:
+        values = sorted(self.latencies)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(p * len(values)))]
+
+    @property
+    def error_rate(self) -> float:
+        return 1 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ProviderRouter:
+    """Routes each agent call to the fastest healthy provider.
+
+    Every call runs on a per-request copy of the agent bound to the chosen
+    route's LLM, so the shared module-level agents are never mutated.
+    Routes are ranked by median latency penalised by their recent error
+    rate; routes whose provider circuit is open are skipped. If the
+    primary has not answered by its own p95 latency a hedged request is
+    sent to the next route and the first answer wins; failures fail over
+    to the next route immediately. Hedges run on their own small executor
+    and are only sent when the rate limiter has capacity right away, so
+    duplicate calls can never tie up the threads primary calls need.
+    Cached answers are keyed by the route that produced them.
+    """
+
+    def __init__(self):
+        self.hedging = os.getenv("AGENT_HEDGING_ENABLED", "true").lower() == "true"
+        self.min_hedge_delay = float(os.getenv("AGENT_HEDGE_MIN_DELAY", 20))
+        self.default_latency = float(os.getenv("AGENT_DEFAULT_LATENCY", 30))
+        self._lock = threading.RLock()
+        self._stats: Dict[str, RouteStats] = {}
+        self._llms: Dict[Tuple[str, float], Any] = {}
+        self._routes: Optional[List[Route]] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("AGENT_ROUTER_THREADS", 8)), thread_name_prefix="agent-route"
+        )
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("AGENT_HEDGE_THREADS", 4)), thread_name_prefix="agent-hedge"
+        )
+
+    def routes(self, category: str) -> List[Route]:
+        """Configured routes for a model category ("AGENT" or "MANAGER")."""
+        if self._routes is None:
+            from .resume_assessment_agents import create_llm, create_llm_groq
+            self._routes = [
+                Route("groq:AGENT", "groq", "AGENT", "GROQ_AGENT", create_llm_groq),
+                Route("gemini:AGENT", "gemini", "AGENT", "GEMINI_MODEL_AGENT", create_llm),
+                Route("groq:MANAGER", "groq", "MANAGER", "GROQ_MANAGER", create_llm_groq),
+                Route("gemini:MANAGER", "gemini", "MANAGER", "GEMINI_MODEL_MANAGER", create_llm),
+            ]
+        return [r for r in self._routes if r.category == category and os.getenv(r.model_env)]
+
+    def rank(self, category: str) -> List[Route]:
+        """Routes for the category, best first."""
+        def score(route: Route) -> float:
+            stats = self._stats_for(route)
+            latency = stats.percentile(0.5) or self.default_latency
+            return latency * (1 + 4 * stats.error_rate)
+
+        routes = self.routes(category)
+        healthy = [r for r in routes if llm_clients.breaker(r.provider).state != CircuitBreaker.OPEN]
+        # With every circuit open, still try them rather than fail without a call
+        return sorted(healthy or routes, key=score)
+
+    def execute(self, agent, task, context: str, category: str = "AGENT") -> str:
+        """Run ``agent`` on ``task`` with ``context`` via the best route.
+
+        Raises:
+            Exception: The last route's error if every route failed
+        """
+        return self.execute_with_usage(agent, task, context, category)[0]
+
+    def execute_with_usage(self, agent, task, context: str, category: str = "AGENT",
+                           cache: bool = False, fresh: bool = False) -> Tuple[str, Optional[Dict[str, int]]]:
+        """Like ``execute``, also returning the token usage the provider reported for the call.
+
+        Args:
+            cache: Answer from the LLM cache when any configured route has already
+                served identical inputs (usage is None then), and cache new answers
+            fresh: Skip the cache lookup so the call produces a new variation
+        """
+        routes = self.rank(category)
+        if not routes:
+            raise ValueError(f"No LLM routes configured for {category}")
+
+        if cache and not fresh:
+            keys = [self._cache_key(route, agent, task, context) for route in routes]
+            cached = llm_cache.get_first(keys, "agent")
+            if cached is not None:
+                return cached["content"], None
+
+        pending = {}
+        last_error: Optional[Exception] = None
+        next_index = 0
+
+        def launch(hedge: bool = False) -> bool:
+            nonlocal next_index
+            route = routes[next_index]
+            if hedge:
+                # A hedge that would wait for rate limit capacity cannot beat the primary
+                provider, model = self._model(route)
+                if not rate_limiter.try_acquire(provider, model, self._estimate(agent, task, context)):
+                    logger.info(f"Skipping hedge on {route.name} for {agent.role}, no rate limit capacity")
+                    return False
+            next_index += 1
+            executor = self._hedge_executor if hedge else self._executor
+            future = executor.submit(self._call, route, agent, task, context, cache, hedge)
+            pending[future] = route
+            return True
+
+        def drop_losers():
+            # Losers that have not started are dropped; running ones finish on their own thread
+            for future in pending:
+                future.cancel()
+
+        launch()
+        hedged = False
+        while pending:
+            hedge_delay = None
+            if self.hedging and not hedged and next_index < len(routes):
+                primary = next(iter(pending.values()))
+                hedge_delay = max(self._stats_for(primary).percentile(0.95) or self.default_latency, self.min_hedge_delay)
+            done, _ = wait(list(pending), timeout=hedge_delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # Tail latency: race the next route against the slow one
+                hedged = True
+                if launch(hedge=True):
+                    logger.info(f"{agent.role} slow on {next(iter(pending.values())).name}, hedging on {routes[next_index - 1].name}")
+                continue
+            for future in done:
+                route = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"{agent.role} failed on {route.name}: {str(e)}")
+                    continue
+                if hedged:
+                    with self._lock:
+                        self._stats_for(route).hedges_won += 1
+                drop_losers()
+                return result
+            if not pending and next_index < len(routes):
+                launch()
+        raise last_error or Exception(f"All routes failed for {agent.role}")
+
+    def _call(self, route: Route, agent, task, context: str, cache: bool = False, reserved: bool = False) -> str:
+        # A limiter timeout or any other exit without an outcome must still free a half-open trial
+        with llm_clients.admitted(route.provider):
+            llm = self._llm(route, self._temperature(agent))
+            provider, model = self._model(route)
+            estimated_tokens = self._estimate(agent, task, context)
+            if not reserved:
+                rate_limiter.acquire(provider, model, estimated_tokens)
+
+            # Per-request copy: the module-level agent is shared by every concurrent generation
+            routed_agent = agent.copy()
+            routed_agent.llm = llm
+
+            started = time.monotonic()
+            try:
+                output = routed_agent.execute_task(task, context=context)
+            except Exception as e:
+                error_str = str(e)
+                if "429" in error_str or "RateLimit" in error_str:
+                    rate_limiter.penalize(provider, model, 5)
+                llm_clients.record_failure(route.provider, e)
+                self._record(route, None, False)
+                raise
+            llm_clients.record_success(route.provider)
+        self._record(route, time.monotonic() - started, True)
+        # The copy has its own token counter, so this is exactly this call's usage
+        summary = routed_agent._token_process.get_summary()
+        # Give the bucket back what the estimate over-reserved, or charge what it missed
+        rate_limiter.reconcile(provider, model, estimated_tokens, summary.prompt_tokens + summary.completion_tokens)
+        if cache:
+            llm_cache.put(self._cache_key(route, agent, task, context), "agent", {"content": str(output)})
+        return output, {"prompt_tokens": summary.prompt_tokens, "completion_tokens": summary.completion_tokens}
+
+    @staticmethod
+    def _estimate(agent, task, context: str) -> int:
+        return rate_limiter.estimate_tokens(f"{agent.backstory}\n{task.description}\n{context}", 2048)
+
+    @staticmethod
+    def _temperature(agent) -> float:
+        # An explicit temperature of 0 is kept; only a missing one falls back to the default
+        temperature = getattr(agent.llm, "temperature", None)
+        return 0.7 if temperature is None else temperature
+
+    @staticmethod
+    def _model(route: Route) -> Tuple[str, str]:
+        return route.provider, (os.getenv(route.model_env) or "").removeprefix(f"{route.provider}/")
+
+    def _cache_key(self, route: Route, agent, task, context: str) -> str:
+        provider, model = self._model(route)
+        return llm_cache.agent_key(agent, task, context, f"{provider}/{model}", self._temperature(agent))
+
+    def _llm(self, route: Route, temperature: float):
+        key = (route.name, round(float(temperature), 2))
+        with self._lock:
+            if key not in self._llms:
+                self._llms[key] = route.factory(temp=temperature, model=route.category)
+            return self._llms[key]
+
+    def _stats_for(self, route: Route) -> RouteStats:
+        with self._lock:
+            return self._stats.setdefault(route.name, RouteStats())
+
+    def _record(self, route: Route, latency: Optional[float], ok: bool):
+        with self._lock:
+            self._stats.setdefault(route.name, RouteStats()).record(latency, ok)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return latency percentiles, error rate and hedge wins per route."""
+        with self._lock:
+            items = list(self._stats.items())
+        return {
+            name: {
+                "calls": stats.calls,
+                "p50_seconds": stats.percentile(0.5),
+                "p95_seconds": stats.percentile(0.95),
+                "error_rate": round(stats.error_rate, 3),
+                "hedges_won": stats.hedges_won,
+            }
+            for name, stats in items
+        }
+
+
+provider_router = ProviderRouter()
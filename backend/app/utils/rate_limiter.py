@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+from ..database import get_redis, get_async_redis
+from .token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per-provider defaults; override or add "provider/model" entries with LLM_RATE_LIMITS (JSON)
+DEFAULT_LIMITS = {
+    "groq": {"rpm": 30, "tpm": 30000},
+    "gemini": {"rpm": 60, "tpm": 1000000},
+}
+
+# Refill both buckets for the elapsed time, then take one request and `cost` tokens,
+# or return how many seconds to wait until both can be taken
+ACQUIRE_SCRIPT = """
+local key = ARGV[1]
+local now = tonumber(ARGV[2])
+local rpm = tonumber(ARGV[3])
+local tpm = tonumber(ARGV[4])
+local cost = math.min(tonumber(ARGV[5]), tpm)
+local state = redis.call('HMGET', key, 'requests', 'tokens', 'ts', 'blocked_until')
+local blocked_until = tonumber(state[4] or '0')
+if blocked_until > now then
+    return tostring(blocked_until - now)
+end
+local elapsed = math.max(0, now - tonumber(state[3] or now))
+local requests = math.min(rpm, tonumber(state[1] or rpm) + elapsed * rpm / 60)
+local tokens = math.min(tpm, tonumber(state[2] or tpm) + elapsed * tpm / 60)
+local wait = 0
+if requests < 1 then
+    wait = (1 - requests) * 60 / rpm
+end
+if tokens < cost then
+    wait = math.max(wait, (cost - tokens) * 60 / tpm)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - cost
+end
+redis.call('HSET', key, 'requests', tostring(requests), 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', key, 300)
+return tostring(wait)
+"""
+
+
+class LLMRateLimitTimeoutError(Exception):
+    """Waited too long for rate limit capacity"""
+    pass
+
+
+class LLMRateLimiter:
+    """Distributed token buckets for LLM requests and tokens per minute.
+
+    Every replica and worker draws from the same Redis buckets, one pair
+    per provider and model, so together they stay under the provider's
+    quota. Callers that find the buckets empty wait for capacity (up to
+    ``LLM_RATE_LIMIT_MAX_WAIT`` seconds) instead of sending a request
+    that would be rejected with a 429. Token costs are estimated before
+    the call and corrected with the provider-reported usage afterwards.
+    """
+
+    def __init__(self, prefix: str = "ratelimit"):
+        self.prefix = prefix
+        self.enabled = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+        self.max_wait = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", 120))
+        self.limits: Dict[str, Dict[str, float]] = dict(DEFAULT_LIMITS)
+        try:
+            self.limits.update(json.loads(os.getenv("LLM_RATE_LIMITS", "{}")))
+        except ValueError:
+            logger.error("LLM_RATE_LIMITS is not valid JSON, using default rate limits")
+        self._script = None
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def limits_for(self, provider: str, model: str) -> Optional[Dict[str, float]]:
+        return self.limits.get(f"{provider}/{model}") or self.limits.get(provider)
+
+    def estimate_tokens(self, prompt: str, max_tokens: Optional[int] = None) -> int:
+        """Prompt tokens counted with TokenTracker's memoised encoder, plus the completion budget."""
+        return count_tokens(prompt) + int(max_tokens or 1000)
+
+    def _key(self, provider: str, model: str) -> str:
+        return f"{self.prefix}:{provider}:{model}"
+
+    def _try_acquire(self, provider: str, model: str, tokens: int) -> float:
+        """Take capacity if available; returns 0, or the seconds to wait before trying again."""
+        limits = self.limits_for(provider, model)
+        if not self.enabled or not limits:
+            return 0.0
+        try:
+            redis_client = get_redis()
+            if self._script is None:
+                self._script = redis_client.register_script(ACQUIRE_SCRIPT)
+            return float(self._script(args=[
+                self._key(provider, model), time.time(), limits["rpm"], limits["tpm"], tokens
+            ]))
+        except Exception as e:
+            # Never block generations on the limiter itself
+            logger.warning(f"Rate limiter unavailable, proceeding without it: {str(e)}")
+            return 0.0
+
+    def try_acquire(self, provider: str, model: str, tokens: int) -> bool:
+        """Take capacity only if it is available right now; never waits."""
+        if self._try_acquire(provider, model, tokens) > 0:
+            return False
+        self._record(provider, model, 0.0)
+        return True
+
+    async def _try_acquire_async(self, provider: str, model: str, tokens: int) -> float:
+        """``_try_acquire`` on the event loop's async Redis client, so the loop is never blocked."""
+        limits = self.limits_for(provider, model)
+        if not self.enabled or not limits:
+            return 0.0
+        try:
+            # Scripts are bound to a client and the async clients are per event loop; registering
+            # only hashes the source locally, and the script is loaded on first use
+            script = get_async_redis().register_script(ACQUIRE_SCRIPT)
+            return float(await script(args=[
+                self._key(provider, model), time.time(), limits["rpm"], limits["tpm"], tokens
+            ]))
+        except Exception as e:
+            # Never block generations on the limiter itself
+            logger.warning(f"Rate limiter unavailable, proceeding without it: {str(e)}")
+            return 0.0
+
+    def acquire(self, provider: str, model: str, tokens: int) -> float:
+        """Block until capacity is available; returns the seconds waited.
+
+        Raises:
+            LLMRateLimitTimeoutError: If capacity did not free up within max_wait
+        """
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire(provider, model, tokens)
+            if wait <= 0:
+                return self._record(provider, model, time.monotonic() - started)
+            self._check_deadline(provider, model, started, wait)
+            time.sleep(wait + random.uniform(0, 0.25))
+
+    async def acquire_async(self, provider: str, model: str, tokens: int) -> float:
+        """Async version of ``acquire`` that waits without blocking the event loop."""
+        started = time.monotonic()
+        while True:
+            wait = await self._try_acquire_async(provider, model, tokens)
+            if wait <= 0:
+                return self._record(provider, model, time.monotonic() - started)
+            self._check_deadline(provider, model, started, wait)
+            await asyncio.sleep(wait + random.uniform(0, 0.25))
+
+    def reconcile(self, provider: str, model: str, estimated: int, actual: Optional[int]):
+        """Return over-estimated tokens to the bucket, or charge the shortfall."""
+        if not self.enabled or not actual or not self.limits_for(provider, model):
+            return
+        try:
+            get_redis().hincrbyfloat(self._key(provider, model), "tokens", estimated - actual)
+        except Exception as e:
+            logger.warning(f"Failed to reconcile rate limiter tokens: {str(e)}")
+
+    async def reconcile_async(self, provider: str, model: str, estimated: int, actual: Optional[int]):
+        """Async version of ``reconcile`` for callers on the event loop."""
+        if not self.enabled or not actual or not self.limits_for(provider, model):
+            return
+        try:
+            await get_async_redis().hincrbyfloat(self._key(provider, model), "tokens", estimated - actual)
+        except Exception as e:
+            logger.warning(f"Failed to reconcile rate limiter tokens: {str(e)}")
+
+    def penalize(self, provider: str, model: str, seconds: float):
+        """Hold every caller off a model after the provider answered 429."""
+        if not self.enabled:
+            return
+        try:
+            get_redis().hset(self._key(provider, model), "blocked_until", time.time() + max(seconds, 1))
+        except Exception as e:
+            logger.warning(f"Failed to record rate limit back-off: {str(e)}")
+
+    async def penalize_async(self, provider: str, model: str, seconds: float):
+        """Async version of ``penalize`` for callers on the event loop."""
+        if not self.enabled:
+            return
+        try:
+            await get_async_redis().hset(self._key(provider, model), "blocked_until", time.time() + max(seconds, 1))
+        except Exception as e:
+            logger.warning(f"Failed to record rate limit back-off: {str(e)}")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return this process's waits per provider/model."""
+        with self._stats_lock:
+            return {key: dict(value) for key, value in self._stats.items()}
+
+    def _check_deadline(self, provider: str, model: str, started: float, wait: float):
+        if time.monotonic() - started + wait > self.max_wait:
+            raise LLMRateLimitTimeoutError(
+                f"No {provider}/{model} capacity within {self.max_wait:.0f}s, please try again shortly"
+            )
+
+    def _record(self, provider: str, model: str, waited: float) -> float:
+        with self._stats_lock:
+            stats = self._stats.setdefault(f"{provider}/{model}", {"acquired": 0, "waited": 0, "wait_seconds": 0.0})
+            stats["acquired"] += 1
+            if waited > 0.01:
+                stats["waited"] += 1
+                stats["wait_seconds"] = round(stats["wait_seconds"] + waited, 2)
+        if waited > 1:
+            logger.info(f"Waited {waited:.1f}s for {provider}/{model} rate limit capacity")
+        return waited
+
+
+rate_limiter = LLMRateLimiter()
@@ -198,12 +198,11 @@ def extract_keyword_stats(agent_outputs: str) -> dict:
                     stats[parts[0].strip()] = int(parts[1].strip())
     return stats
 
-def format_analysis_summary(agent_outputs: str, initial_scores: dict = None) -> str:
+async def format_analysis_summary(agent_outputs: str, initial_scores: dict = None, fresh: bool = False) -> str:
     """Generate analysis summary using direct Groq AI chat completion."""
+    from .async_llm import async_llm
+
     try:
-        # Initialize Groq client
-        groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        
         # Create the prompt for summary generation
         prompt = f"""
         Create a comprehensive resume analysis summary in markdown format based on the following agent outputs.
@@ -260,7 +259,7 @@ def format_analysis_summary(agent_outputs: str, initial_scores: dict = None) ->
         """
         
         # Make the chat completion call
-        chat_completion = groq_client.chat.completions.create(
+        chat_completion = await async_llm.chat(
             messages=[
                 {
                     "role": "system",
@@ -272,14 +271,16 @@ def format_analysis_summary(agent_outputs: str, initial_scores: dict = None) ->
                 }
             ],
             model=os.getenv("GROQ_MODEL"),
+            fallback=("gemini",),
+            cache="analysis_summary",
+            fresh=fresh,
             temperature=0.3,
             max_tokens=2048,
-            top_p=1,
-            stream=False
+            top_p=1
         )
         
         # Extract and return the response
-        result = chat_completion.choices[0].message.content.strip()
+        result = chat_completion.content.strip()
         return result
         
     except Exception as e:
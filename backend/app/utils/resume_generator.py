@@ -1,16 +1,25 @@
-import groq
+import asyncio
 import os
 import time
+import uuid
+import threading
 import logging
 from typing import Dict, Any, List, Tuple, Optional
 import json
 from pathlib import Path
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from ..latex.processor import LatexProcessor
-import tiktoken
+from ..latex.processor import LatexProcessor, extract_analysis_section
 import subprocess
 from .. import models
-from ..database import SessionLocal, get_job_title_from_cache, save_generation_status
+from ..database import SessionLocal, get_job_title_from_cache, save_generation_status, publish_generation_event, append_generation_partial, reset_generation_partial
+from .llm_clients import llm_clients
+from .async_llm import async_llm
+from .rate_limiter import rate_limiter
+from .provider_router import provider_router
+from .token_counter import count_tokens, usage_tokens
+from .job_description import job_description_analyzer, JobDescriptionProfile
+from .s3_cleanup import s3_cleanup_queue, resume_s3_keys
 from .resume_assessment_agents import (
                 content_quality_agent,
                 # formatting_agent,
@@ -22,8 +31,7 @@ from .resume_assessment_agents import (
                 skills_task,
                 experience_task,
                 resume_construction_task,
-                calculate_total_tokens,
-                create_llm
+                calculate_total_tokens
             )
 
 
@@ -41,16 +49,21 @@ class TokenTracker:
         self.agent_output_tokens = 0
         self.session_history = []
         self.agent_history = []
-        self.encoder = tiktoken.get_encoding("cl100k_base")  # Using OpenAI's tokenizer as approximation
         
     def count_tokens(self, text: str) -> int:
-        """Count tokens in a string using the tokenizer"""
-        return len(self.encoder.encode(text))
+        """Count tokens in a string using the shared, memoised tokenizer"""
+        return count_tokens(text)
     
-    def add_api_call(self, prompt: str, response: Optional[str]) -> Dict[str, Any]:
+    def _tokens(self, prompt: str, response: Optional[str], usage: Any) -> Tuple[int, int]:
+        """Provider-reported (input, output) tokens, tokenizing only when usage is unavailable"""
+        reported = usage_tokens(usage)
+        if reported is not None:
+            return reported
+        return self.count_tokens(prompt), self.count_tokens(response) if response else 0
+    
+    def add_api_call(self, prompt: str, response: Optional[str], usage: Any = None) -> Dict[str, Any]:
         """Record a new API call with input and output tokens"""
-        input_tokens = self.count_tokens(prompt)
-        output_tokens = self.count_tokens(response) if response else 0
+        input_tokens, output_tokens = self._tokens(prompt, response, usage)
         
         self.total_input_tokens += input_tokens * 2
         self.total_output_tokens += output_tokens * 2
@@ -71,10 +84,9 @@ class TokenTracker:
         """Calculate cost in dollars for a given number of tokens"""
         return (num_tokens / 1_000_000) * self.COST_PER_MILLION_TOKENS * 120
     
-    def add_agent_call(self, agent_name: str, context: str, response: str) -> Dict[str, Any]:
+    def add_agent_call(self, agent_name: str, context: str, response: str, usage: Any = None) -> Dict[str, Any]:
         """Record a new agent call with input and output tokens"""
-        input_tokens = self.count_tokens(context)
-        output_tokens = self.count_tokens(response)
+        input_tokens, output_tokens = self._tokens(context, response, usage)
         
         self.agent_input_tokens += input_tokens
         self.agent_output_tokens += output_tokens
@@ -114,24 +126,13 @@ class TokenTracker:
 class ResumeGenerator:
     def __init__(self, db: Session):
         self.db = db
-        self.client = groq.Groq(api_key=os.getenv("GROQ_API_KEY"))
         self.latex_processor = LatexProcessor(db)
         self.token_tracker = TokenTracker()
-        # Validate Groq API on initialization
-        try:
-            model = os.getenv("GROQ_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")  # Default to mixtral if not set
-            if not model:
-                raise ValueError("GROQ_MODEL environment variable must be set")
 
-            self.client.chat.completions.create(
-                messages=[{"role": "user", "content": "test"}],
-                model=model,
-                max_tokens=1
-            )
-            logger.info("Successfully validated Groq API connection")
-        except Exception as e:
-            logger.error(f"Failed to validate Groq API: {str(e)}")
-            raise
+    @property
+    def client(self):
+        """Shared Groq client; provider health is tracked by the client registry, not per instance."""
+        return llm_clients.groq
 
     def format_experiences(self, experiences: List[str]) -> str:
         """Format experiences into a readable string."""
@@ -151,7 +152,7 @@ class ResumeGenerator:
             return "No skills provided"
         return ", ".join(skills)
 
-    def generate_optimized_resume(self, professional_info: Dict[str, Any], job_description: str, skills: Optional[List[str]] = None) -> Tuple[Optional[str], Dict[str, Any]]:
+    async def generate_optimized_resume(self, professional_info: Dict[str, Any], job_description: str, skills: Optional[List[str]] = None, fresh: bool = False) -> Tuple[Optional[str], Dict[str, Any]]:
         """
         Generate an optimized resume content using Groq AI and track token usage.
         Returns both the generated content and token usage statistics.
@@ -291,7 +292,7 @@ class ResumeGenerator:
             if not model:
                 raise ValueError("GROQ_MODEL environment variable must be set")
 
-            chat_completion = self.client.chat.completions.create(
+            chat_completion = await async_llm.chat(
                 messages=[
                     {
                         "role": "system",
@@ -303,20 +304,22 @@ class ResumeGenerator:
                     }
                 ],
                 model=model,
+                fallback=("gemini",),
+                cache="initial_resume",
+                fresh=fresh,
                 temperature=0.7,
                 max_tokens=2000,
-                top_p=1,
-                stream=False
+                top_p=1
             )
 
             # Extract the generated content and escape special LaTeX characters
-            generated_content = chat_completion.choices[0].message.content
+            generated_content = chat_completion.content
             if generated_content:
                 generated_content = generated_content.replace('&', '\&').replace('%', '\%')
                 generated_content = generated_content.replace('R&D', 'R\&D')
 
             # Track token usage
-            usage_stats = self.token_tracker.add_api_call(prompt, generated_content)
+            usage_stats = self.token_tracker.add_api_call(prompt, generated_content, chat_completion.usage)
 
             # logger.info(f"Optimized resume generated by AI:\n{generated_content or 'No content generated'}")
             logger.info(f"Token usage for this generation: {json.dumps(usage_stats, indent=2)}")
@@ -327,6 +330,45 @@ class ResumeGenerator:
             logger.error(f"Error generating optimized resume: {str(e)}")
         raise
 
+    def finish_saved_generation(self, resume_gen_id: str) -> Optional[Dict[str, Any]]:
+        """Complete a job from the Resume row an earlier attempt already saved.
+
+        A retried or duplicate attempt of a job (worker retry, expired lease)
+        must not upload and insert the resume again, so it finishes from the
+        stored row; the result then always matches what was saved.
+
+        Returns:
+            dict | None: The job's result, or None if no resume was saved for it yet
+        """
+        db = SessionLocal()
+        try:
+            resume = db.query(models.Resume).filter(models.Resume.id == resume_gen_id).first()
+            if resume is None:
+                return None
+            content = resume.content
+            if resume.content_s3_key:
+                from .s3_storage import s3_storage
+                content = s3_storage.download_text(resume.content_s3_key) or content
+            job_title, company_name = resume.job_title, resume.company_name
+        finally:
+            db.close()
+
+        from ..database import generation_result_artifacts, save_generation_result
+        result_data = {
+            'job_id': resume_gen_id,
+            'job_title': job_title or 'Resume',
+            'company_name': company_name,
+            'content': content,
+            'token_usage': {},
+            'total_usage': self.token_tracker.get_total_usage(),
+            'artifacts': generation_result_artifacts(resume_gen_id),
+            'message': 'Resume generated successfully'
+        }
+        save_generation_result(resume_gen_id, result_data, expiration=3600)
+        save_generation_status(resume_gen_id, "completed", 100, "Resume generation completed successfully!", 0)
+        logger.info(f"Job {resume_gen_id} finished from the resume an earlier attempt saved")
+        return result_data
+
     def get_existing_resume(self, user_id: int) -> Optional[str]:
         """
         Compile information from all available profile sections and use that data for optimized resume generation.
@@ -475,13 +517,14 @@ class ResumeGenerator:
             logger.error(f"Error compiling profile section data: {str(e)}")
             return None
 
-    def estimate_generation_time(self, job_description: str, has_existing_resume: bool = False) -> int:
+    def estimate_generation_time(self, job_description: str, has_existing_resume: bool = False, jd_profile: Optional[JobDescriptionProfile] = None) -> int:
         """
         Estimate total generation time based on job description complexity and existing data.
         
         Args:
             job_description: The job description text
             has_existing_resume: Whether user has an existing resume
+            jd_profile: Structured job description, if it was extracted
             
         Returns:
             int: Estimated time in seconds
@@ -489,8 +532,11 @@ class ResumeGenerator:
         base_time = 60 if has_existing_resume else 30  # Base time in seconds
         
         # Add time based on job description complexity
-        job_desc_length = len(job_description)
-        complexity_factor = min(job_desc_length / 1000 * 30, 60)  # Max 60s additional
+        if jd_profile is not None:
+            complexity_factor = min(jd_profile.complexity * 2, 60)  # Max 60s additional
+        else:
+            job_desc_length = len(job_description)
+            complexity_factor = min(job_desc_length / 1000 * 30, 60)  # Max 60s additional
         
         # Agent processing time (4 agents * average time per agent)
         agent_time = 4 * 15  # 45 seconds per agent
@@ -498,7 +544,85 @@ class ResumeGenerator:
         total_estimate = int(base_time + complexity_factor + agent_time)
         return min(total_estimate, 300)  # Cap at 10 minutes
 
-    async def optimize_resume(self, resume_gen_id:str, professional_info: Dict[str, Any], job_description: str, skills: Optional[List[str]] = None, user_id: Optional[int] = None, company_name: Optional[str] = None, job_title: Optional[str] = None) -> Dict[str, Any]:
+    def stream_resume_construction(self, resume_gen_id: str, construction_context: str, timeout: float = 90,
+                                   run_id: Optional[str] = None, cancel: Optional[threading.Event] = None) -> str:
+        """
+        Run the resume construction step as a streamed Groq completion.
+
+        Uses the constructor agent's role, goal and task, and publishes the
+        newly streamed text as "partial" events (with its offset) on the job's
+        progress channel while tokens arrive.
+
+        Args:
+            resume_gen_id: Generation job ID whose channel receives the partial resume
+            construction_context: Job description, initial content and expert suggestions
+            timeout: Seconds allowed for the whole completion
+            run_id: Stream id registered with reset_generation_partial; a new one is registered if omitted
+            cancel: Set by the caller once it stops waiting, so the stream stops too
+
+        Returns:
+            str: The complete constructed resume
+        """
+        agent = resume_constructor_agent
+        task = resume_construction_task
+        messages = [
+            {
+                "role": "system",
+                "content": f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {agent.goal}"
+            },
+            {
+                "role": "user",
+                "content": f"{task.description}\n\nThis is the expected criteria for your final answer: {task.expected_output}"
+                           f"\n\nThis is the context you're working with:\n{construction_context}"
+            }
+        ]
+        model = os.getenv("GROQ_MANAGER", "").removeprefix("groq/")
+        publish_interval = float(os.getenv("CONSTRUCTION_STREAM_PUBLISH_INTERVAL", 0.3))
+        deadline = time.monotonic() + timeout
+
+        rate_limiter.acquire("groq", model, rate_limiter.estimate_tokens(
+            "\n".join(m["content"] for m in messages), 2048
+        ))
+
+        if run_id is None:
+            run_id = str(uuid.uuid4())
+            reset_generation_partial(resume_gen_id, run_id)
+
+        parts = []
+        published = 0  # Characters already appended to the job's partial text
+        last_published = 0.0
+        for chunk in llm_clients.groq_chat_completion_stream(
+            model=model,
+            messages=messages,
+            temperature=getattr(agent.llm, "temperature", None) or 0.6,
+            timeout=timeout
+        ):
+            if time.monotonic() > deadline:
+                raise Exception(f"Timeout error for {agent.role}")
+            if cancel is not None and cancel.is_set():
+                raise Exception(f"Streamed construction for {resume_gen_id} was abandoned")
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            # Publish only the text added since the last event; clients that connect
+            # mid-stream catch up from the accumulated copy in Redis
+            if time.monotonic() - last_published >= publish_interval:
+                pending = "".join(parts)[published:]
+                append_generation_partial(resume_gen_id, run_id, published, pending)
+                published += len(pending)
+                last_published = time.monotonic()
+
+        streamed = "".join(parts)
+        final_resume = streamed.strip()
+        if not final_resume:
+            raise Exception(f"Empty streamed response for {agent.role}")
+        append_generation_partial(resume_gen_id, run_id, published, streamed[published:], done=True)
+        return final_resume
+
+    async def optimize_resume(self, resume_gen_id:str, professional_info: Dict[str, Any], job_description: str, skills: Optional[List[str]] = None, user_id: Optional[int] = None, company_name: Optional[str] = None, job_title: Optional[str] = None, fresh_variation: bool = False) -> Dict[str, Any]:
         """
         Main function to optimize the entire resume using assessment agents with progress tracking.
         Returns the optimized content along with token usage statistics.
@@ -506,6 +630,8 @@ class ResumeGenerator:
         try:
             # Initialize progress tracking
             save_generation_status(resume_gen_id, "parsing", 5, "Analyzing job description and requirements...")
+            # A retried attempt starts its streamed resume from scratch
+            reset_generation_partial(resume_gen_id)
             
             # Check for existing resume first
             initial_content = None
@@ -519,79 +645,95 @@ class ResumeGenerator:
                     has_existing_resume = True
                     logger.info(f"Used Existing Resume")
             
+            # Structured job description, extracted once per posting and shared across users
+            jd_profile = await job_description_analyzer.analyze(job_description)
+            agent_job_description = jd_profile.to_prompt() if jd_profile is not None else job_description
+
             # Estimate total time
-            estimated_time = self.estimate_generation_time(job_description, has_existing_resume)
+            estimated_time = self.estimate_generation_time(job_description, has_existing_resume, jd_profile)
             save_generation_status(resume_gen_id, "parsing", 10, "Processing job requirements...", estimated_time - 5)
             
             # Generate initial content using Groq AI if no existing resume
             if initial_content is None:
                 save_generation_status(resume_gen_id, "parsing", 15, "Generating initial resume content...", estimated_time - 10)
-                initial_content, usage_stats = self.generate_optimized_resume(professional_info, job_description, skills)
+                initial_content, usage_stats = await self.generate_optimized_resume(professional_info, job_description, skills, fresh=fresh_variation)
                 logger.info(f"Used Fake Resume from Groq")
             
-            context = f"job description:\n{job_description}\n############\ninitial_content:\n{initial_content}"
+            context = f"job description:\n{agent_job_description}\n############\ninitial_content:\n{initial_content}"
             
-            # Execute tasks with timeout handling and progress tracking
-            def execute_with_timeout(agent, task, timeout=300):
-                import concurrent.futures
-                max_retries = 3
-                base_delay = 1
-                
-                for attempt in range(max_retries):
-                    try:
-                        with concurrent.futures.ThreadPoolExecutor() as executor:
-                            future = executor.submit(agent.execute_task, task, context=context)
-                            try:
-                                return future.result(timeout=timeout)
-                            except concurrent.futures.TimeoutError:
-                                logger.error(f"Timeout executing {agent.role}")
-                                raise Exception(f"Timeout error for {agent.role}")
-                                
-                    except Exception as e:
-                        error_str = str(e)
-                        if "503" in error_str and "VertexAI" in error_str:
-                            logger.warning(f"VertexAI model overloaded (attempt {attempt + 1}/{max_retries})")
-                        elif "Timeout" in error_str:
-                            logger.error(f"Timeout executing {agent.role}")
-                        else:
-                            logger.error(f"Error executing {agent.role}: {error_str}")
-                            
-                        if attempt == max_retries - 1:
-                            logger.error(f"Failed after {max_retries} attempts for {agent.role}")
-                            # Force fallback to Groq
-                            agent.llm = create_llm(model="AGENT")
-                            return agent.execute_task(task, context=context)
-                            
-                        # Exponential backoff
-                        delay = base_delay * (2 ** attempt)
-                        time.sleep(min(delay, 10))
-
-            # Content Quality Analysis (25-45%)
-            save_generation_status(resume_gen_id, "analyzing", 25, "Analyzing content quality and relevance...", estimated_time - 20)
-            content_quality_result = execute_with_timeout(content_quality_agent, content_quality_task)
-            self.token_tracker.add_agent_call(
-                "content_quality_agent",
-                context,
-                content_quality_result
-            )
-
-            # Skills Analysis (45-65%)
-            save_generation_status(resume_gen_id, "optimizing", 45, "Optimizing skills alignment with job requirements...", estimated_time - 50)
-            skills_result = execute_with_timeout(skills_agent, skills_task)
-            self.token_tracker.add_agent_call(
-                "skills_agent",
-                context,
-                skills_result
-            )
-
-            # Experience Analysis (65-85%)
-            save_generation_status(resume_gen_id, "optimizing", 65, "Enhancing experience descriptions and achievements...", estimated_time - 65)
-            experience_result = execute_with_timeout(experience_agent, experience_task)
-            self.token_tracker.add_agent_call(
-                "experience_agent",
-                context,
-                experience_result
-            )
+            # Route each agent call to the fastest healthy provider, on a per-request copy of the agent
+            def execute_routed(agent, task, task_context, cache=False):
+                category = "MANAGER" if agent is resume_constructor_agent else "AGENT"
+                return provider_router.execute_with_usage(
+                    agent, task, task_context, category, cache=cache, fresh=fresh_variation
+                )
+
+            async def execute_with_timeout(agent, task, task_context, timeout, cache=False):
+                # The timeout stops waiting for the agent, not the call itself: crewai has no
+                # cancellation, so the worker thread and its LLM request run on to completion
+                # and their result is discarded
+                try:
+                    return await asyncio.wait_for(
+                        asyncio.to_thread(execute_routed, agent, task, task_context, cache),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.error(f"Timeout executing {agent.role}")
+                    raise Exception(f"Timeout error for {agent.role}")
+
+            # The three analyses only need the shared context, so they run concurrently (25-85%)
+            analysis_timeout = float(os.getenv("AGENT_TIMEOUT_SECONDS", 300))
+            # (name, agent, task, progress label, section header the report parsers look for)
+            analyses = [
+                ("content_quality_agent", content_quality_agent, content_quality_task, "Content quality analysis", "Content Quality Analysis"),
+                ("skills_agent", skills_agent, skills_task, "Skills alignment analysis", "Skills Analysis"),
+                ("experience_agent", experience_agent, experience_task, "Experience analysis", "Experience Analysis"),
+            ]
+            save_generation_status(resume_gen_id, "analyzing", 25, "Analyzing content quality, skills and experience...", estimated_time - 20)
+
+            async def run_analysis(index, agent, task):
+                # Identical inputs (same job description, unchanged profile) reuse the earlier analysis
+                try:
+                    result, usage = await execute_with_timeout(agent, task, context, analysis_timeout, cache=True)
+                except Exception as e:
+                    return index, None, None, e
+                return index, result, usage, None
+
+            analysis_results = [None] * len(analyses)
+            completed = 0
+            failed = 0
+            for finished in asyncio.as_completed([
+                run_analysis(index, agent, task) for index, (_, agent, task, _, _) in enumerate(analyses)
+            ]):
+                index, result, usage, error = await finished
+                name, _, _, label, header = analyses[index]
+                completed += 1
+                if error is not None:
+                    failed += 1
+                    logger.error(f"{name} failed, continuing without it: {str(error)}")
+                    # Keep the section header so the report can still be built from the other analyses
+                    analysis_results[index] = f"{header}:\nNot available for this resume.\n####"
+                    step = f"{label} unavailable, continuing with remaining analyses..."
+                else:
+                    analysis_results[index] = result
+                    self.token_tracker.add_agent_call(name, context, result, usage)
+                    step = f"{label} complete ({completed}/{len(analyses)})"
+                    publish_generation_event(resume_gen_id, "agent_output", {
+                        "agent": name,
+                        "label": label,
+                        "output": str(result)
+                    })
+                save_generation_status(
+                    resume_gen_id,
+                    "analyzing" if completed < 2 else "optimizing",
+                    25 + completed * 20,
+                    step,
+                    max(estimated_time - 20 - completed * 15, 10)
+                )
+
+            if failed == len(analyses):
+                raise Exception("All resume analyses failed")
+            content_quality_result, skills_result, experience_result = analysis_results
 
             # Combine agent outputs
             agent_outputs = f"""
@@ -602,19 +744,47 @@ class ResumeGenerator:
             {experience_result}
             """
 
-            # Final Resume Construction (85-95%)
+            # Final Resume Construction (85-95%), with the expert suggestions it is asked to apply
             save_generation_status(resume_gen_id, "constructing", 85, "Constructing final optimized resume...", estimated_time - 80)
-            final_resume = execute_with_timeout(resume_constructor_agent, resume_construction_task, timeout=90)
+            construction_context = f"{context}\n############\nexpert suggestions:\n{agent_outputs}"
+            final_resume = None
+            if os.getenv("STREAM_RESUME_CONSTRUCTION", "true").lower() == "true":
+                stream_run_id = str(uuid.uuid4())
+                cancel_stream = threading.Event()
+                reset_generation_partial(resume_gen_id, stream_run_id)
+                try:
+                    final_resume = await asyncio.wait_for(
+                        asyncio.to_thread(
+                            self.stream_resume_construction, resume_gen_id, construction_context, 90,
+                            stream_run_id, cancel_stream
+                        ),
+                        timeout=95
+                    )
+                except Exception as e:
+                    logger.warning(f"Streamed resume construction failed, falling back to the agent: {str(e)}")
+                    # Stop the orphaned stream thread, reject anything it still appends and
+                    # clear the truncated text clients are showing
+                    cancel_stream.set()
+                    reset_generation_partial(resume_gen_id)
+            if final_resume is None:
+                final_resume, _ = await execute_with_timeout(
+                    resume_constructor_agent, resume_construction_task, construction_context, timeout=90
+                )
 
             # Save to database (95-100%)
             save_generation_status(resume_gen_id, "constructing", 95, "Finalizing and saving resume...", 10)
             
             # Format the analysis summary before saving
             from .resume_assessment_agents import format_analysis_summary
-            analysis_summary = format_analysis_summary(agent_outputs)
+            analysis_summary = await format_analysis_summary(agent_outputs, fresh=fresh_variation)
 
             # Save the resume to S3 and database
             if user_id:
+                # A duplicate attempt of this job may have saved it while this one was running
+                saved_result = self.finish_saved_generation(resume_gen_id)
+                if saved_result is not None:
+                    return {**saved_result, 'ai_content': saved_result['content'], 'professional_info': professional_info,
+                            'agent_outputs': agent_outputs, 'analysis_summary': analysis_summary}
                 db = SessionLocal()
                 try:
                     profile = db.query(models.Profile).filter(models.Profile.user_id == user_id).first()
@@ -627,19 +797,27 @@ class ResumeGenerator:
                         .order_by(models.Resume.created_at)\
                         .all()
                     
+                    # S3 objects of resumes removed for the limit, deleted once the DB commit succeeds
+                    evicted_s3_keys = []
                     if len(existing_resumes) >= 10:
                         oldest_resume = existing_resumes[0]
-                        # Delete from S3 if it has a content_s3_key
-                        if oldest_resume.content_s3_key:
-                            from .s3_storage import s3_storage
-                            s3_storage.delete_file(oldest_resume.content_s3_key)
+                        evicted_s3_keys = resume_s3_keys(oldest_resume)
                         db.delete(oldest_resume)
                         logger.info(f"Deleted oldest resume {oldest_resume.id} to maintain 10-resume limit")
                     
-                    # Try to save content to S3 first
+                    # Upload the content, job description, summary and analysis to S3 concurrently
                     s3_key = f"resumes/{user_id}/{resume_gen_id}.txt"
+                    job_description_s3_key = f"job_descriptions/{user_id}/{resume_gen_id}.txt"
+                    summary_s3_key = f"resumes/{user_id}/{resume_gen_id}_summary.txt"
+                    detailed_analysis_s3_key = f"resumes/{user_id}/{resume_gen_id}_analysis.txt"
                     from .s3_storage import s3_storage
-                    s3_upload_success = s3_storage.upload_text(final_resume, s3_key)
+                    uploaded = await s3_storage.upload_texts_async({
+                        s3_key: final_resume,
+                        job_description_s3_key: job_description,
+                        summary_s3_key: analysis_summary,
+                        detailed_analysis_s3_key: agent_outputs
+                    })
+                    s3_upload_success = uploaded[s3_key]
                     
                     # Determine storage strategy based on S3 success
                     if s3_upload_success:
@@ -652,14 +830,13 @@ class ResumeGenerator:
                         s3_key = None
                         logger.warning(f"S3 upload failed for {resume_gen_id}, storing content in database as fallback")
                     
-                    # Upload job description, summary, and analysis to S3
-                    job_description_s3_key = f"job_descriptions/{user_id}/{resume_gen_id}.txt"
-                    summary_s3_key = f"resumes/{user_id}/{resume_gen_id}_summary.txt"
-                    detailed_analysis_s3_key = f"resumes/{user_id}/{resume_gen_id}_analysis.txt"
-                    
-                    s3_storage.upload_text(job_description, job_description_s3_key)
-                    s3_storage.upload_text(analysis_summary, summary_s3_key)
-                    s3_storage.upload_text(agent_outputs, detailed_analysis_s3_key)
+                    # Only reference artifacts that were stored, so lazy lookups never chase a missing object
+                    if not uploaded[job_description_s3_key]:
+                        job_description_s3_key = None
+                    if not uploaded[summary_s3_key]:
+                        summary_s3_key = None
+                    if not uploaded[detailed_analysis_s3_key]:
+                        detailed_analysis_s3_key = None
 
                     # Save new resume to database
                     db_resume = models.Resume(
@@ -679,28 +856,37 @@ class ResumeGenerator:
                     db.add(db_resume)
                     db.commit()
                     db.refresh(db_resume)
+                    s3_cleanup_queue.enqueue(evicted_s3_keys, f"resume limit for user {user_id}")
                     
                     if s3_upload_success:
                         logger.info(f"Successfully saved resume to S3 and database metadata for user {user_id}")
                     else:
                         logger.info(f"Successfully saved resume to database (S3 fallback) for user {user_id}")
                         
+                except IntegrityError:
+                    # Another attempt inserted the row first; its resume is the one that counts
+                    db.rollback()
+                    saved_result = self.finish_saved_generation(resume_gen_id)
+                    if saved_result is None:
+                        raise
+                    return {**saved_result, 'ai_content': saved_result['content'], 'professional_info': professional_info,
+                            'agent_outputs': agent_outputs, 'analysis_summary': analysis_summary}
                 except Exception as e:
                     logger.error(f"Error saving resume to database/S3: {str(e)}")
                 finally:
                     db.close()
 
-            # Prepare the result data
+            # Compact result: the resume and references only. The analysis and agent
+            # outputs are already in S3 and served lazily by the analysis endpoint
+            from ..database import generation_result_artifacts
             result_data = {
                 'job_id': resume_gen_id,
-                'job_title': get_job_title_from_cache(resume_gen_id) or 'Resume',
-                'content': final_resume,  # Frontend expects 'content', not 'ai_content'
-                'ai_content': final_resume,  # Keep both for backward compatibility
-                'professional_info': professional_info,
+                'job_title': get_job_title_from_cache(resume_gen_id) or job_title or 'Resume',
+                'company_name': company_name,
+                'content': final_resume,
                 'token_usage': usage_stats,
                 'total_usage': self.token_tracker.get_total_usage(),
-                'agent_outputs': agent_outputs,
-                'analysis_summary': analysis_summary,
+                'artifacts': generation_result_artifacts(resume_gen_id),
                 'message': 'Resume generated successfully'
             }
 
@@ -712,11 +898,19 @@ class ResumeGenerator:
             # ONLY mark as completed AFTER the result is saved
             save_generation_status(resume_gen_id, "completed", 100, "Resume generation completed successfully!", 0)
 
-            return result_data
+            # Direct callers still get the full output
+            return {
+                **result_data,
+                'ai_content': final_resume,
+                'professional_info': professional_info,
+                'agent_outputs': agent_outputs,
+                'analysis_summary': analysis_summary
+            }
 
         except Exception as e:
             logger.error(f"Error optimizing resume: {str(e)}")
-            save_generation_status(resume_gen_id, "failed", 0, f"Generation failed: {str(e)}", 0)
+            # The caller decides between a retry and a final "failed" status;
+            # marking it failed here would make the failure permanent
             raise
 
     def _extract_scores(self, agent_output: str) -> Dict[str, float]:
@@ -737,9 +931,9 @@ class ResumeGenerator:
             'content_quality_score': scores.get('content_quality', 0),
             'skills_match_score': scores.get('skills_match', 0),
             'experience_quality_score': scores.get('experience_quality', 0),
-            'content_quality_analysis': agent_outputs.split("Content Quality Analysis:")[1].split("####")[0].strip(),
-            'skills_analysis': agent_outputs.split("Skills Analysis:")[1].split("####")[0].strip(),
-            'experience_analysis': agent_outputs.split("Experience Analysis:")[1].split("####")[0].strip(),
+            'content_quality_analysis': extract_analysis_section(agent_outputs, "Content Quality Analysis:"),
+            'skills_analysis': extract_analysis_section(agent_outputs, "Skills Analysis:"),
+            'experience_analysis': extract_analysis_section(agent_outputs, "Experience Analysis:"),
             'total_input_tokens': total_usage['total_input_tokens'],
             'total_output_tokens': total_usage['total_output_tokens'],
             'total_cost': round(total_usage['total_cost'], 2)
@@ -752,7 +946,8 @@ class ResumeGenerator:
             formatted_data = self.latex_processor.format_report_data(agent_outputs, total_usage)
             
             # Generate the PDF using the formatted data
-            pdf_path = self.latex_processor.generate_report_pdf(
+            pdf_path = await asyncio.to_thread(
+                self.latex_processor.generate_report_pdf,
                 template_name='report.tex.j2',
                 data=formatted_data
             )
@@ -1016,8 +1211,8 @@ class ResumeGenerator:
         return content.strip()
 
     async def generate_resume(self, resume_data: Dict[str, Any], personal_info: Dict[str, Any],
-                            job_title: str, format: str = 'pdf', template_id: str = None
-                            ) -> Tuple[str, Dict[str, Any]]:
+                            job_title: str, format: str = 'pdf', template_id: str = None,
+                            owner_id: str = None) -> Tuple[str, Dict[str, Any]]:
         """
         Generate a resume in the specified format (pdf or docx).
         
@@ -1027,6 +1222,7 @@ class ResumeGenerator:
             job_title: Target job title for the resume
             format: Output format ('pdf' or 'docx')
             template_id: ID of template to use (default: uses default template from config)
+            owner_id: ID of the user the PDF is rendered for, scopes the PDF cache
             
         Returns:
             Tuple of (file_path, token_usage_stats)
@@ -1046,10 +1242,13 @@ class ResumeGenerator:
 
             # Generate PDF using LaTeX processor with selected template
             logger.info(f"Calling latex processor with template_id: {template_id}")
-            pdf_result = self.latex_processor.generate_resume_pdf(
+            # Compilation blocks on the LaTeX worker pool, keep it off the event loop
+            pdf_result = await asyncio.to_thread(
+                self.latex_processor.generate_resume_pdf,
                 content=formatted_content,
                 template_id=template_id,
-                user_id=str(personal_info["name"])  # Ensure user_id is string
+                user_id=str(personal_info["name"]),  # Ensure user_id is string
+                owner_id=owner_id
             )
             
             # Handle new dict return format while maintaining backward compatibility
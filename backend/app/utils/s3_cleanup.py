@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import uuid
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..database import get_redis
+from .s3_storage import s3_storage
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_PREFIX = os.getenv("S3_CLEANUP_PREFIX", "s3cleanup")
+
+# S3 columns of a Resume row, all of which must go when the row does
+RESUME_S3_KEY_COLUMNS = ("content_s3_key", "job_description_s3_key", "summary_s3_key", "detailed_analysis_s3_key")
+
+
+# Take the oldest queued job and lease it until the visibility deadline
+DEQUEUE_SCRIPT = """
+local job_id = redis.call('LPOP', KEYS[1])
+if job_id then
+    redis.call('ZADD', KEYS[2], ARGV[1], job_id)
+end
+return job_id
+"""
+
+# Release an expired lease: requeue the job at the front, or give up after max attempts
+RELEASE_SCRIPT = """
+local job_key = ARGV[1] .. ':job:' .. ARGV[2]
+if redis.call('ZREM', KEYS[2], ARGV[2]) == 0 then
+    return 0
+end
+if redis.call('EXISTS', job_key) == 0 then
+    return 0
+end
+if redis.call('HINCRBY', job_key, 'attempts', 1) >= tonumber(ARGV[3]) then
+    redis.call('HSET', job_key, 'status', 'failed', 'run_id', '')
+    return 2
+end
+redis.call('HSET', job_key, 'status', 'queued', 'run_id', '')
+redis.call('LPUSH', KEYS[1], ARGV[2])
+return 1
+"""
+
+# Record a batch only for the run that holds the job, so a run that lost its lease cannot skew the counters
+RECORD_BATCH_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'run_id') ~= ARGV[1] then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], 'deleted', ARGV[2])
+redis.call('HINCRBY', KEYS[1], 'failed', ARGV[3])
+return 1
+"""
+
+
+class CleanupLeaseLostError(Exception):
+    """Another worker took over the cleanup job after this worker's lease expired"""
+    pass
+
+
+def resume_s3_keys(resume) -> List[str]:
+    """Every S3 object a Resume row references."""
+    return [key for key in (getattr(resume, column, None) for column in RESUME_S3_KEY_COLUMNS) if key]
+
+
+class S3CleanupQueue:
+    """Redis-backed queue of S3 deletion jobs.
+
+    Request handlers commit their database changes, enqueue the orphaned
+    object keys and return; the generation worker drains the queue with
+    multi-object deletes (up to 1000 keys per request) and records the
+    progress of each job in its hash, so nothing holds a database
+    transaction or a request open across S3 round trips. If Redis is
+    unavailable the keys are deleted inline instead of being leaked.
+
+    Like the generation queue, a running job is leased in a sorted set
+    until its visibility deadline and the lease is extended after every
+    batch; only expired leases are requeued, so worker replicas never take
+    each other's jobs. Each run stamps the job with its own run id and only
+    the run holding that id updates the counters.
+    """
+
+    def __init__(self, prefix: str = CLEANUP_PREFIX):
+        self.prefix = prefix
+        self.batch_size = int(os.getenv("S3_DELETE_BATCH_SIZE", 1000))
+        self.job_ttl = int(os.getenv("S3_CLEANUP_JOB_TTL", 7 * 24 * 3600))
+        self.visibility_timeout = int(os.getenv("S3_CLEANUP_VISIBILITY_TIMEOUT", 300))
+        self.max_attempts = int(os.getenv("S3_CLEANUP_MAX_ATTEMPTS", 5))
+        self._scripts = {}
+
+    def _script(self, name: str, source: str):
+        if name not in self._scripts:
+            self._scripts[name] = get_redis().register_script(source)
+        return self._scripts[name]
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def enqueue(self, object_names: Iterable[str], reason: str = "") -> Optional[str]:
+        """Schedule objects for deletion.
+
+        Args:
+            object_names: S3 object names; empty values and duplicates are ignored
+            reason: Short description shown in the progress report
+
+        Returns:
+            str | None: Cleanup job id, or None if there was nothing to schedule
+                or the objects were deleted inline because Redis was unavailable
+        """
+        keys = list(dict.fromkeys(name for name in object_names if name))
+        if not keys:
+            return None
+
+        job_id = str(uuid.uuid4())
+        try:
+            pipe = get_redis().pipeline()
+            pipe.hset(self._job_key(job_id), mapping={
+                "status": "queued",
+                "reason": reason,
+                "keys": json.dumps(keys),
+                "total": len(keys),
+                "deleted": 0,
+                "failed": 0,
+                "attempts": 0,
+                "created_at": int(time.time())
+            })
+            pipe.expire(self._job_key(job_id), self.job_ttl)
+            pipe.rpush(f"{self.prefix}:queue", job_id)
+            pipe.execute()
+            logger.info(f"Queued deletion of {len(keys)} S3 objects ({reason}) as job {job_id}")
+            return job_id
+        except Exception as e:
+            logger.error(f"Could not queue S3 cleanup, deleting inline: {str(e)}")
+            s3_storage.delete_files(keys, self.batch_size)
+            return None
+
+    def process_next(self) -> bool:
+        """Lease and run the oldest queued deletion job; returns False if the queue was empty."""
+        redis_client = get_redis()
+        deadline = time.time() + self.visibility_timeout
+        job_id = self._script("dequeue", DEQUEUE_SCRIPT)(
+            keys=[f"{self.prefix}:queue", f"{self.prefix}:leases"], args=[deadline]
+        )
+        if not job_id:
+            return False
+        try:
+            self._run(redis_client, job_id)
+            self.ack(job_id)
+        except CleanupLeaseLostError:
+            # The job now belongs to the worker that requeued it; leave its lease alone
+            logger.warning(f"Lost lease on S3 cleanup job {job_id}, another worker is running it")
+        return True
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Extend a job's lease; returns False if the lease was lost."""
+        deadline = time.time() + self.visibility_timeout
+        return bool(get_redis().zadd(f"{self.prefix}:leases", {job_id: deadline}, xx=True, ch=True))
+
+    def ack(self, job_id: str):
+        """Release the lease of a finished job; its hash is kept for progress reports."""
+        get_redis().zrem(f"{self.prefix}:leases", job_id)
+
+    def requeue_expired(self) -> int:
+        """Put back jobs whose lease expired without an ack; deletes are idempotent, so rerunning is safe."""
+        expired = get_redis().zrangebyscore(f"{self.prefix}:leases", "-inf", time.time(), start=0, num=100)
+        released = 0
+        for job_id in expired:
+            outcome = self._script("release", RELEASE_SCRIPT)(
+                keys=[f"{self.prefix}:queue", f"{self.prefix}:leases"],
+                args=[self.prefix, job_id, self.max_attempts]
+            )
+            if outcome:
+                released += 1
+                logger.warning(f"S3 cleanup job {job_id} lease expired, {'given up' if outcome == 2 else 'requeued'}")
+        return released
+
+    def _run(self, redis_client, job_id: str):
+        job_key = self._job_key(job_id)
+        keys_json = redis_client.hget(job_key, "keys")
+        if not keys_json:
+            logger.warning(f"S3 cleanup job {job_id} expired before it ran")
+            return
+        # A rerun starts its counters over; the previous run can no longer write to them
+        run_id = str(uuid.uuid4())
+        redis_client.hset(job_key, mapping={
+            "status": "running", "run_id": run_id, "deleted": 0, "failed": 0, "started_at": int(time.time())
+        })
+        record_batch = self._script("record_batch", RECORD_BATCH_SCRIPT)
+
+        def on_batch(deleted_count: int, errors: Dict[str, str]):
+            if not record_batch(keys=[job_key], args=[run_id, deleted_count, len(errors)]):
+                raise CleanupLeaseLostError(job_id)
+            self.heartbeat(job_id)
+
+        deleted, errors = s3_storage.delete_files(json.loads(keys_json), self.batch_size, on_batch)
+        if redis_client.hget(job_key, "run_id") != run_id:
+            raise CleanupLeaseLostError(job_id)
+        redis_client.hset(job_key, mapping={
+            "status": "completed" if not errors else "completed_with_errors",
+            "errors": json.dumps(dict(list(errors.items())[:20])),
+            "finished_at": int(time.time())
+        })
+        if errors:
+            logger.warning(f"S3 cleanup job {job_id} could not delete {len(errors)} objects")
+        else:
+            logger.info(f"S3 cleanup job {job_id} deleted {len(deleted)} objects")
+
+    def progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Progress report of a deletion job, or None if it is unknown or expired."""
+        job = get_redis().hgetall(self._job_key(job_id))
+        if not job:
+            return None
+        total = int(job.get("total") or 0)
+        done = int(job.get("deleted") or 0) + int(job.get("failed") or 0)
+        return {
+            "job_id": job_id,
+            "status": job.get("status"),
+            "reason": job.get("reason"),
+            "total": total,
+            "deleted": int(job.get("deleted") or 0),
+            "failed": int(job.get("failed") or 0),
+            "progress": round(100 * done / total) if total else 100,
+            "errors": json.loads(job.get("errors") or "{}"),
+            "created_at": int(job.get("created_at") or 0),
+            "finished_at": int(job["finished_at"]) if job.get("finished_at") else None
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of deletion jobs waiting and running."""
+        redis_client = get_redis()
+        return {
+            "pending": redis_client.llen(f"{self.prefix}:queue"),
+            "running": redis_client.zcard(f"{self.prefix}:leases")
+        }
+
+
+s3_cleanup_queue = S3CleanupQueue()
@@ -1,6 +1,11 @@
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import logging
 
@@ -10,14 +15,35 @@ logger = logging.getLogger(__name__)
 
 class S3Storage:
     def __init__(self):
+        # One client (and connection pool) shared by every thread; boto3 clients are thread-safe
+        self.max_connections = int(os.getenv("S3_MAX_POOL_CONNECTIONS", 32))
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
             aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            region_name=os.getenv("AWS_REGION")
+            region_name=os.getenv("AWS_REGION"),
+            # Set to a local S3 stand-in (MinIO, LocalStack) for development and tests
+            endpoint_url=os.getenv("AWS_S3_ENDPOINT_URL") or None,
+            config=Config(
+                max_pool_connections=self.max_connections,
+                connect_timeout=float(os.getenv("S3_CONNECT_TIMEOUT", 5)),
+                read_timeout=float(os.getenv("S3_READ_TIMEOUT", 30)),
+                tcp_keepalive=True,
+                retries={
+                    'mode': 'adaptive',
+                    'max_attempts': int(os.getenv("S3_MAX_ATTEMPTS", 5))
+                },
+                s3={'addressing_style': os.getenv("S3_ADDRESSING_STYLE", "auto")}
+            )
         )
+        # Runs blocking S3 calls for the async and batch helpers; sized to the connection pool
+        self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="s3-io")
         self.bucket_name = os.getenv("AWS_S3_BUCKET_NAME")
         self.region = os.getenv("AWS_REGION")
+        # Presigned URLs are reused until this many seconds before they expire
+        self.presign_safety_margin = int(os.getenv("S3_PRESIGN_SAFETY_MARGIN", 300))
+        self._presigned_cache = {}
+        self._presigned_lock = threading.Lock()
 
     def upload_file(self, file_content: bytes, object_name: str, content_type: str):
         """Uploads a file to an S3 bucket.
@@ -40,24 +66,94 @@ class S3Storage:
             logger.error(f"Failed to upload file {object_name}: {e}")
             return False
 
+    def ensure_prefix_expiration(self, prefix: str, days: int, rule_id: str) -> bool:
+        """Make the bucket expire objects under a prefix, keeping its other lifecycle rules.
+
+        :param prefix: Key prefix, without the trailing slash.
+        :param days: Days after creation at which objects are deleted.
+        :param rule_id: Lifecycle rule ID, replaced if it already exists.
+        :return: True if the rule is in place, else False.
+        """
+        rule = {
+            'ID': rule_id,
+            'Filter': {'Prefix': f"{prefix}/"},
+            'Status': 'Enabled',
+            'Expiration': {'Days': int(days)}
+        }
+        try:
+            try:
+                rules = self.s3_client.get_bucket_lifecycle_configuration(Bucket=self.bucket_name).get('Rules', [])
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'NoSuchLifecycleConfiguration':
+                    raise
+                rules = []
+            if rule in rules:
+                return True
+            # PutBucketLifecycleConfiguration replaces the whole configuration
+            rules = [r for r in rules if r.get('ID') != rule_id] + [rule]
+            self.s3_client.put_bucket_lifecycle_configuration(
+                Bucket=self.bucket_name,
+                LifecycleConfiguration={'Rules': rules}
+            )
+            logger.info(f"Objects under {prefix}/ in {self.bucket_name} now expire after {days} days")
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.warning(f"Could not set the lifecycle rule for {prefix}/: {e}")
+            return False
+
     def generate_presigned_url(self, object_name: str, expiration: int = 3600):
         """Generate a presigned URL to share an S3 object.
 
+        A previously signed URL is returned while it stays valid for longer than
+        the safety margin, so callers always get at least that much lifetime.
+
         :param object_name: S3 object name.
         :param expiration: Time in seconds for the presigned URL to remain valid.
         :return: Presigned URL as string. If error, returns None.
         """
-        try:
-            response = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': object_name},
-                ExpiresIn=expiration
-            )
-            logger.info(f"Presigned URL generated for {object_name}")
-            return response
-        except ClientError as e:
-            logger.error(f"Failed to generate presigned URL for {object_name}: {e}")
-            return None
+        return self.generate_presigned_urls([object_name], expiration).get(object_name)
+
+    def generate_presigned_urls(self, object_names, expiration: int = 3600):
+        """Generate presigned URLs for many S3 objects in one call.
+
+        :param object_names: Iterable of S3 object names.
+        :param expiration: Time in seconds for the presigned URLs to remain valid.
+        :return: Dict mapping each object name to its URL (None if signing failed).
+        """
+        now = time.time()
+        # Never hand out a URL with less than the margin left, even for short expirations
+        margin = min(self.presign_safety_margin, expiration // 2)
+        urls = {}
+        signed = 0
+        with self._presigned_lock:
+            if len(self._presigned_cache) > 1024:
+                self._presigned_cache = {k: v for k, v in self._presigned_cache.items() if v[1] - margin > now}
+            for object_name in object_names:
+                if object_name in urls:
+                    continue
+                cached = self._presigned_cache.get((object_name, expiration))
+                if cached and cached[1] - margin > now:
+                    urls[object_name] = cached[0]
+                    continue
+                try:
+                    url = self.s3_client.generate_presigned_url(
+                        'get_object',
+                        Params={'Bucket': self.bucket_name, 'Key': object_name},
+                        ExpiresIn=expiration
+                    )
+                    self._presigned_cache[(object_name, expiration)] = (url, now + expiration)
+                    urls[object_name] = url
+                    signed += 1
+                except ClientError as e:
+                    logger.error(f"Failed to generate presigned URL for {object_name}: {e}")
+                    urls[object_name] = None
+        if signed:
+            logger.info(f"Presigned {signed} URLs ({len(urls) - signed} reused)")
+        return urls
+
+    def presigned_urls_valid_for(self, expiration: int = 3600) -> int:
+        """Seconds a URL returned now is guaranteed to stay valid for at least."""
+        return min(self.presign_safety_margin, expiration // 2)
 
     def delete_file(self, object_name: str):
         """Deletes a file from an S3 bucket.
@@ -66,6 +162,7 @@ class S3Storage:
         :return: True if file was deleted, else False.
         """
         try:
+            self._forget_presigned(object_name)
             self.s3_client.delete_object(Bucket=self.bucket_name, Key=object_name)
             logger.info(f"File {object_name} deleted from {self.bucket_name}")
             return True
@@ -73,6 +170,45 @@ class S3Storage:
             logger.error(f"Failed to delete file {object_name}: {e}")
             return False
 
+    def delete_files(self, object_names, batch_size: int = 1000, on_batch=None):
+        """Deletes many objects with multi-object delete requests, batches running concurrently.
+
+        :param object_names: Iterable of S3 object names.
+        :param batch_size: Keys per DeleteObjects request (S3 allows at most 1000).
+        :param on_batch: Optional callback(deleted_count, errors) invoked after each batch.
+        :return: (deleted, errors) - deleted object names and a dict of object name to error message.
+        """
+        names = list(dict.fromkeys(name for name in object_names if name))
+        batch_size = max(1, min(batch_size, 1000))
+        batches = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+        for object_name in names:
+            self._forget_presigned(object_name)
+
+        deleted, errors = [], {}
+        futures = [self._executor.submit(self._delete_batch, batch) for batch in batches]
+        for future in futures:
+            batch_deleted, batch_errors = future.result()
+            deleted.extend(batch_deleted)
+            errors.update(batch_errors)
+            if on_batch:
+                on_batch(len(batch_deleted), batch_errors)
+        if names:
+            logger.info(f"Deleted {len(deleted)} of {len(names)} objects from {self.bucket_name} in {len(batches)} requests")
+        return deleted, errors
+
+    def _delete_batch(self, object_names):
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': name} for name in object_names], 'Quiet': True}
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Failed to delete {len(object_names)} objects: {e}")
+            return [], {name: str(e) for name in object_names}
+        # Quiet mode only reports failures
+        errors = {error['Key']: error.get('Message') or error.get('Code') for error in response.get('Errors', [])}
+        return [name for name in object_names if name not in errors], errors
+
     def upload_text(self, text_content: str, object_name: str):
         """Uploads text content to an S3 bucket.
 
@@ -89,7 +225,7 @@ class S3Storage:
             )
             logger.info(f"Text content uploaded to {self.bucket_name}/{object_name}")
             return True
-        except ClientError as e:
+        except (ClientError, BotoCoreError) as e:
             logger.error(f"Failed to upload text content {object_name}: {e}")
             return False
 
@@ -104,8 +240,105 @@ class S3Storage:
             content = response['Body'].read().decode('utf-8')
             logger.info(f"Text content downloaded from {self.bucket_name}/{object_name}")
             return content
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Failed to download text content {object_name}: {e}")
+            return None
+
+    def download_text_if_changed(self, object_name: str, etag: str = None):
+        """Conditionally downloads text content, skipping the body if the ETag still matches.
+
+        :param object_name: S3 object name.
+        :param etag: ETag of the copy the caller already holds, if any.
+        :return: (content, etag); content is None when unchanged, both are None when the object does not exist.
+        :raises ClientError: On any other S3 error (throttling, 5xx, access denied), so callers
+            can tell a failed check apart from a missing object.
+        """
+        try:
+            params = {'Bucket': self.bucket_name, 'Key': object_name}
+            if etag:
+                params['IfNoneMatch'] = etag
+            response = self.s3_client.get_object(**params)
+            content = response['Body'].read().decode('utf-8')
+            logger.info(f"Text content downloaded from {self.bucket_name}/{object_name}")
+            return content, response.get('ETag')
         except ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code in ('304', 'NotModified'):
+                return None, etag
+            if code in ('NoSuchKey', '404'):
+                logger.warning(f"Text content {object_name} not found in {self.bucket_name}")
+                return None, None
             logger.error(f"Failed to download text content {object_name}: {e}")
+            raise
+
+    def download_file(self, object_name: str):
+        """Downloads a binary object from an S3 bucket.
+
+        :param object_name: S3 object name.
+        :return: Object content as bytes if it exists, else None.
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=object_name)
+            content = response['Body'].read()
+            logger.info(f"File downloaded from {self.bucket_name}/{object_name}")
+            return content
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                logger.info(f"File {object_name} not found in {self.bucket_name}")
+            else:
+                logger.error(f"Failed to download file {object_name}: {e}")
             return None
 
+    def upload_texts(self, objects: dict):
+        """Uploads several text objects concurrently.
+
+        :param objects: Dict mapping S3 object names to their text content.
+        :return: Dict mapping each object name to True if it was uploaded, else False.
+        """
+        futures = {
+            object_name: self._executor.submit(self.upload_text, text_content, object_name)
+            for object_name, text_content in objects.items()
+        }
+        return {object_name: future.result() for object_name, future in futures.items()}
+
+    def download_texts(self, object_names):
+        """Downloads several text objects concurrently.
+
+        :param object_names: Iterable of S3 object names.
+        :return: Dict mapping each object name to its content, or None if it could not be read.
+        """
+        futures = {
+            object_name: self._executor.submit(self.download_text, object_name)
+            for object_name in set(object_names)
+        }
+        return {object_name: future.result() for object_name, future in futures.items()}
+
+    async def upload_text_async(self, text_content: str, object_name: str):
+        """Async version of upload_text that does not block the event loop."""
+        return await self._run_async(self.upload_text, text_content, object_name)
+
+    async def download_text_async(self, object_name: str):
+        """Async version of download_text that does not block the event loop."""
+        return await self._run_async(self.download_text, object_name)
+
+    async def upload_texts_async(self, objects: dict):
+        """Async version of upload_texts; all uploads run concurrently."""
+        names = list(objects)
+        results = await asyncio.gather(*(self.upload_text_async(objects[name], name) for name in names))
+        return dict(zip(names, results))
+
+    async def download_texts_async(self, object_names):
+        """Async version of download_texts; all downloads run concurrently."""
+        names = list(dict.fromkeys(object_names))
+        results = await asyncio.gather(*(self.download_text_async(name) for name in names))
+        return dict(zip(names, results))
+
+    async def _run_async(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _forget_presigned(self, object_name: str):
+        with self._presigned_lock:
+            for key in [k for k in self._presigned_cache if k[0] == object_name]:
+                del self._presigned_cache[key]
+
 s3_storage = S3Storage()
@@ -0,0 +1,76 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+import tiktoken
+
+# OpenAI's tokenizer, used as an approximation for every provider
+ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoder(name: str = ENCODING_NAME) -> tiktoken.Encoding:
+    """Process-wide tiktoken encoding, loaded once."""
+    return tiktoken.get_encoding(name)
+
+
+class TokenCountCache:
+    """LRU of token counts keyed by a hash of the text.
+
+    The same job description and initial content are counted for every
+    agent of a generation (and across generations for repeated postings);
+    hashing is far cheaper than re-tokenising them.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                self.hits += 1
+                return count
+            self.misses += 1
+        count = len(get_encoder().encode(text, disallowed_special=()))
+        with self._lock:
+            self._counts[key] = count
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return count
+
+
+_cache = TokenCountCache(int(os.getenv("TOKEN_COUNT_CACHE_SIZE", 4096)))
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Count tokens in a string, memoised by content hash."""
+    return _cache.count(text or "")
+
+
+def usage_tokens(usage: Any) -> Optional[Tuple[int, int]]:
+    """(prompt, completion) tokens from provider-reported usage, or None if not available.
+
+    Accepts an OpenAI-style usage dict or an object with ``prompt_tokens``
+    and ``completion_tokens`` attributes (Groq SDK, crewai UsageMetrics).
+    """
+    if not usage:
+        return None
+    if isinstance(usage, dict):
+        prompt, completion = usage.get("prompt_tokens"), usage.get("completion_tokens")
+    else:
+        prompt, completion = getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+    if prompt is None or completion is None or (prompt == 0 and completion == 0):
+        return None
+    return int(prompt), int(completion)
@@ -4,7 +4,8 @@ from pathlib import Path
 from typing import List, Dict, Any
 from sqlalchemy.orm import Session
 from ..models import User, Profile, Resume, WorkExperience, Education, Skill, Project, Publication, VolunteerWork
-from .s3_storage import s3_storage
+from .s3_cleanup import s3_cleanup_queue, resume_s3_keys
+from ..latex.pdf_cache import pdf_cache
 
 logger = logging.getLogger(__name__)
 
@@ -18,10 +19,15 @@ class UserDataCleanup:
         """
         Completely delete a user and all associated data including:
         - Profile and all profile sections (work experience, education, skills, etc.)
-        - All resumes and their S3 content
-        - Uploaded resume files (both local and S3)
+        - All resumes and their S3 content and artifacts
+        - Uploaded resume files (S3)
+        - Cached rendered PDFs (local disk and S3)
         - All database records
         
+        S3 objects are deleted by a background cleanup job after the
+        database transaction commits; the summary carries its id for
+        progress reporting.
+        
         Returns a summary of what was deleted.
         """
         try:
@@ -37,7 +43,6 @@ class UserDataCleanup:
                     "profile": False,
                     "resumes": 0,
                     "resume_s3_files": 0,
-                    "uploaded_resume_file": False,
                     "uploaded_resume_s3_file": False,
                     "work_experiences": 0,
                     "educations": 0,
@@ -45,49 +50,36 @@ class UserDataCleanup:
                     "projects": 0,
                     "publications": 0,
                     "volunteer_works": 0,
-                    "local_files_deleted": [],
-                    "s3_files_deleted": [],
-                    "s3_deletion_errors": []
-                }
+                    "s3_files_queued": 0
+                },
+                "s3_cleanup_job_id": None
             }
             
-            # Get profile if exists
+            # Collect S3 keys first; nothing is deleted from S3 until the DB commit succeeded
+            s3_keys: List[str] = []
             profile = user.profile
             if profile:
                 deletion_summary["deleted"]["profile"] = True
                 
                 # Note: resume_path field has been removed - resumes are now stored in S3 only
-                
-                # Delete uploaded resume from S3
                 if profile.resume_s3_key:
-                    try:
-                        if s3_storage.delete_file(profile.resume_s3_key):
-                            deletion_summary["deleted"]["uploaded_resume_s3_file"] = True
-                            deletion_summary["deleted"]["s3_files_deleted"].append(profile.resume_s3_key)
-                            logger.info(f"Deleted S3 resume file: {profile.resume_s3_key}")
-                        else:
-                            deletion_summary["deleted"]["s3_deletion_errors"].append(f"Failed to delete resume S3 file: {profile.resume_s3_key}")
-                    except Exception as e:
-                        logger.error(f"Error deleting S3 resume file {profile.resume_s3_key}: {str(e)}")
-                        deletion_summary["deleted"]["s3_deletion_errors"].append(f"Error deleting resume S3 file: {str(e)}")
+                    s3_keys.append(profile.resume_s3_key)
+                    deletion_summary["deleted"]["uploaded_resume_s3_file"] = True
                 
-                # Delete all resume S3 content
-                resumes = self.db.query(Resume).filter(Resume.profile_id == profile.id).all()
-                for resume in resumes:
-                    if resume.content_s3_key:
-                        try:
-                            if s3_storage.delete_file(resume.content_s3_key):
-                                deletion_summary["deleted"]["resume_s3_files"] += 1
-                                deletion_summary["deleted"]["s3_files_deleted"].append(resume.content_s3_key)
-                                logger.info(f"Deleted S3 resume content: {resume.content_s3_key}")
-                            else:
-                                deletion_summary["deleted"]["s3_deletion_errors"].append(f"Failed to delete resume content S3 file: {resume.content_s3_key}")
-                        except Exception as e:
-                            logger.error(f"Error deleting S3 resume content {resume.content_s3_key}: {str(e)}")
-                            deletion_summary["deleted"]["s3_deletion_errors"].append(f"Error deleting resume content S3 file: {str(e)}")
+                # Every object each resume references: content, job description, summary and analysis
+                resume_keys = self.db.query(
+                    Resume.content_s3_key,
+                    Resume.job_description_s3_key,
+                    Resume.summary_s3_key,
+                    Resume.detailed_analysis_s3_key
+                ).filter(Resume.profile_id == profile.id).all()
+                for row in resume_keys:
+                    keys = resume_s3_keys(row)
+                    s3_keys.extend(keys)
+                    deletion_summary["deleted"]["resume_s3_files"] += len(keys)
                 
                 # Count profile sections before deletion (they will be cascade deleted)
-                deletion_summary["deleted"]["resumes"] = len(resumes)
+                deletion_summary["deleted"]["resumes"] = len(resume_keys)
                 deletion_summary["deleted"]["work_experiences"] = len(profile.work_experiences)
                 deletion_summary["deleted"]["educations"] = len(profile.educations)
                 deletion_summary["deleted"]["skills"] = len(profile.skills)
@@ -99,6 +91,10 @@ class UserDataCleanup:
             self.db.delete(user)
             self.db.commit()
             
+            s3_keys.extend(pdf_cache.purge_owner(str(user_id)))
+            deletion_summary["deleted"]["s3_files_queued"] = len(set(s3_keys))
+            deletion_summary["s3_cleanup_job_id"] = s3_cleanup_queue.enqueue(s3_keys, f"delete user {user_id}")
+            
             logger.info(f"Successfully deleted user {user_id} and all associated data")
             return deletion_summary
             
@@ -163,13 +159,13 @@ class UserDataCleanup:
                 if profile.resume_s3_key:
                     summary["files"]["uploaded_resume_s3"] = profile.resume_s3_key
                 
-                # Resume S3 files
+                # Resume S3 files, including their job description, summary and analysis
                 for resume in profile.resumes:
-                    if resume.content_s3_key:
+                    for s3_key in resume_s3_keys(resume):
                         summary["files"]["resume_s3_files"].append({
                             "resume_id": str(resume.id),
                             "resume_name": resume.name,
-                            "s3_key": resume.content_s3_key
+                            "s3_key": s3_key
                         })
             
             return summary
@@ -0,0 +1,267 @@
+"""Resume generation worker.
+
+Run with ``python -m app.worker``. Each process runs
+GENERATION_WORKER_CONCURRENCY generation slots that pull jobs from the Redis
+generation queue; add processes (or replicas of the worker service) to
+scale throughput independently of the API. Each process also drains the
+S3 cleanup queue on one extra thread.
+"""
+import os
+import time
+import uuid
+import signal
+import asyncio
+import logging
+import threading
+from typing import Dict, Set
+
+from sqlalchemy import text
+
+from .database import SessionLocal, get_redis, save_generation_status
+from .utils.job_queue import generation_queue
+from .utils.s3_cleanup import s3_cleanup_queue
+from .utils.async_llm import async_llm
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Credits are charged at most once per job, even if a job is retried after the charge
+CHARGED_KEY_TTL = 7 * 24 * 3600
+# Charges that failed after their resume was generated, job id -> user id, retried on their own
+PENDING_CHARGES_KEY = f"{generation_queue.prefix}:pending_charges"
+
+
+class InsufficientCreditsError(Exception):
+    """The user has no credits left; the job is not retried"""
+    pass
+
+
+def has_credits(user_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        credits = db.execute(
+            text("SELECT credits FROM users WHERE id = :user_id"),
+            {"user_id": user_id}
+        ).scalar()
+        return (credits or 0) >= 1
+    finally:
+        db.close()
+
+
+def charge_credit(job_id: str, user_id: str) -> bool:
+    """Deduct one credit for a completed job, exactly once per job id.
+
+    Returns:
+        bool: True if a credit was deducted by this call
+    """
+    redis_client = get_redis()
+    charged_key = f"{generation_queue.prefix}:charged:{job_id}"
+    if not redis_client.set(charged_key, "1", nx=True, ex=CHARGED_KEY_TTL):
+        logger.info(f"Credit for job {job_id} was already charged")
+        return False
+
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            text("UPDATE users SET credits = COALESCE(credits, 0) - 1 WHERE id = :user_id RETURNING credits"),
+            {"user_id": user_id}
+        ).scalar()
+        db.commit()
+        logger.info(f"Deducted 1 credit from user {user_id}. Remaining credits: {result}")
+        return True
+    except Exception:
+        db.rollback()
+        # Let a retry charge again rather than lose the charge
+        redis_client.delete(charged_key)
+        raise
+    finally:
+        db.close()
+
+
+def retry_pending_charges() -> int:
+    """Retry the credit charges of jobs whose generation already succeeded.
+
+    Returns:
+        int: Number of pending charges settled
+    """
+    redis_client = get_redis()
+    settled = 0
+    for job_id, user_id in redis_client.hgetall(PENDING_CHARGES_KEY).items():
+        try:
+            charge_credit(job_id, user_id)
+        except Exception as e:
+            logger.error(f"Retrying the credit charge for job {job_id} failed: {str(e)}")
+            continue
+        redis_client.hdel(PENDING_CHARGES_KEY, job_id)
+        settled += 1
+    return settled
+
+
+def charge_job(job_id: str, user_id: str):
+    """Charge a job whose resume was generated; a failed charge is retried on its own."""
+    try:
+        charge_credit(job_id, user_id)
+    except Exception as e:
+        # The resume is already saved; only the charge is retried, never the generation
+        logger.error(f"Could not charge credit for job {job_id}, retrying it separately: {str(e)}")
+        try:
+            get_redis().hset(PENDING_CHARGES_KEY, job_id, user_id)
+        except Exception as queue_error:
+            logger.error(f"Could not queue the credit charge for job {job_id} of user {user_id}: {str(queue_error)}")
+
+
+def run_generation_job(job_id: str, payload: dict):
+    """Run one resume generation end to end, as the old background thread did."""
+    from .utils.resume_generator import ResumeGenerator
+
+    user_id = payload["user_id"]
+    db = SessionLocal()
+    try:
+        resume_generator = ResumeGenerator(db)
+        # A retry or duplicate run after the resume was saved only finishes the job (and its charge)
+        if resume_generator.finish_saved_generation(job_id) is not None:
+            charge_job(job_id, user_id)
+            return
+
+        if not has_credits(user_id):
+            raise InsufficientCreditsError("Insufficient credits")
+
+        save_generation_status(job_id, "parsing", 5, "Starting resume generation...")
+
+        async def generate():
+            try:
+                await resume_generator.optimize_resume(
+                    job_id,
+                    payload["parsed_data"],
+                    payload["job_description"],
+                    payload.get("skills"),
+                    uuid.UUID(user_id),
+                    payload.get("company_name"),
+                    payload.get("job_title"),
+                    fresh_variation=payload.get("fresh_variation", False)
+                )
+            finally:
+                # The HTTP pool belongs to this job's event loop
+                await async_llm.aclose()
+
+        asyncio.run(generate())
+    finally:
+        db.close()
+
+    charge_job(job_id, user_id)
+    logger.info(f"Resume generation completed successfully for job {job_id}")
+
+
+class GenerationWorker:
+    """Pulls generation jobs from the queue on a fixed number of slots."""
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency or int(os.getenv("GENERATION_WORKER_CONCURRENCY", 2))
+        self.poll_interval = float(os.getenv("GENERATION_WORKER_POLL_INTERVAL", 1))
+        self.heartbeat_interval = max(generation_queue.visibility_timeout / 3, 5)
+        self._stop = threading.Event()
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def stop(self, *args):
+        logger.info("Worker stopping after in-flight jobs finish")
+        self._stop.set()
+
+    def run(self):
+        slots = [
+            threading.Thread(target=self._slot_loop, name=f"generation-slot-{i}")
+            for i in range(self.concurrency)
+        ]
+        # S3 deletions queued by the API run alongside generations, on their own thread
+        slots.append(threading.Thread(target=self._cleanup_loop, name="s3-cleanup"))
+        for slot in slots:
+            slot.start()
+        logger.info(f"Generation worker started with {self.concurrency} slots")
+
+        last_heartbeat = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                    self._heartbeat()
+                    last_heartbeat = time.monotonic()
+                generation_queue.requeue_expired()
+                s3_cleanup_queue.requeue_expired()
+                retry_pending_charges()
+            except Exception as e:
+                logger.error(f"Worker maintenance error: {str(e)}")
+            self._stop.wait(self.poll_interval * 5)
+
+        # Keep leases alive while the slots drain
+        while any(slot.is_alive() for slot in slots):
+            self._heartbeat()
+            for slot in slots:
+                slot.join(timeout=self.heartbeat_interval)
+        logger.info("Generation worker stopped")
+
+    def _heartbeat(self):
+        with self._lock:
+            job_ids = list(self._in_flight)
+        for job_id in job_ids:
+            try:
+                if not generation_queue.heartbeat(job_id):
+                    logger.warning(f"Lost lease on generation job {job_id}, it may be retried elsewhere")
+            except Exception as e:
+                logger.error(f"Heartbeat failed for job {job_id}: {str(e)}")
+
+    def _slot_loop(self):
+        while not self._stop.is_set():
+            try:
+                job = generation_queue.dequeue()
+            except Exception as e:
+                logger.error(f"Error dequeuing generation job: {str(e)}")
+                self._stop.wait(self.poll_interval * 5)
+                continue
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._process(job)
+
+    def _cleanup_loop(self):
+        while not self._stop.is_set():
+            try:
+                if s3_cleanup_queue.process_next():
+                    continue
+            except Exception as e:
+                logger.error(f"Error running S3 cleanup job: {str(e)}")
+            self._stop.wait(self.poll_interval * 5)
+
+    def _process(self, job: Dict):
+        job_id = job["job_id"]
+        with self._lock:
+            self._in_flight.add(job_id)
+        try:
+            logger.info(f"Processing generation job {job_id} (attempt {job['attempts'] + 1})")
+            run_generation_job(job_id, job["payload"])
+            generation_queue.ack(job_id)
+        except InsufficientCreditsError:
+            generation_queue.ack(job_id)
+            save_generation_status(job_id, "failed", 0, "Insufficient credits", 0)
+        except Exception as e:
+            logger.error(f"Generation job {job_id} failed: {str(e)}")
+            outcome = generation_queue.fail(job_id, str(e))
+            if outcome == 1:
+                save_generation_status(job_id, "queued", 0, "Generation hit a problem, retrying...", 0)
+            else:
+                save_generation_status(job_id, "failed", 0, f"Generation failed: {str(e)}", 0)
+        finally:
+            with self._lock:
+                self._in_flight.discard(job_id)
+
+
+def main():
+    worker = GenerationWorker()
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,8 +18,11 @@ apiClient.interceptors.request.use((config) => {
   return config
 })
 
+// Open generation event stream; kept outside the (persisted) store state
+let eventSource: EventSource | null = null
+
 interface GenerationStatus {
-  status: 'idle' | 'parsing' | 'analyzing' | 'optimizing' | 'constructing' | 'completed' | 'failed'
+  status: 'idle' | 'queued' | 'parsing' | 'analyzing' | 'optimizing' | 'constructing' | 'completed' | 'failed'
   progress: number
   current_step: string
   estimated_time_remaining: number | null
@@ -32,14 +35,21 @@ interface GenerationResult {
   company_name?: string // Added company_name
   job_title: string
   content: string
-  agent_outputs: string
+  agent_outputs?: string // Loaded on demand by fetchAnalysis
   analysis_summary?: string
+  artifacts?: { analysis: string }
   token_usage: any
   total_usage: any
   template_id?: string
   message: string
 }
 
+interface AgentOutput {
+  agent: string
+  label: string
+  output: string
+}
+
 interface Template {
   id: string;
   name: string;
@@ -50,6 +60,8 @@ interface GenerationState {
   jobId: string | null
   status: GenerationStatus | null
   result: GenerationResult | null
+  agentOutputs: AgentOutput[]
+  partialContent: string | null
   error: string | null
   isPolling: boolean
   pollInterval: number | null
@@ -67,6 +79,8 @@ export const useResumeStore = defineStore('resume', {
     jobId: null,
     status: null,
     result: null,
+    agentOutputs: [],
+    partialContent: null,
     error: null,
     isPolling: false,
     pollInterval: null,
@@ -96,7 +110,8 @@ export const useResumeStore = defineStore('resume', {
       companyName: string, // New parameter
       jobTitle: string,    // New parameter
       skills?: string[],
-      templateId?: string
+      templateId?: string,
+      freshVariation: boolean = false // Skip cached AI responses and produce a new variation
     ): Promise<string> {
       this.clearState()
       const startTime = Date.now()
@@ -128,6 +143,10 @@ export const useResumeStore = defineStore('resume', {
           formData.append('template_id', templateId)
         }
 
+        if (freshVariation) {
+          formData.append('fresh_variation', 'true')
+        }
+
         const response = await apiClient.post('/start-generation', formData, {
           headers: {
             'Content-Type': 'multipart/form-data'
@@ -137,8 +156,8 @@ export const useResumeStore = defineStore('resume', {
         this.jobId = response.data.job_id
         this.error = null
         
-        // Start polling for status
-        this.startPolling()
+        // Stream status updates, falling back to polling
+        this.startStreaming()
         
         return response.data.job_id
       } catch (error: any) {
@@ -198,6 +217,105 @@ export const useResumeStore = defineStore('resume', {
         return null
       }
     },
+    async fetchAnalysis(jobId?: string): Promise<{ agent_outputs: string | null, analysis_summary: string | null } | null> {
+      // The result only references the analysis; fetch it when it is first needed
+      const id = jobId || this.jobId
+      if (!id) return null
+      if (this.result?.agent_outputs !== undefined) {
+        return {
+          agent_outputs: this.result.agent_outputs,
+          analysis_summary: this.result.analysis_summary ?? null
+        }
+      }
+
+      try {
+        const response = await apiClient.get(`/generation-result/${id}/analysis`)
+        if (this.result) {
+          this.result.agent_outputs = response.data.agent_outputs || ''
+          this.result.analysis_summary = response.data.analysis_summary || undefined
+        }
+        return response.data
+      } catch (error: any) {
+        console.error('Failed to load generation analysis:', error)
+        return null
+      }
+    },
+    applyStatus(update: Partial<GenerationStatus>) {
+      // Preserve start_time and elapsed_time, which the frontend timer owns
+      this.status = {
+        ...(this.status || { elapsed_time: 0, start_time: Date.now() }),
+        ...update,
+        start_time: this.status?.start_time || update.start_time || Date.now()
+      } as GenerationStatus
+    },
+    async startStreaming() {
+      this.stopPolling()
+
+      if (!this.jobId || typeof EventSource === 'undefined') {
+        this.startPolling()
+        return
+      }
+
+      // EventSource puts the token in the URL, so it gets a short-lived token for this job
+      // instead of the session token
+      const jobId = this.jobId
+      let token: string
+      try {
+        const response = await apiClient.post(`/generation-events/${jobId}/token`)
+        token = response.data.token
+      } catch (error) {
+        console.error('Could not open the generation event stream, polling instead:', error)
+        this.startPolling()
+        return
+      }
+      // A newer generation may have started while the token was requested
+      if (this.jobId !== jobId) return
+
+      const url = `${import.meta.env.VITE_BACKEND_URL}/generation-events/${this.jobId}?token=${encodeURIComponent(token)}`
+      const source = new EventSource(url)
+      eventSource = source
+      let finished = false
+
+      source.addEventListener('status', (event) => {
+        const update = JSON.parse((event as MessageEvent).data)
+        this.applyStatus(update)
+        this.error = null
+        if (update.status === 'failed') {
+          finished = true
+          this.stopPolling()
+          this.stopFrontendTimer()
+        } else if (update.status === 'completed') {
+          finished = true
+        }
+      })
+      source.addEventListener('agent_output', (event) => {
+        this.agentOutputs.push(JSON.parse((event as MessageEvent).data))
+      })
+      source.addEventListener('partial', (event) => {
+        // Newly constructed resume text and where it starts; offset 0 is a full catch-up snapshot
+        const { offset, delta } = JSON.parse((event as MessageEvent).data)
+        const current = offset === 0 ? '' : (this.partialContent || '').slice(0, offset)
+        this.partialContent = current + delta
+      })
+      source.addEventListener('partial_reset', () => {
+        // The server discarded the streamed text (retried attempt or fallback to the agent)
+        this.partialContent = ''
+      })
+      source.addEventListener('result', async (event) => {
+        this.result = JSON.parse((event as MessageEvent).data)
+        this.stopPolling()
+        this.stopFrontendTimer()
+        await this.updateCredits()
+      })
+      source.onerror = () => {
+        // The server closes the stream once the job is done; anything else falls back to polling
+        const wasOpen = eventSource === source
+        this.stopPolling()
+        if (!wasOpen) return
+        if (finished && this.result) return
+        this.startPolling()
+      }
+    },
     startPolling() {
       // Always clear any existing polling first
       this.stopPolling()
@@ -230,6 +348,10 @@ export const useResumeStore = defineStore('resume', {
       }, 2000) // Poll every 2 seconds
     },
     stopPolling() {
+      if (eventSource) {
+        eventSource.close()
+        eventSource = null
+      }
       this.isPolling = false
       if (this.pollInterval) {
         clearInterval(this.pollInterval)
@@ -249,6 +371,8 @@ export const useResumeStore = defineStore('resume', {
       this.jobId = null
       this.status = null
       this.result = null
+      this.agentOutputs = []
+      this.partialContent = null
       this.error = null
       this.frontend_elapsed_time = 0
       this.jobDescriptionText = null
@@ -314,8 +438,8 @@ export const useResumeStore = defineStore('resume', {
           this.frontend_elapsed_time = (Date.now() - this.status!.start_time) / 1000
         }, 1000)
         
-        // Restart polling to continue checking backend status
-        this.startPolling()
+        // Reconnect to the status stream
+        this.startStreaming()
         
         console.log('Restored generation state with elapsed time:', this.frontend_elapsed_time.toFixed(1) + 's')
       }